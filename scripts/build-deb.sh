@@ -68,7 +68,8 @@ mkdir -p "$STAGE"
 install -d -m 755 "$STAGE/opt/voip-opus"
 cp -r server "$STAGE/opt/voip-opus/"
 cp server/requirements.txt "$STAGE/opt/voip-opus/requirements.txt"
-# Drop test-only files — they're not needed in the deployed package.
+# Drop test-only files — they're not needed in the deployed package. Bytecode
+# is dropped too; postinst compiles it against the target's own Python.
 rm -rf "$STAGE/opt/voip-opus/server/tests"
 rm -rf "$STAGE/opt/voip-opus/server/__pycache__" \
        "$STAGE/opt/voip-opus/server"/*/__pycache__ 2>/dev/null || true
@@ -1,13 +1,16 @@
-"""Password hashing + JWT helpers + FastAPI auth dependency."""
+"""Password hashing + JWT helpers + FastAPI auth dependency.
+
+bcrypt and PyJWT are imported on first use, not at startup: neither is
+needed before the first signup, login or /ws connect.
+"""
 
 from __future__ import annotations
 
+import hmac
 from datetime import datetime, timedelta, timezone
 from typing import Annotated, Optional
 
-import bcrypt
-import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from .config import settings
@@ -18,10 +21,14 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=Fals
 
 
 def hash_password(plain: str) -> str:
+    import bcrypt
+
     return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
 
 def verify_password(plain: str, hashed: str) -> bool:
+    import bcrypt
+
     try:
         return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
     except ValueError:
@@ -29,6 +36,8 @@ def verify_password(plain: str, hashed: str) -> bool:
 
 
 def create_access_token(user_id: str) -> str:
+    import jwt
+
     now = datetime.now(timezone.utc)
     payload = {
         "sub": user_id,
@@ -40,6 +49,8 @@ def create_access_token(user_id: str) -> str:
 
 def decode_token(token: str) -> Optional[str]:
     """Return the user id from a valid token, or None if invalid/expired."""
+    import jwt
+
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
     except jwt.PyJWTError:
@@ -65,3 +76,17 @@ def get_current_user(token: Annotated[Optional[str], Depends(oauth2_scheme)]) ->
     if not user:
         raise _unauth
     return user
+
+
+def require_admin(
+    x_admin_token: Annotated[Optional[str], Header()] = None,
+) -> None:
+    """Gate /api/admin/* on the ADMIN_TOKEN shared secret (X-Admin-Token header).
+
+    With no ADMIN_TOKEN configured the admin surface is switched off entirely.
+    """
+    expected = settings.admin_token
+    if not expected or not x_admin_token or not hmac.compare_digest(
+        x_admin_token.encode("utf-8"), expected.encode("utf-8")
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
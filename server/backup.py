@@ -0,0 +1,280 @@
+"""Online database backups from inside the server, in small steps.
+
+`scripts/backup.sh` runs `sqlite3 .backup`, which copies the whole file in
+one go while holding a read lock, so the server's writers wait behind it.
+This does the same copy through SQLite's online backup API, BACKUP_STEP_PAGES
+pages at a time, sleeping BACKUP_STEP_SLEEP_MS between steps.
+
+- In WAL mode the copy reads from one pinned snapshot. Writers carry on
+  throughout, and the copy never restarts.
+- In rollback-journal mode a lock is held only for the length of one step.
+  If the server writes between steps, SQLite restarts the copy so the result
+  stays consistent. After BACKUP_MAX_RESTARTS restarts, the rest is copied in
+  a single step, so a busy server can't starve the backup forever.
+
+The copy goes to a temp file next to the output. It is then gzipped to
+`BACKUP_DIR/voip-<UTC stamp>.db.gz` a chunk at a time, fsynced and renamed
+into place. The backup API needs a real database to write into, so the
+copy can't be streamed into gzip: peak disk use in BACKUP_DIR is one
+uncompressed copy of the database plus the gzipped snapshot. The names match what `scripts/restore.sh` expects. Snapshots
+older than BACKUP_KEEP_DAYS are deleted, but the newest is always kept.
+
+With BACKUP_INTERVAL_S > 0, a background task runs one backup per interval.
+The schedule counts from the newest snapshot on disk, so a restart doesn't
+reset it. `POST /api/admin/backup` runs one now. With several workers on one
+database, a lock file in BACKUP_DIR lets only one of them back up at a time.
+Everything runs in a worker thread, never on the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import glob
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from .config import settings
+
+
+log = logging.getLogger("backup")
+
+_CHUNK = 1 << 20
+_RETRY_S = 60.0
+
+
+class _Restarted(Exception):
+    pass
+
+
+class BackupBusy(Exception):
+    """Another backup (in this process or another worker) is running."""
+
+
+class DbBackups:
+    def __init__(
+        self,
+        db_path: str,
+        directory: str,
+        *,
+        interval: float = 0.0,
+        keep_days: float = 14.0,
+        step_pages: int = 256,
+        step_sleep: float = 0.01,
+        max_restarts: int = 20,
+    ) -> None:
+        self.db_path = db_path
+        self.directory = directory
+        self.interval = interval
+        self.keep_days = keep_days
+        self.step_pages = max(step_pages, 1)
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        self._running = False
+        self._progress: dict[str, int] = {}
+        self._last: Optional[dict[str, Any]] = None
+        self._runs = 0
+        self._failures = 0
+        self._task: Optional[asyncio.Task[None]] = None
+
+    # -- one backup (worker thread) ---------------------------------------------------
+
+    def backup_now(self) -> dict[str, Any]:
+        """Write one snapshot and prune old ones. Blocking; run it off the loop."""
+        os.makedirs(self.directory, exist_ok=True)
+        lock = open(os.path.join(self.directory, ".backup.lock"), "a")
+        try:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise BackupBusy("another worker is writing a backup") from None
+            return self._backup_locked()
+        finally:
+            lock.close()
+
+    def _backup_locked(self) -> dict[str, Any]:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out = os.path.join(self.directory, f"voip-{stamp}.db.gz")
+        raw = out[: -len(".gz")] + ".tmp"
+        t0 = time.monotonic()
+        self._progress = {"pages": 0, "total": 0, "restarts": 0}
+        try:
+            pages = self._copy(raw)
+            copied = time.monotonic()
+            size = self._compress(raw, out)
+        finally:
+            for leftover in (raw, out + ".tmp"):
+                if os.path.exists(leftover):
+                    os.unlink(leftover)
+        done = time.monotonic()
+        pruned = self.prune()
+        result = {
+            "path": out,
+            "bytes": size,
+            "pages": pages,
+            "restarts": self._progress["restarts"],
+            "copy_s": round(copied - t0, 3),
+            "compress_s": round(done - copied, 3),
+            "duration_s": round(done - t0, 3),
+            "pages_per_s": round(pages / max(copied - t0, 1e-9)),
+            "pruned": pruned,
+            "finished_at": time.time(),
+        }
+        log.info("backup written", extra={"fields": result})
+        return result
+
+    def _copy(self, dest_path: str) -> int:
+        """Online-backup the database into `dest_path`. Returns the page count."""
+        progress = self._progress
+        last_remaining: Optional[int] = None
+
+        def step(status: int, remaining: int, total: int) -> None:
+            nonlocal last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                progress["restarts"] += 1      # a write landed between steps
+                if progress["restarts"] > self.max_restarts:
+                    raise _Restarted
+            last_remaining = remaining
+            progress["pages"] = total - remaining
+            progress["total"] = total
+            if remaining and self.step_sleep > 0:
+                time.sleep(self.step_sleep)    # no lock is held between steps
+
+        src = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            if src.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+                # Pin one read snapshot for the whole copy: under WAL it doesn't
+                # block writers, and the copy never has to restart.
+                src.execute("BEGIN")
+                src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            dest = sqlite3.connect(dest_path)
+            try:
+                try:
+                    src.backup(dest, pages=self.step_pages, progress=step)
+                except _Restarted:
+                    log.info("backup restarted %d times under writes; finishing in one step",
+                             progress["restarts"])
+                    src.backup(dest, pages=-1)
+                total = dest.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                dest.close()
+        finally:
+            src.close()
+        progress["pages"] = progress["total"] = total
+        return total
+
+    def _compress(self, raw: str, out: str) -> int:
+        tmp = out + ".tmp"
+        with open(raw, "rb") as src, open(tmp, "wb") as f:
+            with gzip.GzipFile(filename=os.path.basename(raw[: -len(".tmp")]), mode="wb",
+                               compresslevel=6, fileobj=f) as gz:
+                shutil.copyfileobj(src, gz, _CHUNK)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, out)
+        return os.path.getsize(out)
+
+    def snapshots(self) -> list[str]:
+        """Snapshot paths, oldest first (the names sort by time)."""
+        return sorted(glob.glob(os.path.join(self.directory, "voip-*.db.gz")))
+
+    def prune(self) -> int:
+        """Delete snapshots older than keep_days, always keeping the newest."""
+        if self.keep_days <= 0:
+            return 0
+        cutoff = time.time() - self.keep_days * 86400
+        removed = 0
+        for path in self.snapshots()[:-1]:
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    # -- scheduling (event loop) --------------------------------------------------------
+
+    async def run(self) -> dict[str, Any]:
+        """One backup from a worker thread. BackupBusy if one is already running."""
+        if self._running:
+            raise BackupBusy("a backup is already running")
+        self._running = True
+        try:
+            result = await asyncio.to_thread(self.backup_now)
+        except BackupBusy:
+            raise
+        except Exception as exc:
+            self._failures += 1
+            self._last = {"error": str(exc), "finished_at": time.time()}
+            raise
+        finally:
+            self._running = False
+        self._runs += 1
+        self._last = result
+        return result
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _next_due(self) -> float:
+        """Seconds until the next scheduled backup, from the newest snapshot's age."""
+        existing = self.snapshots()
+        if not existing:
+            return 0.0
+        try:
+            age = time.time() - os.path.getmtime(existing[-1])
+        except OSError:
+            return 0.0
+        return max(self.interval - age, 0.0)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(await asyncio.to_thread(self._next_due))
+            try:
+                await self.run()
+            except BackupBusy:
+                # Another worker has it; its snapshot pushes _next_due out.
+                await asyncio.sleep(min(self.interval, _RETRY_S))
+            except Exception as exc:  # noqa: BLE001
+                log.warning("scheduled backup failed: %s", exc)
+                await asyncio.sleep(min(self.interval, _RETRY_S))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "interval_s": self.interval,
+            "keep_days": self.keep_days,
+            "running": self._running,
+            "progress": dict(self._progress) if self._running else None,
+            "runs": self._runs,
+            "failures": self._failures,
+            "last": self._last,
+        }
+
+
+backups = DbBackups(
+    settings.db_path,
+    settings.backup_dir,
+    interval=settings.backup_interval_s,
+    keep_days=settings.backup_keep_days,
+    step_pages=settings.backup_step_pages,
+    step_sleep=settings.backup_step_sleep_ms / 1000,
+    max_restarts=settings.backup_max_restarts,
+)
@@ -0,0 +1,194 @@
+"""Cold start: process spawn to /api/ready and to the first /ws frame, with a budget.
+
+    python -m server.bench.cold_start [--runs 5] [--budget-ms 450] [--total-budget-ms 0]
+
+Starts the server the way the systemd unit does (`uvicorn server.main:app`
+with the signaling WebSocket protocol) against a fresh temp database, --runs
+times. For each run it records when /api/health first answers, when
+/api/ready turns 200, and when a /ws connection gets its first frame.
+
+Most of a cold start is Python and the framework importing themselves,
+which our code can't change. So the budget applies to the overhead: the
+median time to ready minus the median time `python -c "import uvicorn.main,
+fastapi"` takes on the same machine. The command exits 1 if that overhead
+passes --budget-ms (or if the absolute median passes --total-budget-ms,
+when set). It also prints the server's own phase timings
+(/api/admin/startup) and the slowest `server.*` imports.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Optional
+
+ADMIN_TOKEN = "bench-admin"
+JWT_SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _status(url: str, headers: Optional[dict[str, str]] = None) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {}),
+                                    timeout=1) as resp:
+            return resp.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    except OSError:
+        return None
+
+
+def _floor() -> float:
+    """Time for a bare `import uvicorn.main, fastapi` in a fresh interpreter."""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import uvicorn.main, fastapi"], check=True)
+    return time.perf_counter() - t0
+
+
+def _user_token(env: dict[str, str]) -> str:
+    """Create the database and one user in a child process; return their token."""
+    code = (
+        "from server import db\n"
+        "from server.auth import create_access_token\n"
+        "db.init_db()\n"
+        "u = db.create_user('bench', 'bench@example.com', '$2b$12$' + 'x' * 53)\n"
+        "db.close_writer()\n"
+        "print(create_access_token(u.id))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return out.strip().splitlines()[-1]
+
+
+def _one_run(env: dict[str, str], token: str, timeout: float) -> dict[str, float]:
+    from websockets.sync.client import connect
+
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    cmd = [sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(port),
+           "--ws", "server.ws.compression:SignalingWebSocketProtocol", "--log-level", "warning"]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    out: dict[str, float] = {}
+    try:
+        while "ready" not in out:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited: {proc.stderr.read().decode()[-2000:]}")  # type: ignore[union-attr]
+            if time.perf_counter() - t0 > timeout:
+                raise RuntimeError(f"not ready after {timeout}s")
+            status = _status(f"{base}/api/ready")
+            if status is not None and "health" not in out:
+                out["health"] = time.perf_counter() - t0   # serving, maybe not ready
+            if status == 200:
+                out["ready"] = time.perf_counter() - t0
+            else:
+                time.sleep(0.002)
+        with connect(f"ws://127.0.0.1:{port}/ws?token={token}") as ws:
+            ws.recv(timeout=10)
+            out["ws"] = time.perf_counter() - t0
+        for _ in range(500):
+            if _status(f"{base}/api/admin/startup", {"X-Admin-Token": ADMIN_TOKEN}) == 200:
+                break
+            time.sleep(0.01)
+        with urllib.request.urlopen(urllib.request.Request(
+                f"{base}/api/admin/startup", headers={"X-Admin-Token": ADMIN_TOKEN})) as resp:
+            out["server"] = json.loads(resp.read())  # type: ignore[assignment]
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return out
+
+
+def _slowest_imports(env: dict[str, str], n: int = 8) -> list[tuple[int, int, str]]:
+    """(self µs, cumulative µs, module) for the slowest server.* imports."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server.main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip().startswith("server"):
+            rows.append((int(parts[0].split(":")[1]), int(parts[1]), parts[2].strip()))
+    return sorted(rows, key=lambda r: -r[0])[:n]
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:7.0f} ms"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=450.0,
+                    help="max median (ready - framework import floor)")
+    ap.add_argument("--total-budget-ms", type=float, default=0.0,
+                    help="max median spawn-to-ready (0 = don't check)")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="voip-bench-")
+    env = dict(
+        os.environ,
+        DB_PATH=os.path.join(tmpdir, "bench.db"),
+        JWT_SECRET=JWT_SECRET,
+        ADMIN_TOKEN=ADMIN_TOKEN,
+        BACKUP_DIR=os.path.join(tmpdir, "backups"),
+    )
+    env.pop("NOTIFY_SOCKET", None)
+    try:
+        token = _user_token(env)
+        floors, runs = [], []
+        for _ in range(args.runs):     # interleaved, so machine noise hits both alike
+            floors.append(_floor())
+            runs.append(_one_run(env, token, args.timeout))
+        imports = _slowest_imports(env)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    med = {k: statistics.median(r[k] for r in runs) for k in ("health", "ready", "ws")}
+    floor = statistics.median(floors)
+    print(f"{args.runs} cold starts (median)")
+    print(f"  framework import floor  {_ms(floor)}")
+    print(f"  serving (/api/health)   {_ms(med['health'])}")
+    print(f"  ready (/api/ready 200)  {_ms(med['ready'])}")
+    print(f"  first /ws frame         {_ms(med['ws'])}")
+    server = runs[-1]["server"]
+    print("server phases (last run, ms): " + json.dumps(server))  # type: ignore[arg-type]
+    print("slowest server.* imports (self / cumulative):")
+    for self_us, cum_us, name in imports:
+        print(f"  {self_us / 1000:7.1f} ms {cum_us / 1000:7.1f} ms  {name}")
+
+    overhead = med["ready"] - floor
+    failed = overhead * 1000 > args.budget_ms
+    print(f"overhead over floor {overhead * 1000:.0f} ms (budget {args.budget_ms:.0f} ms)"
+          f"  {'OVER BUDGET' if failed else 'ok'}")
+    if args.total_budget_ms:
+        over = med["ready"] * 1000 > args.total_budget_ms
+        print(f"spawn to ready {med['ready'] * 1000:.0f} ms "
+              f"(budget {args.total_budget_ms:.0f} ms)  {'OVER BUDGET' if over else 'ok'}")
+        failed = failed or over
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Memory cost per idle /ws connection and per room member.
+
+    python -m server.bench.connection_memory [--connections 100000] [--room-size 4]
+
+Opens N idle sessions through the real `ws_endpoint` (auth, register,
+roster, inbox, heartbeat tracking), then puts every user in a room of
+`--room-size`. It reports the growth in RSS and in tracemalloc-traced bytes
+for each step, divided by N.
+
+The sockets are stand-ins that never receive anything. So the numbers cover
+what this server keeps per session: the endpoint coroutine,
+ConnectionManager and heartbeat entries, profiles, the contact cache and the
+pipeline inbox. They leave out uvicorn's protocol object and the kernel's
+socket buffers, which don't depend on our code.
+
+RSS and tracemalloc are measured in separate child processes, because
+tracemalloc's own bookkeeping inflates RSS.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Budgets in tracemalloc bytes, checked against the result. Before the
+# compaction work an idle connection cost ~4.8 KB and a room member ~150 B.
+TARGET_BYTES_PER_CONNECTION = 2560
+TARGET_BYTES_PER_MEMBER = 256
+
+
+def _rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _populate(path: str, users: int) -> list[str]:
+    ids = [f"{i:08x}-0000-4000-8000-{i:012x}" for i in range(users)]
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+        (
+            (uid, f"user{i}", f"user{i}@example.com",
+             "$2b$12$" + "x" * 53, "2026-01-01T00:00:00+00:00")
+            for i, uid in enumerate(ids)
+        ),
+    )
+    conn.commit()
+    conn.close()
+    return ids
+
+
+class _IdleSocket:
+    """Just enough of starlette's WebSocket for `ws_endpoint`; never receives."""
+
+    __slots__ = ("query_params", "_closed")
+
+    def __init__(self, token: str) -> None:
+        self.query_params = {"token": token}
+        self._closed: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        pass
+
+    async def receive_text(self) -> str:
+        from starlette.websockets import WebSocketDisconnect
+
+        await self._closed
+        raise WebSocketDisconnect(1000)
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+
+def _measure(traced: bool):  # type: ignore[no-untyped-def]
+    if traced:
+        return tracemalloc.get_traced_memory()[0]
+    return _rss()
+
+
+async def _scenario(args: argparse.Namespace, ids: list[str]) -> dict[str, float]:
+    from server.auth import create_access_token
+    from server.ws import signaling
+
+    manager = signaling.manager
+    if manager.pipeline is not None:
+        manager.pipeline.start()
+    tokens = [create_access_token(uid) for uid in ids]
+    loop = asyncio.get_running_loop()
+    sockets: list[_IdleSocket] = []
+    tasks: list[asyncio.Task[None]] = []
+
+    gc.collect()
+    if args.mode == "traced":
+        tracemalloc.start()
+    base = _measure(args.mode == "traced")
+    t0 = time.perf_counter()
+    for i, token in enumerate(tokens):
+        ws = _IdleSocket(token)
+        sockets.append(ws)
+        tasks.append(loop.create_task(signaling.ws_endpoint(ws)))  # type: ignore[arg-type]
+        if i % 1000 == 999:
+            await asyncio.sleep(0)
+    while manager.local_count() < len(tokens):
+        await asyncio.sleep(0.01)
+    for _ in range(10):
+        await asyncio.sleep(0)
+    connect_s = time.perf_counter() - t0
+    gc.collect()
+    connected = _measure(args.mode == "traced")
+
+    size = max(args.room_size, 1)
+    for start in range(0, len(ids), size):
+        code = await manager.create_room(f"bench-{start // size}")
+        for uid in ids[start:start + size]:
+            await manager.join_room(code, uid)
+    gc.collect()
+    in_rooms = _measure(args.mode == "traced")
+
+    for ws in sockets:
+        await ws.close()
+    await asyncio.gather(*tasks)
+    if manager.pipeline is not None:
+        await manager.pipeline.stop()
+    n = len(ids)
+    return {
+        "connections": n,
+        "connect_s": round(connect_s, 2),
+        "per_connection": (connected - base) / n,
+        "per_member": (in_rooms - connected) / n,
+    }
+
+
+def _child(args: argparse.Namespace) -> None:
+    tmpdir = tempfile.mkdtemp(prefix="voip-bench-")
+    os.environ["DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    os.environ.setdefault("JWT_SECRET", "bench-secret-bench-secret-bench-secret")
+    os.environ.setdefault("CDR_ENABLED", "0")
+    os.environ.setdefault("ROOM_SNAPSHOT_INTERVAL_S", "0")
+    # Every session connects at once; admission control would turn most away.
+    os.environ.setdefault("WS_ADMIT_MAX_HANDSHAKES", "0")
+    os.environ.setdefault("WS_ADMIT_MAX_LAG_MS", "0")
+    try:
+        from server import db
+
+        db.init_db()
+        ids = _populate(db.settings.db_path, args.connections)
+        result = asyncio.run(_scenario(args, ids))
+        print(json.dumps(result))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _run_child(args: argparse.Namespace, mode: str) -> dict[str, float]:
+    cmd = [sys.executable, "-m", "server.bench.connection_memory",
+           "--connections", str(args.connections), "--room-size", str(args.room_size),
+           "--mode", mode]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--connections", type=int, default=100_000)
+    ap.add_argument("--room-size", type=int, default=4)
+    ap.add_argument("--mode", choices=("rss", "traced"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.mode:
+        _child(args)
+        return
+
+    rss = _run_child(args, "rss")
+    traced = _run_child(args, "traced")
+    print(f"{args.connections:,} idle connections (connected in {rss['connect_s']}s), "
+          f"rooms of {args.room_size}")
+    print(f"{'':<16}{'RSS':>12}{'traced':>12}{'target':>12}")
+    for label, key, target in (
+        ("per connection", "per_connection", TARGET_BYTES_PER_CONNECTION),
+        ("per member", "per_member", TARGET_BYTES_PER_MEMBER),
+    ):
+        verdict = "ok" if traced[key] <= target else "OVER"
+        print(f"{label:<16}{rss[key]:>10.0f} B{traced[key]:>10.0f} B{target:>10d} B  {verdict}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Login lookup cost before/after the lower(email) index (migration 2).
+
+    python -m server.bench.login_lookup [--users 1000000] [--lookups 2000]
+
+Builds a throwaway database at schema version 1, times email logins through
+`find_user_by_identifier`, applies the remaining migrations and times them again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+
+def _populate(path: str, users: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    rows = (
+        (f"id-{i}", f"user{i}", f"User{i}@Example.com", "x", "2026-01-01T00:00:00+00:00")
+        for i in range(users)
+    )
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def _time_lookups(db, users: int, lookups: int) -> list[float]:  # type: ignore[no-untyped-def]
+    rng = random.Random(42)
+    samples = []
+    for _ in range(lookups):
+        ident = f"user{rng.randrange(users)}@example.COM"
+        t0 = time.perf_counter()
+        found = db.find_user_by_identifier(ident)
+        samples.append(time.perf_counter() - t0)
+        assert found is not None
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    q = statistics.quantiles(samples, n=100)
+    print(
+        f"{label:<8} p50 {q[49] * 1e3:9.3f} ms   p99 {q[98] * 1e3:9.3f} ms   "
+        f"{len(samples) / sum(samples):10.0f} lookups/s"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--users", type=int, default=1_000_000)
+    ap.add_argument("--lookups", type=int, default=2000)
+    ap.add_argument("--before-lookups", type=int, default=50,
+                    help="full scans are slow; sample fewer of them")
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="voip-bench-")
+    os.environ["DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    try:
+        _run(args)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _run(args: argparse.Namespace) -> None:
+    from server import db  # reads DB_PATH at import
+
+    conn = db._connect()
+    db.migrate(conn, target=1)
+    conn.close()
+    t0 = time.perf_counter()
+    _populate(db.settings.db_path, args.users)
+    print(f"populated {args.users:,} users in {time.perf_counter() - t0:.1f}s")
+
+    _report("before", _time_lookups(db, args.users, args.before_lookups))
+    t0 = time.perf_counter()
+    conn = db._connect()
+    db.migrate(conn)
+    conn.close()
+    print(f"migrated to v{db.MIGRATIONS[-1][0]} in {time.perf_counter() - t0:.1f}s")
+    _report("after", _time_lookups(db, args.users, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
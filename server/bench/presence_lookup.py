@@ -0,0 +1,67 @@
+"""Presence lookups in the shared table vs the per-worker dict.
+
+    python -m server.bench.presence_lookup [--online 100000] [--slots 262144] [--lookups 200000]
+
+Fills a throwaway shared table (ws/shared_presence.py) to the given occupancy,
+then times `owner()` for hits and misses, alongside a plain dict membership
+test (what one worker sees without the table) for scale.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+def _per_lookup(fn, keys: list[str]) -> float:  # type: ignore[no-untyped-def]
+    t0 = time.perf_counter()
+    for k in keys:
+        fn(k)
+    return (time.perf_counter() - t0) / len(keys)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--online", type=int, default=100_000)
+    ap.add_argument("--slots", type=int, default=262_144)
+    ap.add_argument("--lookups", type=int, default=200_000)
+    args = ap.parse_args()
+
+    from server.ws.shared_presence import SharedPresence
+
+    tmpdir = tempfile.mkdtemp(prefix="voip-bench-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    try:
+        table = SharedPresence(os.path.join(tmpdir, "presence"), args.slots)
+        ids = [f"{i:08x}-0000-4000-8000-{i:012x}" for i in range(args.online)]
+        t0 = time.perf_counter()
+        for user_id in ids:
+            table.add(user_id)
+        fill = time.perf_counter() - t0
+        print(f"registered {args.online:,} users in {fill:.2f}s "
+              f"({fill / args.online * 1e6:.1f} µs/add, {args.online / args.slots:.0%} full)")
+
+        rng = random.Random(42)
+        hits = [rng.choice(ids) for _ in range(args.lookups)]
+        misses = [f"missing-{i}" for i in range(args.lookups)]
+        local = set(ids)
+        for label, fn, keys in (
+            ("shm hit", table.owner, hits),
+            ("shm miss", table.owner, misses),
+            ("dict hit", local.__contains__, hits),
+        ):
+            print(f"{label:<9} {_per_lookup(fn, keys) * 1e6:8.3f} µs/lookup")
+
+        t0 = time.perf_counter()
+        n = len(table.online_ids())
+        print(f"online_ids() scan of {args.slots:,} slots: {(time.perf_counter() - t0) * 1e3:.1f} ms ({n:,} live)")
+        table.close()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
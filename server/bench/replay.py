@@ -0,0 +1,270 @@
+"""Replay a recorded /ws traffic shape against a running server, sped up.
+
+    python -m server.bench.replay RECORDING [--url http://127.0.0.1:8000] [--speed 10] [--segment 0]
+
+Reads a file written with WS_RECORD_PATH (see ws/recorder.py). Each user in
+the recording gets a throwaway account. Their connects, disconnects and
+inbound frames are then re-driven at the recorded offsets divided by
+--speed (1-100x). A frame keeps its type, addressee, room and size, but the
+payload is filler. A room the server named is given a fixed code, so later
+joins by other users still land in the same room.
+
+It reports how far the replayer fell behind its schedule, how many messages
+were sent and received per second, and the sender-to-addressee relay latency
+for the per-peer types (call-request, offer, answer, ...). It also compares
+how many messages the server sent with how many it sent in the recording. Run
+it against a local server, since it signs up one account per recorded user.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import secrets
+import statistics
+import time
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from server.ws.recorder import CONNECT, DISCONNECT, IN, OUT, ROOM, ROOM_BIT, Record, read_recording
+
+RELAYED = {"call-request", "call-response", "offer", "answer", "ice-candidate", "hang-up"}
+
+
+def _signup(base: str, username: str) -> tuple[str, str]:
+    body = json.dumps({
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": secrets.token_hex(8),
+    }).encode()
+    req = urllib.request.Request(
+        f"{base}/api/auth/signup", data=body, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        out = json.loads(resp.read())
+    return out["user"]["id"], out["access_token"]
+
+
+def _link_created_rooms(records: list[Record]) -> list[Record]:
+    """Give each code-less room-create the room alias of the ROOM record after it."""
+    waiting: dict[int, int] = {}
+    out = list(records)
+    for i, rec in enumerate(out):
+        if rec.event == IN and rec.type == "room-create" and not rec.peer:
+            waiting[rec.user] = i
+        elif rec.event == ROOM and rec.user in waiting:
+            j = waiting.pop(rec.user)
+            out[j] = out[j]._replace(peer=rec.peer)
+    return out
+
+
+def _payload(rec: Record, user_ids: dict[int, str], rooms: dict[int, str]) -> str:
+    """A frame of `rec.type` to the same addressee/room, padded to `rec.size` bytes."""
+    msg: dict[str, Any] = {"type": rec.type}
+    data: dict[str, Any] = {}
+    if rec.peer & ROOM_BIT:
+        data["code"] = rooms[rec.peer & ~ROOM_BIT]
+    elif rec.peer and rec.peer in user_ids:
+        msg["to"] = user_ids[rec.peer]
+    if rec.type in ("offer", "answer"):
+        data.update(type=rec.type, sdp="v=0\r\n")
+    elif rec.type == "ice-candidate":
+        data.update(candidate="candidate:replay", sdpMid="0")
+    elif rec.type == "call-response":
+        data["accepted"] = True
+    msg["data"] = data
+    text = json.dumps(msg)
+    short = rec.size - len(text) - len(', "pad": ""')
+    if short > 0:
+        data["pad"] = "x" * short
+        text = json.dumps(msg)
+    return text
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.sent = 0
+        self.received = 0
+        self.failed_connects = 0
+        self.send_errors = 0
+        self.max_lag = 0.0
+        self.latencies: list[float] = []
+        # (from id, to id, type) → send times still waiting for delivery
+        self.in_flight: dict[tuple[str, str, str], deque[float]] = {}
+        self.received_types: Counter[str] = Counter()
+
+
+class _Client:
+    def __init__(self, user_id: str, token: str, url: str, stats: _Stats) -> None:
+        self.user_id = user_id
+        self.token = token
+        self.url = url
+        self.stats = stats
+        self.ws: Any = None
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task[None]] = None
+
+    def connect(self) -> None:
+        if self.task is None or self.task.done():
+            self.ready = asyncio.Event()
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        from websockets.asyncio.client import connect
+
+        try:
+            async with connect(f"{self.url}/ws?token={self.token}", max_size=None) as ws:
+                self.ws = ws
+                self.ready.set()
+                async for raw in ws:
+                    self._received(raw)
+        except Exception:  # noqa: BLE001
+            if not self.ready.is_set():
+                self.stats.failed_connects += 1
+        finally:
+            self.ws = None
+
+    def _received(self, raw: Any) -> None:
+        now = time.perf_counter()
+        stats = self.stats
+        stats.received += 1
+        msg = json.loads(raw)
+        kind = msg.get("type")
+        stats.received_types[kind] += 1
+        if kind in RELAYED and "from" in msg:
+            waiting = stats.in_flight.get((msg["from"], self.user_id, kind))
+            if waiting:
+                stats.latencies.append(now - waiting.popleft())
+
+    async def send(self, text: str, to: Optional[str], kind: str) -> None:
+        try:
+            await asyncio.wait_for(self.ready.wait(), 10)
+            if self.ws is None:
+                return
+            if to is not None and kind in RELAYED:
+                self.stats.in_flight.setdefault((self.user_id, to, kind), deque()).append(
+                    time.perf_counter()
+                )
+            await self.ws.send(text)
+            self.stats.sent += 1
+        except Exception:  # noqa: BLE001
+            self.stats.send_errors += 1
+
+    async def close(self) -> None:
+        if self.ws is not None:
+            await self.ws.close()
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+
+
+async def _replay(records: list[Record], clients: dict[int, _Client], rooms: dict[int, str],
+                  speed: float, settle: float) -> tuple[_Stats, float]:
+    stats = next(iter(clients.values())).stats
+    user_ids = {alias: c.user_id for alias, c in clients.items()}
+    loop = asyncio.get_running_loop()
+    pending: set[asyncio.Task[None]] = set()
+    start = loop.time()
+    origin = records[0].t                    # skip the idle time before the first event
+    for rec in records:
+        delay = start + (rec.t - origin) / speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            stats.max_lag = max(stats.max_lag, -delay)
+        client = clients[rec.user]
+        if rec.event == CONNECT:
+            client.connect()
+        elif rec.event == DISCONNECT:
+            task = asyncio.create_task(client.close())
+        elif rec.event == IN:
+            to = user_ids.get(rec.peer) if rec.peer and not rec.peer & ROOM_BIT else None
+            task = asyncio.create_task(client.send(_payload(rec, user_ids, rooms), to, rec.type))
+        else:
+            continue
+        if rec.event != CONNECT:
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    await asyncio.gather(*pending)
+    await asyncio.sleep(settle)
+    wall = loop.time() - start
+    await asyncio.gather(*(c.close() for c in clients.values()))
+    return stats, wall
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("recording")
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--speed", type=float, default=10.0)
+    ap.add_argument("--segment", type=int, default=0)
+    ap.add_argument("--settle", type=float, default=2.0,
+                    help="seconds to wait for in-flight deliveries at the end")
+    args = ap.parse_args()
+    if not 1 <= args.speed <= 100:
+        ap.error("--speed must be between 1 and 100")
+
+    records = [r for r in read_recording(args.recording) if r.segment == args.segment]
+    if not records:
+        ap.error(f"segment {args.segment} is empty or missing")
+    records = _link_created_rooms(records)
+    aliases = sorted({r.user for r in records if r.event in (CONNECT, DISCONNECT, IN)})
+    inbound = sum(r.event == IN for r in records)
+    recorded_out: Counter[str] = Counter(r.type for r in records if r.event == OUT)
+    duration = records[-1].t - records[0].t
+    print(f"segment {args.segment}: {len(aliases)} users, {inbound} inbound and "
+          f"{sum(recorded_out.values())} outbound messages over {duration:.1f}s")
+
+    run = secrets.token_hex(3)
+    base = args.url.rstrip("/")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        accounts = list(pool.map(lambda a: _signup(base, f"rp{run}_{a}"), aliases))
+    print(f"signed up {len(accounts)} replay users in {time.perf_counter() - t0:.1f}s")
+
+    ws_url = "ws" + base[len("http"):] if base.startswith("http") else base
+    rooms = {
+        r.peer & ~ROOM_BIT: f"rp{run}-{r.peer & ~ROOM_BIT}"
+        for r in records if r.peer & ROOM_BIT
+    }
+
+    async def go() -> tuple[_Stats, float]:
+        stats = _Stats()
+        clients = {
+            alias: _Client(uid, token, ws_url, stats)
+            for alias, (uid, token) in zip(aliases, accounts)
+        }
+        return await _replay([r for r in records if r.user in clients], clients, rooms,
+                             args.speed, args.settle)
+
+    stats, wall = asyncio.run(go())
+    active = max(wall - args.settle, 1e-9)
+    print(f"replayed at {args.speed:g}x in {wall:.1f}s "
+          f"(effective {duration / active:.1f}x), max schedule lag {_ms(stats.max_lag)}")
+    print(f"sent {stats.sent} ({stats.sent / active:.0f}/s), received {stats.received} "
+          f"({stats.received / active:.0f}/s); recorded server sends: "
+          f"{sum(recorded_out.values())}")
+    if stats.latencies:
+        lat = sorted(stats.latencies)
+        q = statistics.quantiles(lat, n=100) if len(lat) > 1 else [lat[0]] * 99
+        print(f"relay latency (n={len(lat)}): p50 {_ms(q[49])}  p95 {_ms(q[94])}  "
+              f"p99 {_ms(q[98])}  max {_ms(lat[-1])}")
+    undelivered = sum(len(q) for q in stats.in_flight.values())
+    print(f"undelivered relays {undelivered}, send errors {stats.send_errors}, "
+          f"failed connects {stats.failed_connects}")
+    drift = {
+        kind: (stats.received_types[kind], n)
+        for kind, n in recorded_out.most_common(8)
+    }
+    print("server sends by type (replay / recording): "
+          + ", ".join(f"{k} {a}/{b}" for k, (a, b) in drift.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Signup burst throughput: group commit vs one transaction per user.
+
+    python -m server.bench.signup_burst [--signups 5000] [--threads 64]
+
+Drives `create_user` from a thread pool (the same way FastAPI runs the sync
+signup route) against a throwaway database, once with the writer forced to
+batches of one (the old behaviour) and once with the configured batching.
+bcrypt is left out: it runs before the insert and would dominate both runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _burst(db, label: str, writer, signups: int, threads: int) -> None:  # type: ignore[no-untyped-def]
+    db.close_writer()
+    db._writer = writer
+
+    def one(i: int) -> None:
+        db.create_user(f"{label}{i}", f"{label}{i}@example.com", "x")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(signups)))
+    elapsed = time.perf_counter() - t0
+    writer.close()
+    print(
+        f"{label:<8} {signups / elapsed:9.0f} signups/s   "
+        f"{writer.batches:6d} commits   {writer.rows / max(writer.batches, 1):6.1f} rows/commit"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--signups", type=int, default=5000)
+    ap.add_argument("--threads", type=int, default=64)
+    ap.add_argument("--batch-max", type=int, default=None)
+    ap.add_argument("--batch-wait-ms", type=float, default=None)
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="voip-bench-")
+    os.environ["DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    try:
+        from server import db  # reads DB_PATH at import
+
+        db.init_db()
+        batch_max = args.batch_max or db.settings.user_write_batch_max
+        wait_ms = (
+            args.batch_wait_ms
+            if args.batch_wait_ms is not None
+            else db.settings.user_write_batch_wait_ms
+        )
+        _burst(db, "single", db.UserWriter(1, 0), args.signups, args.threads)
+        _burst(db, "batched", db.UserWriter(batch_max, wait_ms), args.signups, args.threads)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Typeahead latency of /api/users/search at 1M users.
+
+    python -m server.bench.user_search [--users 1000000] [--typers 2000]
+
+Fills a throwaway database with syllable-built usernames, so prefixes fan
+out unevenly, like real names. Then it replays "typing": for each of
+--typers random users, one search per keystroke of their username, through
+`user_search.search`. This runs once with the prefix cache off (every
+keystroke is an index range scan) and once with it on (short prefixes are
+served from memory). For comparison it times a few naive `LIKE '%q%'`
+queries, each with a deep OFFSET page, and paging through one broad prefix
+with the cursor.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+_SYLLABLES = ["al", "an", "ba", "be", "ca", "da", "el", "fa", "ga", "ha", "is", "jo", "ka",
+              "la", "ma", "mi", "na", "no", "ol", "pa", "ra", "ri", "sa", "so", "ta", "to",
+              "ul", "va", "xe", "ya", "zo"]
+
+
+def _username(rng: random.Random, i: int) -> str:
+    stem = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return f"{stem}{i}"
+
+
+def _populate(path: str, users: int) -> list[str]:
+    rng = random.Random(7)
+    names = [_username(rng, i) for i in range(users)]
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+        (
+            (f"id-{i}", name, f"{name}@example.com", "x", "2026-01-01T00:00:00+00:00")
+            for i, name in enumerate(names)
+        ),
+    )
+    conn.commit()
+    conn.close()
+    return names
+
+
+def _quantiles(samples: list[float]) -> str:
+    q = statistics.quantiles(samples, n=100)
+    return (f"p50 {q[49] * 1e3:7.3f} ms  p95 {q[94] * 1e3:7.3f} ms  "
+            f"p99 {q[98] * 1e3:7.3f} ms  max {max(samples) * 1e3:7.3f} ms")
+
+
+def _type(search, names: list[str], typers: int,  # type: ignore[no-untyped-def]
+          seed: int) -> tuple[list[float], list[float]]:
+    """Latencies of all keystrokes, and of just the first three of each name."""
+    rng = random.Random(seed)
+    samples, short = [], []
+    for _ in range(typers):
+        name = rng.choice(names)
+        for i in range(1, len(name) + 1):
+            t0 = time.perf_counter()
+            users, _ = search(name[:i], 20)
+            dt = time.perf_counter() - t0
+            samples.append(dt)
+            if i <= 3:
+                short.append(dt)
+            assert users
+    return samples, short
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--users", type=int, default=1_000_000)
+    ap.add_argument("--typers", type=int, default=2000)
+    ap.add_argument("--like-queries", type=int, default=20)
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="voip-bench-")
+    os.environ["DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    try:
+        from server import db, user_search
+
+        db.init_db()
+        t0 = time.perf_counter()
+        names = _populate(db.settings.db_path, args.users)
+        print(f"{args.users:,} users in {time.perf_counter() - t0:.1f}s")
+
+        user_search.cache.size = 0
+        cold, cold_short = _type(user_search.search, names, args.typers, seed=1)
+        user_search.cache.size = 4096
+        _type(user_search.search, names, args.typers, seed=2)          # warm up
+        warm, warm_short = _type(user_search.search, names, args.typers, seed=1)
+        hit = user_search.cache.stats()["hit_rate"]
+        for label, samples in (("no cache", cold), ("cached", warm),
+                               ("no cache, first 3 keys", cold_short),
+                               ("cached, first 3 keys", warm_short)):
+            print(f"{label:<24}{len(samples):>7} searches  {_quantiles(samples)}")
+        print(f"cache hit rate {hit} (prefixes up to {user_search.CACHE_MAX_PREFIX} chars)")
+
+        rng = random.Random(3)
+        like = []
+        conn = sqlite3.connect(db.settings.db_path)
+        for _ in range(args.like_queries):
+            q = rng.choice(names)[:3]
+            t0 = time.perf_counter()
+            conn.execute("SELECT * FROM users WHERE username LIKE ? OR email LIKE ? LIMIT 20",
+                         (f"%{q}%", f"%{q}%")).fetchall()
+            conn.execute("SELECT * FROM users WHERE username LIKE ? LIMIT 20 OFFSET 100000",
+                         (f"%{q}%",)).fetchall()
+            like.append(time.perf_counter() - t0)
+        conn.close()
+        print(f"{'LIKE %q% + OFFSET':<24}{len(like):>7} queries   "
+              f"p50 {statistics.median(like) * 1e3:7.1f} ms (no index can serve either)")
+
+        pages = 0
+        cursor = None
+        t0 = time.perf_counter()
+        while pages < 500:
+            _, cursor = user_search.search("ma", 50, cursor)
+            pages += 1
+            if cursor is None:
+                break
+        per_page = (time.perf_counter() - t0) / pages
+        print(f"cursor: {pages} pages of 50 under 'ma', {per_page * 1e3:.3f} ms per page")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
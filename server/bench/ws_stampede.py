@@ -0,0 +1,239 @@
+"""Relay latency for established calls during a /ws reconnect stampede.
+
+    python -m server.bench.ws_stampede [--established 200] [--stampede 5000]
+
+Opens --established sessions through the real `ws_endpoint` and pairs
+them up. Each pair trades an `ice-candidate` every --probe-ms, and the bench
+times how long each one takes to reach the peer, counted from when it was
+due to be sent. Then --stampede new sockets
+connect all at once, like every client of a restarted peer worker coming
+back together. Each one goes through admission, auth, register and the
+roster broadcast.
+
+This runs twice, in separate processes: once with admission control off, and
+once with the configured WS_ADMIT_* settings (defaults unless set in the
+environment). Refused clients retry after their hint, scaled by
+--retry-scale, as the web client would. For each run the bench reports
+relay latency during the stampede, how long until every stampeding client
+was connected, and how many refusals that took.
+
+The sockets are in-process stand-ins, so the numbers cover this server's
+own event-loop work, not the network or uvicorn.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+
+def _populate(path: str, users: int) -> list[str]:
+    ids = [f"{i:08x}-0000-4000-8000-{i:012x}" for i in range(users)]
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+        (
+            (uid, f"user{i}", f"user{i}@example.com",
+             "$2b$12$" + "x" * 53, "2026-01-01T00:00:00+00:00")
+            for i, uid in enumerate(ids)
+        ),
+    )
+    conn.commit()
+    conn.close()
+    return ids
+
+
+class _Socket:
+    """Enough of starlette's WebSocket for `ws_endpoint`, with a scripted inbox."""
+
+    def __init__(self, token: str, on_text: Callable[[str], None]) -> None:
+        loop = asyncio.get_running_loop()
+        self.query_params = {"token": token}
+        self.inbox: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        self.welcomed: asyncio.Future[Optional[str]] = loop.create_future()
+        self._on_text = on_text
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        if not self.welcomed.done() and '"websocket-connected"' in data:
+            self.welcomed.set_result(None)
+        self._on_text(data)
+
+    async def receive_text(self) -> str:
+        from starlette.websockets import WebSocketDisconnect
+
+        item = await self.inbox.get()
+        if item is None:
+            raise WebSocketDisconnect(1000)
+        return item
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        if not self.welcomed.done():
+            self.welcomed.set_result(reason if code == 1013 else f"closed {code}")
+        self.inbox.put_nowait(None)
+
+
+async def _scenario(args: argparse.Namespace, ids: list[str]) -> dict[str, Any]:
+    from server.auth import create_access_token
+    from server.loopmon import monitor
+    from server.ws import signaling
+
+    manager = signaling.manager
+    if manager.pipeline is not None:
+        manager.pipeline.start()
+    monitor.start()
+    loop = asyncio.get_running_loop()
+    tokens = [create_access_token(uid) for uid in ids]
+    established, stampede = ids[: args.established], tokens[args.established:]
+    quiet: list[float] = []
+    latencies: list[float] = []
+    recording: Optional[list[float]] = None
+
+    def on_probe(data: str) -> None:
+        if recording is not None and '"ice-candidate"' in data:
+            recording.append(time.perf_counter() - json.loads(data)["data"]["t"])
+
+    tasks, sockets = [], []
+    for token in tokens[: args.established]:
+        ws = _Socket(token, on_probe)
+        sockets.append(ws)
+        tasks.append(loop.create_task(signaling.ws_endpoint(ws)))  # type: ignore[arg-type]
+    await asyncio.gather(*(ws.welcomed for ws in sockets))
+
+    stop = asyncio.Event()
+
+    async def probe(ws: _Socket, peer: str) -> None:
+        # Stamped with when it was due, not when the starved task got to it,
+        # so a stalled loop shows up as latency instead of as missing samples.
+        due = time.perf_counter()
+        while not stop.is_set():
+            ws.inbox.put_nowait(json.dumps({
+                "type": "ice-candidate", "to": peer, "data": {"t": due},
+            }))
+            due += args.probe_ms / 1000
+            await asyncio.sleep(max(due - time.perf_counter(), 0.0))
+
+    probes = [
+        loop.create_task(probe(sockets[i], established[i ^ 1]))
+        for i in range(len(sockets) - len(sockets) % 2)
+    ]
+    await asyncio.sleep(0.2)
+    recording = quiet
+    await asyncio.sleep(1.0)
+    recording = latencies
+    refusals = 0
+
+    async def client(token: str) -> None:
+        nonlocal refusals
+        while True:
+            ws = _Socket(token, lambda _: None)
+            task = loop.create_task(signaling.ws_endpoint(ws))  # type: ignore[arg-type]
+            refused = await ws.welcomed
+            if refused is None:
+                tasks.append(task)
+                sockets.append(ws)
+                return
+            await task
+            refusals += 1
+            hint = re.search(r"retry-after-ms=(\d+)", refused)
+            await asyncio.sleep(int(hint.group(1)) / 1000 * args.retry_scale if hint else 1.0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(token) for token in stampede))
+    converged = time.perf_counter() - t0
+    recording = None
+    stop.set()
+    await asyncio.gather(*probes)
+    for ws in sockets:
+        await ws.close()
+    await asyncio.gather(*tasks)
+    await monitor.stop()
+    if manager.pipeline is not None:
+        await manager.pipeline.stop()
+
+    return {
+        "quiet": _latency(quiet),
+        "stampede": _latency(latencies),
+        "converged_s": round(converged, 2),
+        "refusals": refusals,
+        "admission": manager.admission.stats(),
+    }
+
+
+def _latency(samples: list[float]) -> dict[str, float]:
+    q = statistics.quantiles(samples, n=100) if len(samples) > 1 else [0.0] * 99
+    return {
+        "probes": len(samples),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+        "max_ms": round(max(samples, default=0.0) * 1000, 2),
+    }
+
+
+def _child(args: argparse.Namespace) -> None:
+    tmpdir = tempfile.mkdtemp(prefix="voip-bench-")
+    os.environ["DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    os.environ.setdefault("JWT_SECRET", "bench-secret-bench-secret-bench-secret")
+    os.environ.setdefault("CDR_ENABLED", "0")
+    os.environ.setdefault("ROOM_SNAPSHOT_INTERVAL_S", "0")
+    if args.mode == "off":
+        os.environ.update(WS_ADMIT_MAX_LAG_MS="0", WS_ADMIT_MAX_HANDSHAKES="0",
+                          WS_MAX_CONNECTIONS="0")
+    try:
+        from server import db
+
+        db.init_db()
+        ids = _populate(db.settings.db_path, args.established + args.stampede)
+        print(json.dumps(asyncio.run(_scenario(args, ids))))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--established", type=int, default=200)
+    ap.add_argument("--stampede", type=int, default=5000)
+    ap.add_argument("--probe-ms", type=float, default=20.0)
+    ap.add_argument("--retry-scale", type=float, default=0.1,
+                    help="multiply retry hints by this, to keep the run short")
+    ap.add_argument("--mode", choices=("off", "on"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.mode:
+        _child(args)
+        return
+
+    print(f"{args.established} established sessions, {args.stampede:,} connecting at once")
+    print(f"{'admission':<16}{'probes':>8}{'p50':>10}{'p99':>10}{'max':>10}"
+          f"{'all in':>9}{'refusals':>10}")
+    for mode in ("off", "on"):
+        cmd = [sys.executable, "-m", "server.bench.ws_stampede", "--mode", mode,
+               "--established", str(args.established), "--stampede", str(args.stampede),
+               "--probe-ms", str(args.probe_ms), "--retry-scale", str(args.retry_scale)]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        for label, lat, tail in (
+            (f"{mode}, quiet", r["quiet"], ""),
+            (f"{mode}, stampede", r["stampede"], f"{r['converged_s']:>8.2f}s{r['refusals']:>10}"),
+        ):
+            print(f"{label:<16}{lat['probes']:>8}{lat['p50_ms']:>8.2f}ms{lat['p99_ms']:>8.2f}ms"
+                  f"{lat['max_ms']:>8.1f}ms{tail}")
+        if mode == "on":
+            print(f"refused by reason: {r['admission']['refused']}, "
+                  f"delayed for a slot: {r['admission']['delayed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Call-detail records: what calls and rooms happened, when, and with whom.
+
+Signaling calls `cdr.record(...)` for call-request / call-response / hang-up
+and room-join / room-leave. `record` is a plain synchronous deque append — no
+I/O, no await — so it can't add latency to `_route`. A background task drains
+the buffer every CDR_FLUSH_INTERVAL_S (sooner if it fills past half) and writes
+the batch to the `cdr_events` table from a worker thread.
+
+The buffer is a bounded ring: if the flusher falls behind, the oldest unflushed
+events are dropped and counted rather than letting memory grow without limit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Iterable, Iterator, Optional
+
+from .config import settings
+from .db import insert_cdr_events, query_cdr_events
+
+
+log = logging.getLogger("cdr")
+
+CDR_KINDS = ("call-request", "call-response", "hang-up", "room-join", "room-leave")
+
+
+class CdrLog:
+    def __init__(self, capacity: int, flush_interval: float, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._buffer: deque[tuple[Any, ...]] = deque(maxlen=capacity)
+        self._recorded = 0
+        self._written = 0
+        self._task: Optional[asyncio.Task[None]] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    def record(
+        self,
+        kind: str,
+        user_id: str,
+        *,
+        peer_id: Optional[str] = None,
+        room: Optional[str] = None,
+        accepted: Optional[bool] = None,
+        participants: Optional[int] = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        self._buffer.append((
+            time.time(),
+            kind,
+            user_id,
+            peer_id,
+            room,
+            None if accepted is None else int(accepted),
+            participants,
+        ))
+        self._recorded += 1
+        if self._wake is not None and len(self._buffer) * 2 >= self.capacity:
+            self._wake.set()
+
+    def stats(self) -> dict[str, Any]:
+        pending = len(self._buffer)
+        return {
+            "enabled": self.enabled,
+            "recorded": self._recorded,
+            "written": self._written,
+            "pending": pending,
+            "dropped": self._recorded - self._written - pending,
+        }
+
+    # -- flushing -----------------------------------------------------------------
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._wake = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far. Returns the number of rows written."""
+        if not self._buffer:
+            return 0
+        lock = self._flush_lock or asyncio.Lock()
+        async with lock:
+            batch = list(self._buffer)
+            self._buffer.clear()
+            if not batch:
+                return 0
+            try:
+                await asyncio.to_thread(insert_cdr_events, batch)
+            except Exception as exc:  # noqa: BLE001
+                log.warning("dropping %d CDR events, write failed: %s", len(batch), exc)
+                return 0
+            self._written += len(batch)
+            return len(batch)
+
+    async def _run(self) -> None:
+        assert self._wake is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+
+def iter_events(page_size: int = 5000, **filters: Any) -> Iterator[dict[str, Any]]:
+    """All flushed CDR rows matching `filters` (see `query_cdr_events`), paged by id."""
+    after_id = 0
+    while True:
+        page = query_cdr_events(after_id=after_id, limit=page_size, **filters)
+        yield from page
+        if len(page) < page_size:
+            return
+        after_id = page[-1]["id"]
+
+
+def summarize(events: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Roll CDR rows (oldest first) up into call and room totals.
+
+    A 1:1 call starts at an accepted `call-response` and ends at the first
+    `hang-up` between the same two users; a room session runs from its first
+    join to the leave that empties it.
+    """
+    calls_requested = calls_accepted = calls_declined = 0
+    durations: list[float] = []
+    open_calls: dict[frozenset[str], float] = {}
+    rooms: dict[str, dict[str, Any]] = {}
+    room_sessions: list[dict[str, Any]] = []
+
+    for e in events:
+        kind = e["kind"]
+        if kind == "call-request":
+            calls_requested += 1
+        elif kind == "call-response" and e["peer_id"]:
+            if e["accepted"]:
+                calls_accepted += 1
+                open_calls[frozenset((e["user_id"], e["peer_id"]))] = e["ts"]
+            else:
+                calls_declined += 1
+        elif kind == "hang-up" and e["peer_id"]:
+            started = open_calls.pop(frozenset((e["user_id"], e["peer_id"])), None)
+            if started is not None:
+                durations.append(e["ts"] - started)
+        elif kind == "room-join" and e["room"]:
+            session = rooms.setdefault(
+                e["room"], {"room": e["room"], "started": e["ts"], "peak": 0}
+            )
+            session["peak"] = max(session["peak"], e["participants"] or 0)
+        elif kind == "room-leave" and e["room"] in rooms and not e["participants"]:
+            session = rooms.pop(e["room"])
+            session["duration"] = e["ts"] - session["started"]
+            room_sessions.append(session)
+
+    finished = [s["duration"] for s in room_sessions]
+    return {
+        "calls": {
+            "requested": calls_requested,
+            "accepted": calls_accepted,
+            "declined": calls_declined,
+            "completed": len(durations),
+            "in_progress": len(open_calls),
+            "avg_duration_s": sum(durations) / len(durations) if durations else None,
+        },
+        "rooms": {
+            "completed": len(room_sessions),
+            "active": len(rooms),
+            "avg_duration_s": sum(finished) / len(finished) if finished else None,
+            "avg_peak_participants": (
+                sum(s["peak"] for s in room_sessions) / len(room_sessions)
+                if room_sessions
+                else None
+            ),
+            "max_participants": max(
+                [s["peak"] for s in room_sessions] + [s["peak"] for s in rooms.values()],
+                default=0,
+            ),
+        },
+    }
+
+
+cdr = CdrLog(
+    capacity=settings.cdr_buffer_size,
+    flush_interval=settings.cdr_flush_interval_s,
+    enabled=settings.cdr_enabled,
+)
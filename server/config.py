@@ -30,15 +30,137 @@ class Settings:
     jwt_expires_days: int
     db_path: str
     cors_origins: list[str]
+    # Shared secret for /api/admin/*. Empty disables the admin endpoints.
+    admin_token: str
+    # Graceful drain: how long to wait for active rooms to finish, and the
+    # window over which clients are told to spread their reconnects.
+    drain_timeout_s: float
+    drain_reconnect_spread_s: float
+    # With room snapshots on, end the drain as soon as the final snapshot is
+    # saved instead of letting rooms run until the deadline.
+    drain_cut_rooms: bool
+    # Application-level keepalive: ping after this much inbound silence, reap
+    # if nothing arrives within the timeout. Interval 0 disables it.
+    heartbeat_interval_s: float
+    heartbeat_timeout_s: float
+    heartbeat_tick_s: float
+    # Inbound pipeline: worker tasks that handle /ws frames (0 handles each
+    # frame inline, before reading the next), and how many frames one
+    # connection may have queued before its reader pauses.
+    ws_workers: int
+    ws_max_pending: int
+    # /ws admission control (ws/admission.py): refuse new sockets while the
+    # event loop lags past MAX_LAG_MS or this worker holds MAX_CONNECTIONS;
+    # let MAX_HANDSHAKES authenticate at once, the next ones waiting up to
+    # WAIT_MS for a slot. Refusals carry a retry hint from the spread window.
+    # 0 disables each limit.
+    ws_max_connections: int
+    ws_admit_max_lag_ms: float
+    ws_admit_max_handshakes: int
+    ws_admit_wait_ms: float
+    ws_admit_retry_spread_s: float
+    # permessage-deflate, when served with --ws server.ws.compression:
+    # SignalingWebSocketProtocol. Messages below MIN_BYTES go uncompressed.
+    # Window bits (9-15) and memLevel (1-9) bound per-connection zlib memory.
+    # Context takeover off frees the compressor between messages.
+    ws_deflate_min_bytes: int
+    ws_deflate_window_bits: int
+    ws_deflate_mem_level: int
+    ws_deflate_context_takeover: bool
+    # Room membership snapshots for warm restarts (0 disables), and how long
+    # a restored room waits for its members to reconnect.
+    room_snapshot_interval_s: float
+    room_snapshot_ttl_s: float
+    # Let clients opt into compact SDP (`/ws?sdp=compact`); see ws/sdp_compact.py.
+    sdp_compaction: bool
+    # Room codes are <adjective>-<animal>-<N digits>. Point the *_FILE knobs at
+    # one-word-per-line lists and/or raise the digit count to enlarge the space.
+    room_code_digits: int
+    room_code_adjectives_file: str
+    room_code_animals_file: str
+    # Group commit for signups: concurrent create_user calls share one
+    # transaction of up to BATCH_MAX rows, waiting at most BATCH_WAIT_MS to fill it.
+    user_write_batch_max: int
+    user_write_batch_wait_ms: float
+    # GET /api/users/search caches the first page per query prefix for
+    # CACHE_TTL_S, at most CACHE_SIZE prefixes (0 disables the cache).
+    user_search_cache_size: int
+    user_search_cache_ttl_s: float
+    # Call-detail records: in-memory ring size and how often it's flushed to SQLite.
+    cdr_enabled: bool
+    cdr_buffer_size: int
+    cdr_flush_interval_s: float
+    # Call-quality telemetry: samples kept per room/user ring, how far back
+    # percentiles look, and how many rooms/users are tracked at once.
+    telemetry_window: int
+    telemetry_horizon_s: float
+    telemetry_max_keys: int
+    # Opus hints for mesh rooms: total uplink each member should stay within,
+    # and the per-stream bitrate floor/ceiling.
+    media_uplink_budget_kbps: float
+    media_min_bitrate_kbps: float
+    media_max_bitrate_kbps: float
+    # ICE servers handed to clients. TURN entries get coturn REST-API
+    # credentials (static-auth-secret) valid for TURN_CREDENTIAL_TTL_S.
+    stun_urls: list[str]
+    turn_urls: list[str]
+    turn_secret: str
+    turn_credential_ttl_s: int
+    # Call-setup tracing: setups slower than this keep their timeline; caps on
+    # in-flight traces, kept slow traces, and how long a setup may stay open.
+    trace_slow_ms: float
+    trace_max_active: int
+    trace_slow_keep: int
+    trace_timeout_s: float
+    # Event-loop lag probe period (0 disables), how long the loop may be stuck
+    # before its stack is logged (0 disables the watchdog), and the longest
+    # on-demand profile an admin may request.
+    loop_lag_interval_s: float
+    loop_stall_ms: float
+    profile_max_s: float
+    # Who hears about presence changes: "contacts" (users who added you) or
+    # "all" (every online user, the original behaviour; O(online) per event).
+    presence_scope: str
+    # Cross-worker presence table for `uvicorn --workers N`: a file to mmap
+    # (ideally on tmpfs, e.g. /dev/shm/voip-presence; empty disables) and its
+    # slot count, a power of two of 64-byte slots. Every worker must agree.
+    presence_shm_path: str
+    presence_shm_slots: int
+    # In-process online backups (backup.py): snapshot directory (default
+    # `backups/` next to DB_PATH, so it's writable wherever the DB is), schedule
+    # (0 = only on POST /api/admin/backup), retention, and how gently to
+    # copy: pages per backup step, pause between steps, and how many
+    # write-triggered restarts before finishing in one step.
+    backup_dir: str
+    backup_interval_s: float
+    backup_keep_days: float
+    backup_step_pages: int
+    backup_step_sleep_ms: float
+    backup_max_restarts: int
+    # Opt-in /ws traffic recording for replay (ws/recorder.py): file to append
+    # to (empty disables), size at which recording stops, flush period.
+    ws_record_path: str
+    ws_record_max_mb: float
+    ws_record_flush_s: float
+    # Logging: level, "text" or "json" lines, and how many records may wait
+    # for the background writer before new ones are dropped. Hot call sites
+    # log at most LOG_SAMPLE_BURST records per LOG_SAMPLE_WINDOW_S each and
+    # count the rest (window 0 disables sampling).
+    log_level: str
+    log_format: str
+    log_queue_size: int
+    log_sample_window_s: float
+    log_sample_burst: int
 
 
 def load_settings() -> Settings:
+    db_path = _env("DB_PATH", "./data/voip.db")
     return Settings(
         port=int(_env("PORT", "8000")),
         jwt_secret=_env("JWT_SECRET", "dev-insecure-change-me"),
         jwt_algorithm=_env("JWT_ALGORITHM", "HS256"),
         jwt_expires_days=int(_env("JWT_EXPIRES_DAYS", "7")),
-        db_path=_env("DB_PATH", "./data/voip.db"),
+        db_path=db_path,
         cors_origins=_env_list(
             "CORS_ORIGINS",
             [
@@ -47,6 +169,71 @@ def load_settings() -> Settings:
                 "http://localhost:4173",  # vite preview
             ],
         ),
+        admin_token=_env("ADMIN_TOKEN", ""),
+        drain_timeout_s=float(_env("DRAIN_TIMEOUT_S", "30")),
+        drain_reconnect_spread_s=float(_env("DRAIN_RECONNECT_SPREAD_S", "20")),
+        drain_cut_rooms=_env("DRAIN_CUT_ROOMS", "0") not in ("0", "false", "no"),
+        heartbeat_interval_s=float(_env("HEARTBEAT_INTERVAL_S", "25")),
+        heartbeat_timeout_s=float(_env("HEARTBEAT_TIMEOUT_S", "10")),
+        heartbeat_tick_s=float(_env("HEARTBEAT_TICK_S", "1")),
+        ws_workers=int(_env("WS_WORKERS", "64")),
+        ws_max_pending=int(_env("WS_MAX_PENDING", "32")),
+        ws_max_connections=int(_env("WS_MAX_CONNECTIONS", "0")),
+        ws_admit_max_lag_ms=float(_env("WS_ADMIT_MAX_LAG_MS", "200")),
+        ws_admit_max_handshakes=int(_env("WS_ADMIT_MAX_HANDSHAKES", "32")),
+        ws_admit_wait_ms=float(_env("WS_ADMIT_WAIT_MS", "1000")),
+        ws_admit_retry_spread_s=float(_env("WS_ADMIT_RETRY_SPREAD_S", "10")),
+        ws_deflate_min_bytes=int(_env("WS_DEFLATE_MIN_BYTES", "512")),
+        ws_deflate_window_bits=int(_env("WS_DEFLATE_WINDOW_BITS", "12")),
+        ws_deflate_mem_level=int(_env("WS_DEFLATE_MEM_LEVEL", "5")),
+        ws_deflate_context_takeover=_env("WS_DEFLATE_CONTEXT_TAKEOVER", "1") not in ("0", "false", "no"),
+        room_snapshot_interval_s=float(_env("ROOM_SNAPSHOT_INTERVAL_S", "5")),
+        room_snapshot_ttl_s=float(_env("ROOM_SNAPSHOT_TTL_S", "120")),
+        sdp_compaction=_env("SDP_COMPACTION", "1") not in ("0", "false", "no"),
+        room_code_digits=int(_env("ROOM_CODE_DIGITS", "2")),
+        room_code_adjectives_file=_env("ROOM_CODE_ADJECTIVES_FILE", ""),
+        room_code_animals_file=_env("ROOM_CODE_ANIMALS_FILE", ""),
+        user_write_batch_max=int(_env("USER_WRITE_BATCH_MAX", "64")),
+        user_write_batch_wait_ms=float(_env("USER_WRITE_BATCH_WAIT_MS", "2")),
+        user_search_cache_size=int(_env("USER_SEARCH_CACHE_SIZE", "4096")),
+        user_search_cache_ttl_s=float(_env("USER_SEARCH_CACHE_TTL_S", "30")),
+        cdr_enabled=_env("CDR_ENABLED", "1") not in ("0", "false", "no"),
+        cdr_buffer_size=int(_env("CDR_BUFFER_SIZE", "10000")),
+        cdr_flush_interval_s=float(_env("CDR_FLUSH_INTERVAL_S", "2")),
+        telemetry_window=int(_env("TELEMETRY_WINDOW", "120")),
+        telemetry_horizon_s=float(_env("TELEMETRY_HORIZON_S", "300")),
+        telemetry_max_keys=int(_env("TELEMETRY_MAX_KEYS", "10000")),
+        media_uplink_budget_kbps=float(_env("MEDIA_UPLINK_BUDGET_KBPS", "192")),
+        media_min_bitrate_kbps=float(_env("MEDIA_MIN_BITRATE_KBPS", "12")),
+        media_max_bitrate_kbps=float(_env("MEDIA_MAX_BITRATE_KBPS", "64")),
+        stun_urls=_env_list("STUN_URLS", ["stun:stun.l.google.com:19302"]),
+        turn_urls=_env_list("TURN_URLS", []),
+        turn_secret=_env("TURN_SECRET", ""),
+        turn_credential_ttl_s=int(_env("TURN_CREDENTIAL_TTL_S", "86400")),
+        trace_slow_ms=float(_env("TRACE_SLOW_MS", "3000")),
+        trace_max_active=int(_env("TRACE_MAX_ACTIVE", "10000")),
+        trace_slow_keep=int(_env("TRACE_SLOW_KEEP", "200")),
+        trace_timeout_s=float(_env("TRACE_TIMEOUT_S", "120")),
+        loop_lag_interval_s=float(_env("LOOP_LAG_INTERVAL_S", "0.25")),
+        loop_stall_ms=float(_env("LOOP_STALL_MS", "250")),
+        profile_max_s=float(_env("PROFILE_MAX_S", "60")),
+        presence_scope=_env("PRESENCE_SCOPE", "contacts").lower(),
+        presence_shm_path=_env("PRESENCE_SHM_PATH", ""),
+        presence_shm_slots=int(_env("PRESENCE_SHM_SLOTS", "131072")),
+        backup_dir=_env("BACKUP_DIR", os.path.join(os.path.dirname(db_path) or ".", "backups")),
+        backup_interval_s=float(_env("BACKUP_INTERVAL_S", "0")),
+        backup_keep_days=float(_env("BACKUP_KEEP_DAYS", "14")),
+        backup_step_pages=int(_env("BACKUP_STEP_PAGES", "256")),
+        backup_step_sleep_ms=float(_env("BACKUP_STEP_SLEEP_MS", "10")),
+        backup_max_restarts=int(_env("BACKUP_MAX_RESTARTS", "20")),
+        ws_record_path=_env("WS_RECORD_PATH", ""),
+        ws_record_max_mb=float(_env("WS_RECORD_MAX_MB", "512")),
+        ws_record_flush_s=float(_env("WS_RECORD_FLUSH_S", "1")),
+        log_level=_env("LOG_LEVEL", "INFO").upper(),
+        log_format=_env("LOG_FORMAT", "text").lower(),
+        log_queue_size=int(_env("LOG_QUEUE_SIZE", "10000")),
+        log_sample_window_s=float(_env("LOG_SAMPLE_WINDOW_S", "10")),
+        log_sample_burst=int(_env("LOG_SAMPLE_BURST", "5")),
     )
 
 
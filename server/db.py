@@ -1,19 +1,33 @@
-"""SQLite-backed user store.
+"""SQLite-backed user store (plus contacts and the append-only call-detail record table).
 
-Single users table, accessed via short-lived connections (the stdlib sqlite3 module
+Users are read via short-lived connections (the stdlib sqlite3 module
 isn't async-safe across coroutines, but each call here opens its own connection so
-concurrent requests do not share state). Concurrent writes are serialized at the
-SQLite level, which is fine for this scale.
+concurrent requests do not share state).
+
+Signups go through one writer thread (UserWriter) instead: concurrent
+`create_user` calls queue up and are committed together, one transaction and
+one fsync per batch rather than per user. Each insert runs under its own
+SAVEPOINT so a duplicate username/email fails only that caller.
+
+Schema changes go through MIGRATIONS: numbered scripts applied in order by
+`init_db`, each in its own transaction together with the `PRAGMA user_version`
+bump, so existing installs upgrade in place and a failed step leaves the
+database at the previous version.
 """
 
 from __future__ import annotations
 
 import os
+import queue
+import re
 import sqlite3
+import threading
+import time
 import uuid
+from concurrent.futures import Future
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Iterable, Optional
+from typing import Any, Iterable, Iterator, Optional
 
 from .config import settings
 
@@ -30,8 +44,57 @@ CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 """
 
+# (version, script). Append only — never edit a migration that has shipped.
+MIGRATIONS: list[tuple[int, str]] = [
+    # 1: the original schema. IF NOT EXISTS lets pre-migration installs
+    #    (user_version 0, tables already present) adopt it as-is.
+    (1, SCHEMA),
+    # 2: login matches emails case-insensitively via lower(email), which
+    #    idx_users_email can't serve; index the expression so it's a seek.
+    (2, "CREATE INDEX IF NOT EXISTS idx_users_email_lower ON users(lower(email));"),
+    # 3: call-detail records (server/cdr.py). Append-only, written in batches.
+    (3, """
+CREATE TABLE IF NOT EXISTS cdr_events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    peer_id TEXT,
+    room TEXT,
+    accepted INTEGER,
+    participants INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_cdr_ts ON cdr_events(ts);
+"""),
+    # 4: directed contact edges (owner sees contact's presence). The primary
+    #    key is the forward adjacency list; idx_contacts_reverse answers
+    #    "who has this user as a contact" for presence fan-out.
+    (4, """
+CREATE TABLE IF NOT EXISTS contacts (
+    owner_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    contact_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (owner_id, contact_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_contacts_reverse ON contacts(contact_id, owner_id);
+"""),
+    # 5: room membership as of the last snapshot (ws/room_snapshots.py), so
+    #    a restarted server can put returning users back in their rooms.
+    #    Rewritten whole on each snapshot.
+    (5, """
+CREATE TABLE IF NOT EXISTS room_snapshot (
+    user_id TEXT PRIMARY KEY,
+    code TEXT NOT NULL,
+    saved_at REAL NOT NULL
+) WITHOUT ROWID;
+"""),
+    # 6: directory search (server/user_search.py) walks usernames in
+    #    lower(username) order from a prefix. Emails use idx_users_email_lower.
+    (6, "CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(lower(username));"),
+]
+
 
-@dataclass
+@dataclass(slots=True)
 class UserRow:
     id: str
     username: str
@@ -48,9 +111,51 @@ def _connect() -> sqlite3.Connection:
     return conn
 
 
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None) -> int:
+    """Apply pending migrations up to `target` (default: latest). Returns the new version."""
+    current = schema_version(conn)
+    for version, script in MIGRATIONS:
+        if version <= current or (target is not None and version > target):
+            continue
+        try:
+            conn.executescript(
+                f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;"
+            )
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        current = version
+    return current
+
+
+_CREATE_INDEX = re.compile(r"CREATE INDEX IF NOT EXISTS [^;]+;")
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
+    """Re-create any index an applied migration owns but the file has lost.
+
+    BulkUserImport drops the users indexes for the length of an import; a
+    crash before it rebuilds them would otherwise leave them gone for good.
+    """
+    current = schema_version(conn)
+    for version, script in MIGRATIONS:
+        if version <= current:
+            for sql in _CREATE_INDEX.findall(script):
+                conn.execute(sql)
+    conn.commit()
+
+
 def init_db() -> None:
-    with _connect() as conn:
-        conn.executescript(SCHEMA)
+    conn = _connect()
+    try:
+        migrate(conn)
+        ensure_indexes(conn)
+    finally:
+        conn.close()
 
 
 def _row_to_user(row: sqlite3.Row) -> UserRow:
@@ -63,6 +168,134 @@ def _row_to_user(row: sqlite3.Row) -> UserRow:
     )
 
 
+def _conflict(exc: sqlite3.IntegrityError) -> ValueError:
+    msg = str(exc).lower()
+    if "username" in msg:
+        return ValueError("That username is already taken.")
+    if "email" in msg:
+        return ValueError("An account with that email already exists.")
+    return ValueError("Could not create account.")
+
+
+_INSERT_USER = (
+    "INSERT INTO users (id, username, email, password_hash, created_at) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+
+class UserWriter:
+    """Single writer thread that group-commits user inserts.
+
+    `submit` never blocks on SQLite; the returned Future resolves to the
+    UserRow or raises the same ValueError the old one-row-per-transaction path
+    did. The thread starts on first use and stops on `close`.
+    """
+
+    def __init__(self, max_batch: int, max_wait_ms: float) -> None:
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: queue.Queue[Optional[tuple[UserRow, Future[UserRow]]]] = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, user: UserRow) -> Future[UserRow]:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="user-writer", daemon=True
+                )
+                self._thread.start()
+        fut: Future[UserRow] = Future()
+        self._queue.put((user, fut))
+        return fut
+
+    def close(self) -> None:
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    return
+                batch = [first]
+                stop = False
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        nxt = (
+                            self._queue.get(timeout=remaining)
+                            if remaining > 0
+                            else self._queue.get_nowait()
+                        )
+                    except queue.Empty:
+                        break
+                    if nxt is None:
+                        stop = True
+                        break
+                    batch.append(nxt)
+                self._commit(batch)
+                if stop:
+                    return
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _commit(self, batch: list[tuple[UserRow, Future[UserRow]]]) -> None:
+        outcomes: list[Optional[ValueError]] = []
+        try:
+            if self._conn is None:
+                self._conn = _connect()
+                self._conn.isolation_level = None  # explicit BEGIN/COMMIT below
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            for user, _ in batch:
+                conn.execute("SAVEPOINT signup")
+                try:
+                    conn.execute(
+                        _INSERT_USER,
+                        (user.id, user.username, user.email, user.password_hash, user.created_at),
+                    )
+                    outcomes.append(None)
+                except sqlite3.IntegrityError as exc:
+                    conn.execute("ROLLBACK TO signup")
+                    outcomes.append(_conflict(exc))
+                conn.execute("RELEASE signup")
+            conn.execute("COMMIT")
+        except Exception as exc:  # noqa: BLE001
+            # Start the next batch on a fresh connection; closing discards
+            # whatever part of this transaction made it in.
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            for _, fut in batch:
+                fut.set_exception(exc)
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        for (user, fut), error in zip(batch, outcomes):
+            if error is None:
+                fut.set_result(user)
+            else:
+                fut.set_exception(error)
+
+
+_writer = UserWriter(settings.user_write_batch_max, settings.user_write_batch_wait_ms)
+
+
+def close_writer() -> None:
+    _writer.close()
+
+
 def create_user(username: str, email: str, password_hash: str) -> UserRow:
     user = UserRow(
         id=str(uuid.uuid4()),
@@ -71,21 +304,7 @@ def create_user(username: str, email: str, password_hash: str) -> UserRow:
         password_hash=password_hash,
         created_at=datetime.now(timezone.utc).isoformat(),
     )
-    with _connect() as conn:
-        try:
-            conn.execute(
-                "INSERT INTO users (id, username, email, password_hash, created_at) "
-                "VALUES (?, ?, ?, ?, ?)",
-                (user.id, user.username, user.email, user.password_hash, user.created_at),
-            )
-        except sqlite3.IntegrityError as exc:
-            msg = str(exc).lower()
-            if "username" in msg:
-                raise ValueError("That username is already taken.")
-            if "email" in msg:
-                raise ValueError("An account with that email already exists.")
-            raise ValueError("Could not create account.") from exc
-    return user
+    return _writer.submit(user).result()
 
 
 def get_user_by_id(user_id: str) -> Optional[UserRow]:
@@ -94,6 +313,13 @@ def get_user_by_id(user_id: str) -> Optional[UserRow]:
     return _row_to_user(row) if row else None
 
 
+def get_user_by_username(username: str) -> Optional[UserRow]:
+    """Exact, case-sensitive username match. Never matches on email."""
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+    return _row_to_user(row) if row else None
+
+
 def find_user_by_identifier(identifier: str) -> Optional[UserRow]:
     """Look up by username OR email (case-sensitive for username, case-insensitive for email)."""
     with _connect() as conn:
@@ -114,3 +340,229 @@ def get_users_by_ids(ids: Iterable[str]) -> list[UserRow]:
             f"SELECT * FROM users WHERE id IN ({placeholders})", ids
         ).fetchall()
     return [_row_to_user(r) for r in rows]
+
+
+# Searchable key → the expression an index is built on (migrations 2 and 6).
+# Emails are deliberately absent: matching them would let anyone find out
+# which addresses have accounts.
+_SEARCH_KEYS = {"username": "lower(username)"}
+
+
+def search_users(field: str, prefix: str, limit: int,
+                 after: Optional[tuple[str, int]] = None) -> list[tuple[str, int, UserRow]]:
+    """Users whose lowercased `field` starts with `prefix` (already lowercase).
+
+    Ordered by (key, rowid) and returned as (key, rowid, user) so the caller
+    can resume after the last one: `after` is such a pair. It's a range scan
+    over the expression index, starting at the later of the prefix and `after`.
+    """
+    expr = _SEARCH_KEYS[field]
+    start = prefix if after is None else max(prefix, after[0])
+    sql = f"SELECT rowid AS rid, {expr} AS k, * FROM users WHERE {expr} >= ?"
+    args: list[Any] = [start]
+    if prefix and ord(prefix[-1]) < 0x10FFFF:
+        sql += f" AND {expr} < ?"
+        args.append(prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    if after is not None:
+        sql += f" AND ({expr} > ? OR rowid > ?)"
+        args += after
+    sql += f" ORDER BY {expr}, rowid LIMIT ?"
+    args.append(limit)
+    with _connect() as conn:
+        rows = conn.execute(sql, args).fetchall()
+    return [(r["k"], r["rid"], _row_to_user(r)) for r in rows]
+
+
+# --- Bulk import / export (server/user_io.py) ----------------------------------------
+
+USER_COLUMNS = ("id", "username", "email", "password_hash", "created_at")
+
+
+def iter_user_rows(fetch: int = 10_000) -> Iterator[tuple[str, str, str, str, str]]:
+    """Every user as a USER_COLUMNS tuple, in insertion order, streamed."""
+    conn = _connect()
+    conn.row_factory = None
+    try:
+        cur = conn.execute(f"SELECT {', '.join(USER_COLUMNS)} FROM users ORDER BY rowid")
+        while True:
+            rows = cur.fetchmany(fetch)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        conn.close()
+
+
+class BulkUserImport:
+    """One connection set up for loading many users at once. Use as a context manager.
+
+    Unless `durable`, sync and journaling are relaxed for this connection.
+    Run it with the server stopped: a crash mid-import can corrupt the file
+    (back it up first). The users table's secondary indexes are dropped on
+    entry and rebuilt once on exit, which is much cheaper than updating them
+    row by row. If the import dies in between, the next `init_db()` puts them
+    back. Uniqueness of id, username and email is still enforced as rows go in.
+    """
+
+    def __init__(self, durable: bool = False) -> None:
+        self.durable = durable
+        self._conn: Optional[sqlite3.Connection] = None
+        self._indexes: list[str] = []
+
+    def __enter__(self) -> "BulkUserImport":
+        conn = self._conn = _connect()
+        conn.isolation_level = None  # explicit BEGIN/COMMIT per batch
+        if not self.durable:
+            conn.execute("PRAGMA synchronous = OFF")
+            if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+                conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA cache_size = -262144")  # 256 MiB
+        conn.execute("PRAGMA temp_store = MEMORY")
+        indexes = conn.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = 'users' AND sql IS NOT NULL"
+        ).fetchall()
+        for name, sql in indexes:
+            conn.execute(f'DROP INDEX "{name}"')
+            self._indexes.append(sql)
+        return self
+
+    def insert(self, rows: list[tuple[str, str, str, str, str]], skip_existing: bool = True) -> int:
+        """Insert one batch in one transaction. Returns how many rows went in.
+
+        With `skip_existing`, rows whose id, username or email is taken are
+        skipped. Otherwise they raise sqlite3.IntegrityError and nothing from
+        the batch is kept.
+        """
+        conn = self._conn
+        assert conn is not None
+        verb = "INSERT OR IGNORE" if skip_existing else "INSERT"
+        before = conn.total_changes
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                f"{verb} INTO users ({', '.join(USER_COLUMNS)}) VALUES (?, ?, ?, ?, ?)", rows
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return conn.total_changes - before
+
+    def __exit__(self, *exc: object) -> None:
+        conn = self._conn
+        assert conn is not None
+        try:
+            for sql in self._indexes:
+                conn.execute(sql)
+            conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+            self._conn = None
+
+
+# --- Contacts --------------------------------------------------------------------------
+
+
+def add_contact(owner_id: str, contact_id: str) -> bool:
+    """Add a directed contact edge. False if it already existed."""
+    with _connect() as conn:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO contacts (owner_id, contact_id, created_at) VALUES (?, ?, ?)",
+            (owner_id, contact_id, datetime.now(timezone.utc).isoformat()),
+        )
+        return cur.rowcount == 1
+
+
+def get_contact_ids(owner_id: str) -> list[str]:
+    """Users `owner_id` has added (forward adjacency, primary-key range scan)."""
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT contact_id FROM contacts WHERE owner_id = ?", (owner_id,)
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+def get_watcher_ids(contact_id: str) -> list[str]:
+    """Users who have added `contact_id` (reverse adjacency via idx_contacts_reverse)."""
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT owner_id FROM contacts WHERE contact_id = ?", (contact_id,)
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+# --- Room snapshots --------------------------------------------------------------------
+
+
+def save_room_snapshot(members: Iterable[tuple[str, str]], saved_at: float) -> int:
+    """Replace the snapshot with (code, user_id) pairs in one transaction."""
+    with _connect() as conn:
+        conn.execute("DELETE FROM room_snapshot")
+        cur = conn.executemany(
+            "INSERT OR REPLACE INTO room_snapshot (user_id, code, saved_at) VALUES (?, ?, ?)",
+            ((user_id, code, saved_at) for code, user_id in members),
+        )
+        return cur.rowcount
+
+
+def load_room_snapshot(not_before: float) -> dict[str, list[str]]:
+    """code → member ids from a snapshot saved at or after `not_before`."""
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT code, user_id FROM room_snapshot WHERE saved_at >= ?", (not_before,)
+        ).fetchall()
+    rooms: dict[str, list[str]] = {}
+    for code, user_id in rows:
+        rooms.setdefault(code, []).append(user_id)
+    return rooms
+
+
+# --- Call-detail records ---------------------------------------------------------------
+
+CDR_COLUMNS = ("ts", "kind", "user_id", "peer_id", "room", "accepted", "participants")
+
+
+def insert_cdr_events(rows: Iterable[tuple[Any, ...]]) -> int:
+    """Append a batch of CDR rows (in CDR_COLUMNS order) in one transaction."""
+    with _connect() as conn:
+        cur = conn.executemany(
+            f"INSERT INTO cdr_events ({', '.join(CDR_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in CDR_COLUMNS)})",
+            rows,
+        )
+        return cur.rowcount
+
+
+def query_cdr_events(
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    kind: Optional[str] = None,
+    user_id: Optional[str] = None,
+    room: Optional[str] = None,
+    after_id: int = 0,
+    limit: int = 1000,
+) -> list[dict[str, Any]]:
+    """CDR rows matching the filters, oldest first. Page with `after_id`."""
+    where = ["id > ?"]
+    args: list[Any] = [after_id]
+    for column, op, value in (
+        ("ts", ">=", since),
+        ("ts", "<", until),
+        ("kind", "=", kind),
+        ("room", "=", room),
+    ):
+        if value is not None:
+            where.append(f"{column} {op} ?")
+            args.append(value)
+    if user_id is not None:
+        where.append("(user_id = ? OR peer_id = ?)")
+        args += [user_id, user_id]
+    args.append(limit)
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT id, {', '.join(CDR_COLUMNS)} FROM cdr_events "
+            f"WHERE {' AND '.join(where)} ORDER BY id LIMIT ?",
+            args,
+        ).fetchall()
+    return [dict(r) for r in rows]
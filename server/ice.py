@@ -0,0 +1,92 @@
+"""ICE server list for clients, with time-limited TURN credentials.
+
+TURN uses coturn's REST-API scheme (`use-auth-secret` + `static-auth-secret`):
+
+  username   = "<unix expiry>:<user id>"
+  credential = base64(HMAC-SHA1(TURN_SECRET, username))
+
+coturn recomputes the HMAC itself, so nothing is shared per user and a leaked
+credential stops working at expiry. Each user's credential is cached and
+handed out again until less than a quarter of its lifetime remains. That keeps
+the answer stable across reconnects, so the browser can reuse its existing TURN
+allocation. The cache is bounded, and the least recently used entry is evicted
+first.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .config import settings
+
+
+def turn_credential(secret: str, user_id: str, expires_at: int) -> tuple[str, str]:
+    username = f"{expires_at}:{user_id}"
+    digest = hmac.new(secret.encode("utf-8"), username.encode("utf-8"), hashlib.sha1).digest()
+    return username, base64.b64encode(digest).decode("ascii")
+
+
+class IceConfig:
+    def __init__(
+        self,
+        stun_urls: list[str],
+        turn_urls: list[str],
+        secret: str,
+        ttl: int,
+        max_cached: int = 10_000,
+    ) -> None:
+        self.stun_urls = stun_urls
+        self.turn_urls = turn_urls if secret else []
+        self.secret = secret
+        self.ttl = ttl
+        self.max_cached = max_cached
+        self._cache: OrderedDict[str, tuple[int, dict[str, Any]]] = OrderedDict()
+        self.issued = 0
+        self.hits = 0
+
+    def for_user(self, user_id: str, now: Optional[float] = None) -> dict[str, Any]:
+        """`{iceServers, ttl}` for this user, in RTCConfiguration shape."""
+        now_i = int(time.time() if now is None else now)
+        servers: list[dict[str, Any]] = []
+        if self.stun_urls:
+            servers.append({"urls": list(self.stun_urls)})
+        if not self.turn_urls:
+            return {"iceServers": servers, "ttl": None}
+
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[0] - now_i > self.ttl // 4:
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            expires_at, turn = cached
+        else:
+            expires_at = now_i + self.ttl
+            username, credential = turn_credential(self.secret, user_id, expires_at)
+            turn = {"urls": list(self.turn_urls), "username": username, "credential": credential}
+            self._cache[user_id] = (expires_at, turn)
+            self._cache.move_to_end(user_id)
+            if len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+            self.issued += 1
+        servers.append(turn)
+        return {"iceServers": servers, "ttl": expires_at - now_i}
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "turn": bool(self.turn_urls),
+            "issued": self.issued,
+            "cache_hits": self.hits,
+            "cached": len(self._cache),
+        }
+
+
+ice = IceConfig(
+    stun_urls=settings.stun_urls,
+    turn_urls=settings.turn_urls,
+    secret=settings.turn_secret,
+    ttl=settings.turn_credential_ttl_s,
+)
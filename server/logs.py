@@ -0,0 +1,214 @@
+"""Logging that can't stall the event loop: queued, sampled, structured.
+
+`setup_logging()` replaces `logging.basicConfig`. The root logger gets a
+QueueHandler on a bounded queue, and one background thread (a QueueListener)
+does the formatting and the writes to stderr. A log call on the loop only
+builds the record and enqueues it. If the writer falls LOG_QUEUE_SIZE records
+behind, new records are dropped and counted, so the loop never waits on them.
+
+`Sampled` wraps a logger for call sites that can fire hundreds of times at
+once, such as a send failure for every socket a network blip killed. Each
+call site (file:line, plus an optional `key`) may log LOG_SAMPLE_BURST
+records per LOG_SAMPLE_WINDOW_S. Later records in the window are only
+counted. The next record that gets through carries `suppressed=N`.
+
+Pass `fields={...}` (or `extra={"fields": ...}` on a plain logger) to attach
+structured key/values. LOG_FORMAT=text appends them as `k=v`, and
+LOG_FORMAT=json writes one JSON object per line.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text with ` k=v` fields appended, or one JSON object per record."""
+
+    def __init__(self, json_lines: bool = False) -> None:
+        super().__init__(_TEXT_FORMAT)
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields: dict[str, Any] = getattr(record, "fields", None) or {}
+        if self.json_lines:
+            out = {
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info and not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            if record.exc_text:
+                out["exc"] = record.exc_text
+            return json.dumps(out, default=str)
+        text = super().format(record)
+        if fields:
+            text += " " + " ".join(f"{k}={_text_value(v)}" for k, v in fields.items())
+        return text
+
+
+def _text_value(value: Any) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' ="\n'):
+        return json.dumps(text)
+    return text
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full."""
+
+    def __init__(self, q: "queue.Queue[Any]") -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats on the calling thread and drops exc_info.
+        # Hand over a plain copy: the listener formats it, traceback and all.
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[_DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", queue_size: int = 10000) -> None:
+    """Route the root logger through the background writer. Safe to call again."""
+    global _handler, _listener
+    shutdown_logging()
+    q: queue.Queue[Any] = queue.Queue(maxsize=max(queue_size, 1))
+    writer = logging.StreamHandler(sys.stderr)
+    writer.setFormatter(StructuredFormatter(json_lines=fmt == "json"))
+    _handler = _DroppingQueueHandler(q)
+    _listener = logging.handlers.QueueListener(q, writer, respect_handler_level=False)
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush what's queued and detach. The root logger falls back to lastResort."""
+    global _handler, _listener
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+class Sampled:
+    """Per-call-site rate limit around a logger. Thread-safe."""
+
+    def __init__(self, logger: logging.Logger, window: float, burst: int,
+                 max_sites: int = 10000) -> None:
+        self.logger = logger
+        self.window = window
+        self.burst = burst
+        self.max_sites = max_sites
+        self._lock = threading.Lock()
+        # site → [window start, records in window, suppressed in window]
+        self._sites: dict[Hashable, list[float]] = {}
+        self.suppressed = 0
+
+    def debug(self, msg: str, *args: Any, **kw: Any) -> None:
+        self._log(logging.DEBUG, msg, args, **kw)
+
+    def info(self, msg: str, *args: Any, **kw: Any) -> None:
+        self._log(logging.INFO, msg, args, **kw)
+
+    def warning(self, msg: str, *args: Any, **kw: Any) -> None:
+        self._log(logging.WARNING, msg, args, **kw)
+
+    def _log(self, level: int, msg: str, args: tuple[Any, ...], *, key: Hashable = None,
+             fields: Optional[dict[str, Any]] = None) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        caller = sys._getframe(2)
+        site = (caller.f_code.co_filename, caller.f_lineno, key)
+        suppressed = self._admit(site)
+        if suppressed is None:
+            return
+        if suppressed:
+            fields = {**(fields or {}), "suppressed": suppressed}
+        self.logger.log(level, msg, *args, extra={"fields": fields} if fields else None,
+                        stacklevel=3)
+
+    def _admit(self, site: Hashable) -> Optional[int]:
+        """None to drop this record, else how many were dropped before it."""
+        if self.window <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            state = self._sites.get(site)
+            if state is None or now - state[0] >= self.window:
+                carried = int(state[2]) if state is not None else 0
+                if state is None and len(self._sites) >= self.max_sites:
+                    self._evict(now)
+                self._sites[site] = [now, 1, 0]
+                return carried
+            if state[1] < self.burst:
+                state[1] += 1
+                return 0
+            state[2] += 1
+            self.suppressed += 1
+            return None
+
+    def _evict(self, now: float) -> None:
+        """Forget sites whose window closed. Their pending counts are lost."""
+        stale = [s for s, st in self._sites.items() if now - st[0] >= self.window]
+        for s in stale or list(self._sites)[: len(self._sites) // 2]:
+            del self._sites[s]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            noisy = sorted(
+                ((st[2], s) for s, st in self._sites.items() if st[2]),
+                key=lambda x: -x[0],
+            )[:10]
+        return {
+            "suppressed": self.suppressed,
+            "sites": len(self._sites),
+            "noisiest": [
+                {"site": f"{os.path.basename(s[0])}:{s[1]}", "key": None if s[2] is None else str(s[2]),
+                 "suppressed": n}
+                for n, s in noisy
+            ],
+        }
+
+
+def stats() -> dict[str, Any]:
+    if _handler is None:
+        return {"queued": False}
+    q = _handler.queue
+    return {
+        "queued": True,
+        "backlog": q.qsize(),
+        "capacity": q.maxsize,
+        "dropped": _handler.dropped,
+    }
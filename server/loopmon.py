@@ -0,0 +1,208 @@
+"""Event-loop health: scheduling-lag histogram, stall capture, sampling profiler.
+
+All signaling for every user shares one asyncio loop, so anything that blocks
+it delays everyone. Two pieces watch for that:
+
+  LoopMonitor      A task sleeps LOOP_LAG_INTERVAL_S at a time, and how late it
+                   wakes up goes into a histogram. A watchdog thread notices
+                   when that task stops waking up altogether. If the loop is
+                   stuck for LOOP_STALL_MS, the watchdog reads the loop
+                   thread's current stack and running task, and logs them.
+  sample_stacks()  A thread reads `sys._current_frames()` at a fixed rate and
+                   counts identical stacks. The result is collapsed-stack text
+                   ("a;b;c 42"), ready for flamegraph.pl or speedscope.
+
+Neither uses asyncio debug mode or sys.setprofile, so both are safe to leave
+on in production. The profiler only runs while an admin request asks for it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from types import FrameType
+from typing import Any, Optional
+
+from .config import settings
+from .tracing import Histogram
+
+
+log = logging.getLogger("loopmon")
+
+_LAG_SMOOTHING = 0.3
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame: Optional[FrameType]) -> list[str]:
+    """Root-first labels for `frame` and its callers."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, stall_ms: float) -> None:
+        self.interval = interval
+        self.stall_ms = stall_ms
+        self.lag = Histogram()
+        self.max_lag_ms = 0.0
+        self.recent_lag_ms = 0.0    # smoothed, for admission control
+        self.stalls = 0
+        self.last_stall: Optional[dict[str, Any]] = None
+        self._beat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None or self.interval <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+        if self.stall_ms > 0:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(0.0, (now - before - self.interval) * 1000)
+            self.lag.add(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self.recent_lag_ms += (lag_ms - self.recent_lag_ms) * _LAG_SMOOTHING
+            self._beat = now
+
+    def current_lag_ms(self) -> float:
+        """Lag now: the smoothed probe, or how overdue the next probe is if that's worse.
+
+        When the loop is saturated the probe's own wake-up is stuck in the
+        queue, so the overdue time shows the backlog before a sample lands.
+        """
+        if self._task is None:
+            return 0.0
+        overdue_ms = (time.monotonic() - self._beat - self.interval) * 1000
+        return max(self.recent_lag_ms, overdue_ms, 0.0)
+
+    def _watch(self) -> None:
+        budget = self.interval + self.stall_ms / 1000
+        reported_beat = None
+        while not self._stop.wait(min(budget / 4, 0.05)):
+            beat = self._beat
+            if beat == reported_beat or time.monotonic() - beat < budget:
+                continue
+            reported_beat = beat  # one report per stall
+            self._report_stall(time.monotonic() - beat)
+
+    def _report_stall(self, blocked_s: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread or -1)
+        task = self._blocking_task()
+        stack = traceback.format_stack(frame, limit=12) if frame is not None else []
+        self.stalls += 1
+        self.last_stall = {
+            "at": time.time(),
+            "blocked_ms": round(blocked_s * 1000, 1),
+            "task": repr(task) if task is not None else None,
+            "stack": [line.rstrip() for line in stack],
+        }
+        log.warning(
+            "event loop blocked for %.0f ms in %s\n%s",
+            blocked_s * 1000,
+            self.last_stall["task"] or "<no task>",
+            "".join(stack),
+        )
+
+    def _blocking_task(self) -> Optional["asyncio.Task[Any]"]:
+        """The task running on the stuck loop, read from the watcher thread.
+
+        The loop is blocked, so a callback scheduled on it wouldn't run until
+        the stall is over. `current_task(loop)` reads the same per-loop record
+        through the public API instead; if that ever stops working off the
+        loop's thread, stall reports just go without the task name.
+        """
+        if self._loop is None:
+            return None
+        try:
+            return asyncio.current_task(self._loop)
+        except RuntimeError:
+            return None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "interval_s": self.interval,
+            "lag": self.lag.snapshot(),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "recent_lag_ms": round(self.recent_lag_ms, 1),
+            "stalls": self.stalls,
+            "last_stall": self.last_stall,
+        }
+
+
+def sample_stacks(
+    seconds: float,
+    interval: float = 0.005,
+    thread_id: Optional[int] = None,
+) -> tuple[Counter[str], int]:
+    """Sample stacks for `seconds`. Blocking: call from a worker thread.
+
+    Only `thread_id` is sampled if given, otherwise every thread except the
+    sampler itself, with the thread name as the root frame. Returns
+    (collapsed stack → count, number of sampling ticks).
+    """
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    stacks: Counter[str] = Counter()
+    ticks = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (thread_id is not None and ident != thread_id):
+                continue
+            labels = _stack(frame)
+            if thread_id is None:
+                labels.insert(0, names.get(ident, f"thread-{ident}"))
+            stacks[";".join(labels)] += 1
+        ticks += 1
+        time.sleep(interval)
+    return stacks, ticks
+
+
+def collapsed(stacks: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+monitor = LoopMonitor(interval=settings.loop_lag_interval_s, stall_ms=settings.loop_stall_ms)
@@ -10,30 +10,178 @@ In production, this same process serves:
 
 from __future__ import annotations
 
+from .startup import phases, sd_notify  # first: its clock starts before the imports below
+
+import asyncio
+import importlib
 import logging
 import os
+import signal
+import threading
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import AsyncIterator
+from types import FrameType
+from typing import Any, AsyncIterator, Callable, Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
+from .backup import backups
+from .cdr import cdr
 from .config import settings
-from .db import init_db
-from .routes import auth_routes, users_routes
+from .db import close_writer, init_db
+from .logs import setup_logging
+from .loopmon import monitor
+from .routes import auth_routes, drain_routes, ice_routes, users_routes
 from .ws import signaling
 
+phases.mark("imports")
+
+setup_logging(settings.log_level, settings.log_format, settings.log_queue_size)
+
+
+def _install_sigterm_drain() -> Callable[[], None]:
+    """Make the first SIGTERM drain /ws before uvicorn starts shutting down.
+
+    uvicorn installs its own SIGTERM handler before lifespan startup. We wrap
+    it: the first SIGTERM starts `manager.start_drain`, and uvicorn's handler
+    is re-raised once the drain finishes. A second SIGTERM skips the wait.
+    Returns a callback that puts the previous handler back.
+    """
+    if settings.drain_timeout_s <= 0 or threading.current_thread() is not threading.main_thread():
+        return lambda: None
+
+    loop = asyncio.get_running_loop()
+    previous = signal.getsignal(signal.SIGTERM)
+    forwarded = False
+
+    def forward() -> None:
+        nonlocal forwarded
+        if forwarded:
+            return
+        forwarded = True
+        signal.signal(signal.SIGTERM, previous)
+        signal.raise_signal(signal.SIGTERM)
+
+    def begin() -> None:
+        task = signaling.manager.start_drain(
+            settings.drain_timeout_s, settings.drain_reconnect_spread_s
+        )
+        task.add_done_callback(lambda _: forward())
+
+    def on_sigterm(signum: int, frame: Optional[FrameType]) -> None:
+        if signaling.manager.draining:
+            forward()
+            return
+        logging.getLogger("signaling").info("SIGTERM received, draining before shutdown")
+        loop.call_soon_threadsafe(begin)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    def restore() -> None:
+        if signal.getsignal(signal.SIGTERM) is on_sigterm:
+            signal.signal(signal.SIGTERM, previous)
+
+    return restore
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+def _uvicorn_server() -> Optional[Any]:
+    """The uvicorn Server running this app, found through its SIGTERM handler.
+
+    uvicorn installs `Server.handle_exit` before lifespan startup. None under
+    another server, or off the main thread where uvicorn can't take signals.
+    """
+    server = getattr(signal.getsignal(signal.SIGTERM), "__self__", None)
+    return server if hasattr(server, "started") else None
+
+
+async def _notify_when_serving(server: Optional[Any]) -> None:
+    """Send READY=1 once uvicorn listens. It binds only after lifespan startup returns."""
+    if server is not None:
+        while not server.started:
+            if server.should_exit:
+                return
+            await asyncio.sleep(0.01)
+    sd_notify("READY=1")
+
+
+def _mount_admin(app: FastAPI) -> None:
+    """Add the admin API (imported by now) ahead of the SPA catch-all route."""
+    app.include_router(importlib.import_module("server.routes.admin_routes").router)
+    app.router.routes.sort(key=lambda r: getattr(r, "name", None) == "spa_fallback")
+    app.openapi_schema = None
+
+
+async def _deferred_startup(app: FastAPI) -> None:
+    """Startup work /ws doesn't wait for: token/password crypto and the admin API."""
+    try:
+        # auth.py imports these on first use; load them now, off the loop, so
+        # the first /ws token check or login doesn't stall it.
+        for module in ("jwt", "bcrypt"):
+            await asyncio.to_thread(importlib.import_module, module)
+        phases.mark("crypto")
+        await asyncio.to_thread(importlib.import_module, "server.routes.admin_routes")
+        _mount_admin(app)
+        phases.mark("admin api")
+    except Exception:  # noqa: BLE001
+        logging.getLogger("startup").exception("deferred startup failed")
+    finally:
+        phases.finish_deferred()
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI) -> AsyncIterator[None]:
-    init_db()
-    yield
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    server = _uvicorn_server()  # before our SIGTERM handler wraps uvicorn's
+    with phases.phase("init db"):
+        init_db()
+    if settings.presence_shm_path:
+        with phases.phase("shared presence"):
+            # Purging dead workers' slots scans the whole table; keep it off the loop.
+            await asyncio.to_thread(signaling.manager.open_shared,
+                                    settings.presence_shm_path, settings.presence_shm_slots)
+    restore_sigterm = _install_sigterm_drain()
+    snapshots = signaling.manager.snapshots
+    if snapshots is not None:
+        with phases.phase("restore rooms"):
+            signaling.manager.restore_rooms(snapshots.load(), snapshots.ttl)
+    with phases.phase("background tasks"):
+        if signaling.manager.heartbeat is not None:
+            signaling.manager.heartbeat.start()
+        if signaling.manager.pipeline is not None:
+            signaling.manager.pipeline.start()
+        if snapshots is not None:
+            snapshots.start()
+        if signaling.manager.recorder is not None:
+            signaling.manager.recorder.start()
+        cdr.start()
+        backups.start()
+        monitor.start()
+    phases.ready()
+    serving = asyncio.create_task(_notify_when_serving(server))
+    phases.defer()
+    deferred = asyncio.create_task(_deferred_startup(app))
+    try:
+        yield
+    finally:
+        serving.cancel()
+        sd_notify("STOPPING=1")
+        await deferred
+        await monitor.stop()
+        await backups.stop()
+        if snapshots is not None:
+            await snapshots.stop()
+        if signaling.manager.pipeline is not None:
+            await signaling.manager.pipeline.stop()
+        if signaling.manager.heartbeat is not None:
+            await signaling.manager.heartbeat.stop()
+        await cdr.stop()
+        if signaling.manager.recorder is not None:
+            await signaling.manager.recorder.stop()
+        close_writer()
+        await asyncio.to_thread(signaling.manager.close_shared)
+        restore_sigterm()
 
 
 app = FastAPI(
@@ -51,16 +199,35 @@ app.add_middleware(
 )
 
 # --- API + WebSocket routes (registered FIRST so they win over the SPA fallback) ---
+# The admin API is mounted after startup (see _deferred_startup), still ahead
+# of the fallback. Drain is the exception: a deploy may call it as soon as
+# /api/ready says 200.
 app.include_router(auth_routes.router)
 app.include_router(users_routes.router)
+app.include_router(ice_routes.router)
 app.include_router(signaling.router)
+app.include_router(drain_routes.router)
 
 
 @app.get("/api/health")
 def health() -> dict[str, str]:
+    """Liveness: the process is up. See /api/ready for whether it takes traffic."""
     return {"status": "ok"}
 
 
+@app.get("/api/ready")
+def ready() -> Response:
+    """Readiness: 200 once startup is done and /ws accepts, 503 while starting or draining."""
+    if not phases.is_ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if signaling.manager.draining:
+        return JSONResponse({"status": "draining"}, status_code=503)
+    return JSONResponse({"status": "ready"})
+
+
+phases.mark("build app")
+
+
 # --- Static SPA serving ---
 #
 # The whole point of the .deb deploy: one process answers /api/*, /ws, AND the
@@ -130,3 +297,5 @@ else:
         "(frontend is served separately).",
         WEB_DIST,
     )
+
+phases.mark("static files")
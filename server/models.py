@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import re
+from typing import Optional
+
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
 
@@ -37,3 +39,13 @@ class PublicUser(BaseModel):
 class AuthResponse(BaseModel):
     access_token: str
     user: PublicUser
+
+
+class UserSearchResult(BaseModel):
+    id: str
+    username: str
+
+
+class UserSearchResponse(BaseModel):
+    users: list[UserSearchResult]
+    next_cursor: Optional[str] = None
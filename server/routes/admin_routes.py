@@ -0,0 +1,280 @@
+"""Operator endpoints under /api/admin, gated on the ADMIN_TOKEN shared secret."""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+import os
+import threading
+import time
+from typing import Any, Iterator, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from .. import logs
+from ..auth import require_admin
+from ..backup import BackupBusy, backups
+from ..cdr import CDR_KINDS, cdr, iter_events, summarize
+from ..config import settings
+from ..db import CDR_COLUMNS, query_cdr_events
+from ..loopmon import collapsed, monitor, sample_stacks
+from ..startup import phases
+from ..telemetry import Metric, telemetry
+from ..tracing import tracer
+from ..user_search import cache as search_cache
+from ..ws.compression import wire_stats
+from ..ws.signaling import manager, noisy
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/backup")
+async def run_backup() -> dict[str, Any]:
+    """Write a database snapshot now. Returns when it's done (409 if one is running)."""
+    try:
+        return await backups.run()
+    except BackupBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/backup")
+def backup_status() -> dict[str, Any]:
+    """Schedule, progress of a running backup, and the last result."""
+    return {**backups.stats(), "snapshots": len(backups.snapshots())}
+
+
+@router.get("/startup")
+def startup_phases() -> dict[str, Any]:
+    """How long each cold-start phase took, up to ready and after it."""
+    return phases.stats()
+
+
+@router.get("/room-snapshots")
+def room_snapshot_stats() -> dict[str, Any]:
+    """Warm-restart snapshots: how often they're written and when the last one was."""
+    if manager.snapshots is None:
+        return {"enabled": False}
+    return {"enabled": True, **manager.snapshots.stats(), "restoring": manager.restoring_count()}
+
+
+@router.get("/user-search")
+def user_search_stats() -> dict[str, Any]:
+    """Hit rate of the hot-prefix cache behind /api/users/search."""
+    return search_cache.stats()
+
+
+@router.get("/room-codes")
+def room_code_stats() -> dict[str, Any]:
+    """Room-code space size and how much of it is currently in use."""
+    return manager.codes.stats()
+
+
+@router.get("/presence")
+def presence_stats() -> dict[str, Any]:
+    """This worker's connections and, if enabled, the cross-worker presence table."""
+    shared = manager.shared.stats() if manager.shared is not None else None
+    return {"pid": os.getpid(), "local": manager.local_count(), "shared": shared}
+
+
+@router.get("/pipeline")
+def pipeline_stats() -> dict[str, Any]:
+    """Inbound /ws pipeline: worker usage, queued lanes, worst queueing delay."""
+    if manager.pipeline is None:
+        return {"enabled": False}
+    return {"enabled": True, **manager.pipeline.stats()}
+
+
+@router.get("/admission")
+def admission_stats() -> dict[str, Any]:
+    """/ws admission control: live signals, limits, and refusals by reason."""
+    return manager.admission.stats()
+
+
+@router.get("/user-lookups")
+def user_lookup_stats() -> dict[str, Any]:
+    """User lookups from /ws, and how many queries coalescing saved."""
+    return manager.users.stats()
+
+
+@router.get("/logging")
+def logging_stats() -> dict[str, Any]:
+    """Background log writer backlog and drops, and what sampling suppressed."""
+    return {**logs.stats(), "sampled": noisy.stats()}
+
+
+@router.get("/recording")
+def recording_stats() -> dict[str, Any]:
+    """Traffic recorder state (WS_RECORD_PATH), for load replay."""
+    if manager.recorder is None:
+        return {"enabled": False}
+    return {"enabled": True, **manager.recorder.stats()}
+
+
+@router.get("/wire")
+def wire_sizes() -> dict[str, Any]:
+    """Bytes per /ws message type, raw vs on the wire, and SDP compaction savings.
+
+    Per-type counts need the tuned protocol (see ws/compression.py).
+    """
+    return wire_stats.stats()
+
+
+# --- Call-detail records --------------------------------------------------------------
+#
+# Times are unix seconds. Every read flushes the in-memory buffer first so the
+# answer includes events from the last few seconds.
+
+
+@router.get("/cdr")
+async def cdr_events(
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    kind: Optional[str] = Query(None, description=", ".join(CDR_KINDS)),
+    user_id: Optional[str] = None,
+    room: Optional[str] = None,
+    after_id: int = 0,
+    limit: int = Query(500, ge=1, le=5000),
+) -> dict[str, Any]:
+    await cdr.flush()
+    # Off the loop: a wide range is a real SQLite query, and signaling shares the loop.
+    events = await asyncio.to_thread(
+        query_cdr_events,
+        since=since, until=until, kind=kind, user_id=user_id, room=room,
+        after_id=after_id, limit=limit,
+    )
+    return {
+        "events": events,
+        "next_after_id": events[-1]["id"] if len(events) == limit else None,
+        "buffer": cdr.stats(),
+    }
+
+
+@router.get("/cdr/summary")
+async def cdr_summary(
+    since: Optional[float] = None, until: Optional[float] = None
+) -> dict[str, Any]:
+    await cdr.flush()
+    # Walks every event in the range, so it runs in a worker thread.
+    return await asyncio.to_thread(lambda: summarize(iter_events(since=since, until=until)))
+
+
+@router.get("/cdr/export")
+async def cdr_export(
+    format: Literal["jsonl", "csv"] = "jsonl",
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> StreamingResponse:
+    await cdr.flush()
+    events = iter_events(since=since, until=until)
+
+    def jsonl() -> Iterator[str]:
+        for e in events:
+            yield json.dumps(e) + "\n"
+
+    def as_csv() -> Iterator[str]:
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=("id",) + CDR_COLUMNS)
+        writer.writeheader()
+        for e in events:
+            writer.writerow(e)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    if format == "csv":
+        return StreamingResponse(as_csv(), media_type="text/csv")
+    return StreamingResponse(jsonl(), media_type="application/x-ndjson")
+
+
+# --- Call-quality telemetry ------------------------------------------------------------
+
+
+# These read the aggregator's OrderedDicts, which the loop inserts into and
+# evicts from. So they run on the loop too (async def), not in the threadpool.
+# The work is in memory and small.
+
+
+@router.get("/telemetry/rooms")
+async def telemetry_rooms(
+    metric: Metric = "packet_loss_pct",
+    limit: int = Query(20, ge=1, le=500),
+) -> dict[str, Any]:
+    """Rooms with recent reports, worst `metric` first."""
+    return {"rooms": telemetry.worst_rooms(metric, limit), "ingest": telemetry.stats()}
+
+
+@router.get("/telemetry/rooms/{code}")
+async def telemetry_room(code: str) -> dict[str, Any]:
+    summary = telemetry.room_summary(code.lower().strip())
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No telemetry for that room.")
+    return summary
+
+
+@router.get("/telemetry/users/{user_id}")
+async def telemetry_user(user_id: str) -> dict[str, Any]:
+    summary = telemetry.user_summary(user_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No telemetry for that user.")
+    return summary
+
+
+# --- Call-setup tracing ------------------------------------------------------------------
+
+
+@router.get("/traces/phases")
+def trace_phases() -> dict[str, Any]:
+    """Per-phase call-setup latency histograms (ms) and how traces ended."""
+    return tracer.phase_stats()
+
+
+@router.get("/traces/slow")
+def slow_traces(limit: int = Query(50, ge=1, le=1000)) -> dict[str, Any]:
+    """Recent setups slower than TRACE_SLOW_MS, newest first, with timelines."""
+    return {"traces": tracer.slow_traces(limit), "threshold_ms": tracer.slow_ms}
+
+
+# --- Event loop + profiling ------------------------------------------------------------
+
+_profiling = threading.Lock()
+
+
+@router.get("/loop")
+def loop_stats() -> dict[str, Any]:
+    """Event-loop scheduling lag (ms) and the most recent stall, if any."""
+    return monitor.stats()
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0, le=settings.profile_max_s),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    threads: Literal["loop", "all"] = "loop",
+) -> PlainTextResponse:
+    """Sample stacks for `seconds` and return them in collapsed (folded) form.
+
+    Feed the body to flamegraph.pl or drop it on speedscope.app. One profile
+    runs at a time.
+    """
+    if not _profiling.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running.")
+    try:
+        # This handler runs on the event loop, so its thread is the loop thread.
+        target = threading.get_ident() if threads == "loop" else None
+        stacks, ticks = await asyncio.to_thread(
+            sample_stacks, seconds, interval_ms / 1000, target
+        )
+    finally:
+        _profiling.release()
+    name = time.strftime("profile-%Y%m%d-%H%M%S.folded")
+    return PlainTextResponse(
+        collapsed(stacks),
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}"',
+            "X-Profile-Samples": str(ticks),
+        },
+    )
@@ -14,6 +14,7 @@ from ..auth import (
 )
 from ..db import UserRow, create_user, find_user_by_identifier
 from ..models import AuthResponse, LoginBody, PublicUser, SignupBody
+from ..user_search import user_added
 
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -34,6 +35,7 @@ def signup(body: SignupBody) -> AuthResponse:
         user = create_user(body.username, str(body.email), hash_password(body.password))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    user_added(user)
     return AuthResponse(access_token=create_access_token(user.id), user=_public(user))
 
 
@@ -0,0 +1,31 @@
+"""POST/GET /api/admin/drain — mounted with the app, not with the deferred admin API.
+
+The rest of /api/admin is mounted after ready (see main._deferred_startup),
+but a deploy may drain the moment /api/ready answers 200, so these two can't
+wait for it.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from ..auth import require_admin
+from ..config import settings
+from ..ws.signaling import manager
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/drain")
+async def start_drain() -> dict[str, Any]:
+    """Start a graceful drain ahead of a restart. Safe to call repeatedly."""
+    manager.start_drain(settings.drain_timeout_s, settings.drain_reconnect_spread_s)
+    return manager.drain_status()
+
+
+@router.get("/drain")
+def drain_status() -> dict[str, Any]:
+    return manager.drain_status()
@@ -0,0 +1,25 @@
+"""GET /api/ice-servers — STUN/TURN config for RTCPeerConnection."""
+
+from __future__ import annotations
+
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, Response
+
+from ..auth import get_current_user
+from ..db import UserRow
+from ..ice import ice
+
+
+router = APIRouter(prefix="/api", tags=["ice"])
+
+
+@router.get("/ice-servers")
+def ice_servers(
+    user: Annotated[UserRow, Depends(get_current_user)], response: Response
+) -> dict[str, Any]:
+    config = ice.for_user(user.id)
+    # Credentials are per user; let the browser reuse them while they're fresh.
+    if config["ttl"]:
+        response.headers["Cache-Control"] = f"private, max-age={config['ttl'] // 4}"
+    return config
@@ -1,14 +1,22 @@
-"""GET /api/users/online — list of users currently connected via WS."""
+"""GET /api/users/online — users currently connected via WS that you can see.
+
+That is you plus your online contacts, or everyone online with PRESENCE_SCOPE=all.
+
+GET /api/users/search?q= — prefix search over usernames (never emails) for
+finding someone to call or add; results carry only id and username. See
+user_search.py.
+"""
 
 from __future__ import annotations
 
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from ..auth import get_current_user
-from ..db import UserRow, get_users_by_ids
-from ..models import PublicUser
+from ..db import UserRow, get_contact_ids, get_users_by_ids
+from ..models import PublicUser, UserSearchResponse, UserSearchResult
+from ..user_search import MAX_LIMIT, search
 from ..ws.signaling import manager
 
 
@@ -16,10 +24,30 @@ router = APIRouter(prefix="/api/users", tags=["users"])
 
 
 @router.get("/online", response_model=list[PublicUser])
-def online_users(_: Annotated[UserRow, Depends(get_current_user)]) -> list[PublicUser]:
-    ids = manager.online_ids()
+def online_users(user: Annotated[UserRow, Depends(get_current_user)]) -> list[PublicUser]:
+    if manager.presence_all:
+        ids = manager.online_ids()
+    else:
+        ids = [i for i in (user.id, *get_contact_ids(user.id)) if manager.is_online(i)]
     users = get_users_by_ids(ids)
     return [
         PublicUser(id=u.id, username=u.username, email=u.email, created_at=u.created_at)
         for u in users
     ]
+
+
+@router.get("/search", response_model=UserSearchResponse)
+def search_users(
+    user: Annotated[UserRow, Depends(get_current_user)],
+    q: str = Query(..., min_length=1, max_length=320),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, max_length=512),
+) -> UserSearchResponse:
+    try:
+        users, next_cursor = search(q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return UserSearchResponse(
+        users=[UserSearchResult(id=u.id, username=u.username) for u in users],
+        next_cursor=next_cursor,
+    )
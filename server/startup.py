@@ -0,0 +1,131 @@
+"""Cold-start phases and the readiness signal.
+
+main.py imports this module first and marks each phase as it finishes: the
+imports, building the app, static files, then each lifespan step. `ready()` closes the critical path. From then on
+`GET /api/ready` answers 200. Under systemd (Type=notify), main.py sends
+READY=1 once uvicorn has bound its socket, which happens only after lifespan
+startup returns, so `systemctl start` and `Restart=always` wait for the real
+thing. `/api/health` only says the process is up.
+
+Anything /ws doesn't need right away runs after ready, as "deferred" phases
+(warming the crypto imports, mounting the admin API; /api/admin/drain is
+mounted up front). `settled()` waits for
+those. The timings are at GET /api/admin/startup. `python -m
+server.bench.cold_start` measures cold start from outside and fails if it
+passes its budget.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+
+log = logging.getLogger("startup")
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process was exec'd (Linux), so interpreter start counts too."""
+    try:
+        with open("/proc/self/stat") as f:
+            started = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(uptime - started / os.sysconf("SC_CLK_TCK"), 0.0)
+
+
+def sd_notify(state: str) -> bool:
+    """Send `state` to systemd if it's listening (NOTIFY_SOCKET). No dependency needed."""
+    path = os.environ.get("NOTIFY_SOCKET")
+    if not path:
+        return False
+    if path.startswith("@"):
+        path = "\0" + path[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+            s.connect(path)
+            s.sendall(state.encode())
+    except OSError as exc:
+        log.warning("sd_notify(%s) failed: %s", state, exc)
+        return False
+    return True
+
+
+class StartupPhases:
+    def __init__(self) -> None:
+        age = _process_age()
+        self._t0 = time.perf_counter()
+        # Time the interpreter spent before this module was imported.
+        self.before_import = age
+        self._last = self._t0
+        self._phases: list[tuple[str, float]] = []
+        self._deferred: list[tuple[str, float]] = []
+        self.ready_s: Optional[float] = None
+        self.settled_s: Optional[float] = None
+        self._settled: Optional[asyncio.Event] = None
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def mark(self, name: str) -> None:
+        """End the phase called `name` (it began at the previous mark)."""
+        now = time.perf_counter()
+        target = self._phases if self.ready_s is None else self._deferred
+        target.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        self._last = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.ready_s is not None
+
+    def ready(self) -> None:
+        """The critical path is done: /ws can take connections once the socket binds."""
+        self.ready_s = self._elapsed()
+        self._last = time.perf_counter()
+        total = self.ready_s + (self.before_import or 0.0)
+        log.info("ready in %.0f ms", total * 1000, extra={"fields": {
+            name: round(s * 1000, 1) for name, s in self._phases
+        }})
+
+    def defer(self) -> None:
+        """Deferred work is starting; `settled()` waits until `finish_deferred()`."""
+        self._settled = asyncio.Event()
+
+    def finish_deferred(self) -> None:
+        self.settled_s = self._elapsed()
+        if self._settled is not None:
+            self._settled.set()
+
+    async def settled(self) -> None:
+        if self._settled is not None:
+            await self._settled.wait()
+
+    def stats(self) -> dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            "before_import_ms": ms(self.before_import),
+            "phases_ms": {name: ms(s) for name, s in self._phases},
+            "ready_ms": ms(self.ready_s),
+            "deferred_ms": {name: ms(s) for name, s in self._deferred},
+            "settled_ms": ms(self.settled_s),
+        }
+
+
+phases = StartupPhases()
@@ -0,0 +1,181 @@
+"""Call-quality telemetry: rolling per-room and per-user windows of client stats.
+
+Audio is peer-to-peer, so the server only knows a call is bad if clients tell
+it. Clients send `stats-report` every few seconds with a summary of their
+WebRTC getStats (RTT, jitter, packet loss, send bitrate); each report is folded
+into two fixed-size rings, one for the sender and one for their room.
+
+Nothing grows with traffic: a ring holds the last TELEMETRY_WINDOW samples as
+flat `array('d')` columns, and the number of tracked rooms/users is capped
+(least recently reported evicted first). Percentiles are computed on read over
+the samples inside TELEMETRY_HORIZON_S — one sort of at most a window's worth
+of floats per metric — so ingest stays O(1).
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Literal, Optional, get_args
+
+from .config import settings
+
+
+Metric = Literal["rtt_ms", "jitter_ms", "packet_loss_pct", "bitrate_kbps"]
+METRICS: tuple[Metric, ...] = get_args(Metric)
+
+# camelCase field on the wire → metric name, and the largest sane value.
+_WIRE = {
+    "rttMs": ("rtt_ms", 60_000.0),
+    "jitterMs": ("jitter_ms", 10_000.0),
+    "packetLossPct": ("packet_loss_pct", 100.0),
+    "bitrateKbps": ("bitrate_kbps", 10_000.0),
+}
+
+_NAN = float("nan")
+
+
+def parse_report(data: Any) -> Optional[dict[str, float]]:
+    """Validated metrics from a `stats-report` payload, or None if it has none."""
+    if not isinstance(data, dict):
+        return None
+    out: dict[str, float] = {}
+    for field, (metric, ceiling) in _WIRE.items():
+        value = data.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        value = float(value)
+        if math.isfinite(value) and value >= 0:
+            out[metric] = min(value, ceiling)
+    return out or None
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted, non-empty list."""
+    pos = (len(ordered) - 1) * q
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+class RollingWindow:
+    """Ring of the last `size` reports, one float column per metric."""
+
+    __slots__ = ("size", "_ts", "_cols", "_next", "_count", "last_ts")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._ts = array("d", [0.0]) * size
+        self._cols = {m: array("d", [_NAN]) * size for m in METRICS}
+        self._next = 0
+        self._count = 0
+        self.last_ts = 0.0
+
+    def add(self, ts: float, values: dict[str, float]) -> None:
+        i = self._next
+        self._ts[i] = ts
+        for metric, col in self._cols.items():
+            col[i] = values.get(metric, _NAN)
+        self._next = (i + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+        self.last_ts = ts
+
+    def summary(self, now: float, horizon: float) -> dict[str, Any]:
+        cutoff = now - horizon
+        live = [i for i in range(self._count) if self._ts[i] >= cutoff]
+        out: dict[str, Any] = {"samples": len(live), "last_report": self.last_ts or None}
+        for metric, col in self._cols.items():
+            values = sorted(v for v in (col[i] for i in live) if v == v)  # drop NaN
+            if not values:
+                out[metric] = None
+                continue
+            out[metric] = {
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "max": values[-1],
+                "mean": sum(values) / len(values),
+            }
+        return out
+
+
+class TelemetryAggregator:
+    def __init__(self, window: int, horizon: float, max_keys: int) -> None:
+        self.window = window
+        self.horizon = horizon
+        self.max_keys = max_keys
+        self._rooms: OrderedDict[str, RollingWindow] = OrderedDict()
+        self._users: OrderedDict[str, RollingWindow] = OrderedDict()
+        self.reports = 0
+        self.rejected = 0
+
+    def _slot(self, table: OrderedDict[str, RollingWindow], key: str) -> RollingWindow:
+        ring = table.get(key)
+        if ring is None:
+            ring = table[key] = RollingWindow(self.window)
+            if len(table) > self.max_keys:
+                table.popitem(last=False)
+        else:
+            table.move_to_end(key)
+        return ring
+
+    def ingest(
+        self, user_id: str, room: Optional[str], data: Any, now: Optional[float] = None
+    ) -> bool:
+        values = parse_report(data)
+        if values is None:
+            self.rejected += 1
+            return False
+        ts = time.time() if now is None else now
+        self._slot(self._users, user_id).add(ts, values)
+        if room:
+            self._slot(self._rooms, room).add(ts, values)
+        self.reports += 1
+        return True
+
+    def room_summary(self, code: str, now: Optional[float] = None) -> Optional[dict[str, Any]]:
+        ring = self._rooms.get(code)
+        if ring is None:
+            return None
+        return ring.summary(time.time() if now is None else now, self.horizon)
+
+    def user_summary(self, user_id: str, now: Optional[float] = None) -> Optional[dict[str, Any]]:
+        ring = self._users.get(user_id)
+        if ring is None:
+            return None
+        return ring.summary(time.time() if now is None else now, self.horizon)
+
+    def worst_rooms(
+        self, metric: str = "packet_loss_pct", limit: int = 20, now: Optional[float] = None
+    ) -> list[dict[str, Any]]:
+        """Rooms with recent reports, worst first (p95, or p50 for bitrate)."""
+        now = time.time() if now is None else now
+        ranked = []
+        for code, ring in self._rooms.items():
+            summary = ring.summary(now, self.horizon)
+            stat = summary.get(metric)
+            if stat is None:
+                continue
+            ranked.append({"room": code, **summary})
+        # Low bitrate is the bad end; for everything else, higher is worse.
+        if metric == "bitrate_kbps":
+            ranked.sort(key=lambda r: r[metric]["p50"])
+        else:
+            ranked.sort(key=lambda r: r[metric]["p95"], reverse=True)
+        return ranked[:limit]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "reports": self.reports,
+            "rejected": self.rejected,
+            "rooms": len(self._rooms),
+            "users": len(self._users),
+        }
+
+
+telemetry = TelemetryAggregator(
+    window=settings.telemetry_window,
+    horizon=settings.telemetry_horizon_s,
+    max_keys=settings.telemetry_max_keys,
+)
@@ -15,6 +15,7 @@ def fresh_db(monkeypatch):  # type: ignore[no-untyped-def]
     tmp.close()
     monkeypatch.setenv("DB_PATH", tmp.name)
     monkeypatch.setenv("JWT_SECRET", "test-secret")
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin")
 
     # Reload settings + modules that captured them at import time.
     import importlib
@@ -23,30 +24,70 @@ def fresh_db(monkeypatch):  # type: ignore[no-untyped-def]
 
     importlib.reload(config)
 
+    from server import startup as startup_module
+
+    importlib.reload(startup_module)
+
     from server import db as db_module
 
     importlib.reload(db_module)
     db_module.init_db()
 
+    from server import cdr as cdr_module
+
+    importlib.reload(cdr_module)
+
+    from server import backup as backup_module
+
+    importlib.reload(backup_module)
+
+    from server import telemetry as telemetry_module
+
+    importlib.reload(telemetry_module)
+
+    from server import tracing as tracing_module
+
+    importlib.reload(tracing_module)
+
+    from server import loopmon as loopmon_module
+
+    importlib.reload(loopmon_module)
+
+    from server import ice as ice_module
+
+    importlib.reload(ice_module)
+
     from server import auth as auth_module
 
     importlib.reload(auth_module)
 
-    from server.routes import auth_routes, users_routes
+    from server import user_search as user_search_module
+
+    importlib.reload(user_search_module)
+
+    from server.routes import auth_routes, ice_routes
 
     importlib.reload(auth_routes)
-    importlib.reload(users_routes)
+    importlib.reload(ice_routes)
 
-    from server.ws import signaling
+    from server.ws import compression, signaling
 
+    importlib.reload(compression)
     importlib.reload(signaling)
 
+    from server.routes import admin_routes, drain_routes, users_routes
+
+    importlib.reload(users_routes)
+    importlib.reload(drain_routes)
+    importlib.reload(admin_routes)
+
     from server import main as main_module
 
     importlib.reload(main_module)
 
     yield main_module.app
 
+    db_module.close_writer()
     try:
         os.unlink(tmp.name)
     except OSError:
@@ -58,4 +99,7 @@ def client(fresh_db):  # type: ignore[no-untyped-def]
     from fastapi.testclient import TestClient
 
     with TestClient(fresh_db) as c:
+        from server.startup import phases
+
+        c.portal.call(phases.settled)   # the admin API mounts just after startup
         yield c
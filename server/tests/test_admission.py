@@ -0,0 +1,131 @@
+"""/ws admission control: lag, connection ceiling, handshake slots, retry hints."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _token(client, username):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": username, "email": f"{username}@x.com", "password": "abcdefgh1"},
+    )
+    assert r.status_code == 201, r.text
+    return r.json()["access_token"]
+
+
+def _refused(client, token):  # type: ignore[no-untyped-def]
+    with client.websocket_connect(f"/ws?token={token}") as ws:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_text()
+    assert exc.value.code == 1013
+    return exc.value.reason
+
+
+def test_handshake_slots_are_handed_over_in_order() -> None:
+    from server.ws.admission import BUSY, Admission
+
+    async def scenario():  # type: ignore[no-untyped-def]
+        adm = Admission(open_sockets=lambda: 0, loop_lag_ms=lambda: 0.0,
+                        max_handshakes=1, wait_s=0.05)
+        assert await adm.enter() is None
+        second = asyncio.ensure_future(adm.enter())
+        await asyncio.sleep(0)
+        assert adm.stats()["waiting"] == 1
+        adm.leave()                                     # slot goes straight to `second`
+        assert await second is None
+        assert adm.stats()["handshakes"] == 1
+        assert await adm.enter() == BUSY                # waited 50 ms, nothing freed up
+        adm.leave()
+        return adm.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["handshakes"] == 0 and stats["waiting"] == 0
+    assert stats["admitted"] == 2 and stats["delayed"] == 2 and stats["refused"] == {"busy": 1}
+
+
+def test_ceiling_and_lag_refuse_before_auth(client):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    alice, bob = _token(client, "alice"), _token(client, "bob")
+    adm = signaling.manager.admission
+    adm.max_connections = 1
+    with client.websocket_connect(f"/ws?token={alice}") as a:
+        assert a.receive_json()["type"] == "websocket-connected"
+        reason = _refused(client, bob)
+        assert re.fullmatch(r"full retry-after-ms=\d+", reason)
+        assert 1000 <= int(reason.rsplit("=", 1)[1]) <= adm.retry_spread_s * 1000
+
+        # Alice's established socket is untouched.
+        a.send_json({"type": "room-create", "data": {}})
+        while a.receive_json()["type"] != "room-joined":
+            pass
+
+    adm.max_connections = 0
+    adm._loop_lag_ms = lambda: 10_000.0
+    assert _refused(client, "not-even-a-token").startswith("lagging ")
+    adm._loop_lag_ms = lambda: 0.0
+    with client.websocket_connect(f"/ws?token={bob}") as b:
+        assert b.receive_json()["type"] == "websocket-connected"
+
+    stats = client.get("/api/admin/admission", headers=ADMIN).json()
+    assert stats["refused"] == {"full": 1, "lagging": 1}
+    assert stats["handshakes"] == 0 and stats["admitted"] == 2
+
+
+def test_registered_socket_stops_counting_as_a_handshake(client, monkeypatch):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    alice = _token(client, "alice")
+    adm = signaling.manager.admission
+    adm.max_connections = 1
+    seen = []
+    welcome = signaling._welcome
+
+    async def watched(ws, user):  # type: ignore[no-untyped-def]
+        seen.append((adm.stats()["handshakes"], adm.stats()["open_sockets"], adm._refusal()))
+        await welcome(ws, user)
+
+    monkeypatch.setattr(signaling, "_welcome", watched)
+    with client.websocket_connect(f"/ws?token={alice}") as a:
+        assert a.receive_json()["type"] == "websocket-connected"
+    # Counted once, as an open socket, before the welcome went out.
+    assert seen == [(0, 1, "full")]
+
+
+def test_draining_hint_comes_before_admission(client):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    alice = _token(client, "alice")
+    assert client.post("/api/admin/drain", headers=ADMIN).status_code == 200
+    signaling.manager.admission._loop_lag_ms = lambda: 10_000.0   # would refuse as "lagging"
+    with client.websocket_connect(f"/ws?token={alice}") as ws:
+        assert ws.receive_json()["type"] == "server-draining"
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_text()
+    assert exc.value.code == 1012
+    stats = client.get("/api/admin/admission", headers=ADMIN).json()
+    assert stats["refused"] == {} and stats["admitted"] == 0
+
+
+def test_current_lag_counts_an_overdue_probe() -> None:
+    from server.loopmon import LoopMonitor
+
+    async def scenario():  # type: ignore[no-untyped-def]
+        mon = LoopMonitor(interval=0.01, stall_ms=0)
+        assert mon.current_lag_ms() == 0.0              # not running: no signal
+        mon.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.15)                                # block the loop
+        lag = mon.current_lag_ms()
+        await mon.stop()
+        return lag
+
+    assert asyncio.run(scenario()) >= 100
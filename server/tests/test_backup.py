@@ -0,0 +1,133 @@
+"""Online backups: stepped copy under writes, gzip output, retention, schedule, admin."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+import sqlite3
+import threading
+import time
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _fill(n: int) -> None:
+    from server import db
+
+    conn = sqlite3.connect(db.settings.db_path)
+    conn.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+        ((f"id-{i}", f"user{i}", f"user{i}@x.com", "h" * 60, "2026-01-01") for i in range(n)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _restore(path: str, into: str) -> sqlite3.Connection:
+    with gzip.open(path, "rb") as src, open(into, "wb") as dst:
+        dst.write(src.read())
+    return sqlite3.connect(into)
+
+
+def test_stepped_backup_stays_consistent_under_writes(tmp_path):  # type: ignore[no-untyped-def]
+    from server import db
+    from server.backup import DbBackups
+
+    _fill(3000)
+    stop = threading.Event()
+    written = []
+
+    def writer() -> None:
+        conn = sqlite3.connect(db.settings.db_path, timeout=5)
+        i = 0
+        while not stop.is_set():
+            conn.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+                         (f"w-{i}", f"w{i}", f"w{i}@x.com", "h", "2026-01-01"))
+            conn.commit()
+            written.append(i)
+            i += 1
+            time.sleep(0.002)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        b = DbBackups(db.settings.db_path, str(tmp_path), step_pages=4, step_sleep=0.002,
+                      max_restarts=3)
+        result = b.backup_now()
+    finally:
+        stop.set()
+        thread.join()
+
+    assert written, "writer never ran"
+    assert result["restarts"] <= 4 and result["pages"] > 0 and result["pages_per_s"] > 0
+    assert os.path.basename(result["path"]).startswith("voip-")
+    assert [os.path.basename(p) for p in b.snapshots()] == [os.path.basename(result["path"])]
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".tmp")]
+    conn = _restore(result["path"], str(tmp_path / "restored.db"))
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert conn.execute("SELECT count(*) FROM users WHERE id LIKE 'id-%'").fetchone()[0] == 3000
+    conn.close()
+
+
+def test_prune_keeps_newest_and_schedule_counts_from_it(tmp_path):  # type: ignore[no-untyped-def]
+    from server import db
+    from server.backup import DbBackups
+
+    b = DbBackups(db.settings.db_path, str(tmp_path), interval=3600, keep_days=1)
+    assert b._next_due() == 0                            # nothing on disk: due now
+    old = time.time() - 3 * 86400
+    for stamp in ("20260101T000000Z", "20260102T000000Z"):
+        path = tmp_path / f"voip-{stamp}.db.gz"
+        path.write_bytes(b"x")
+        os.utime(path, (old, old))
+    assert b.prune() == 1                               # the newest stays even if old
+    assert [p.name for p in tmp_path.iterdir()] == ["voip-20260102T000000Z.db.gz"]
+
+    b.backup_now()
+    assert len(b.snapshots()) == 1                      # stale one pruned by the run
+    assert 3590 < b._next_due() <= 3600
+
+
+def test_admin_backup_endpoint(client, tmp_path):  # type: ignore[no-untyped-def]
+    from server.backup import backups
+
+    backups.directory = str(tmp_path)
+    r = client.post("/api/admin/backup", headers=ADMIN)
+    assert r.status_code == 200, r.text
+    assert r.json()["bytes"] > 0
+    status = client.get("/api/admin/backup", headers=ADMIN).json()
+    assert status["runs"] == 1 and status["snapshots"] == 1 and not status["running"]
+    assert client.post("/api/admin/backup").status_code in (401, 403)
+
+
+def test_concurrent_runs_are_refused(tmp_path):  # type: ignore[no-untyped-def]
+    from server import db
+    from server.backup import BackupBusy, DbBackups
+
+    b = DbBackups(db.settings.db_path, str(tmp_path))
+
+    async def scenario():  # type: ignore[no-untyped-def]
+        first = asyncio.ensure_future(b.run())
+        await asyncio.sleep(0)
+        try:
+            await b.run()
+        except BackupBusy:
+            refused = True
+        else:
+            refused = False
+        await first
+        return refused
+
+    assert asyncio.run(scenario())
+
+
+def test_backup_dir_defaults_next_to_the_database(monkeypatch):  # type: ignore[no-untyped-def]
+    from server.config import load_settings
+
+    monkeypatch.delenv("BACKUP_DIR", raising=False)
+    monkeypatch.setenv("DB_PATH", "/var/lib/voip-opus/voip.db")
+    assert load_settings().backup_dir == "/var/lib/voip-opus/backups"
+    monkeypatch.setenv("DB_PATH", "voip.db")
+    assert load_settings().backup_dir == os.path.join(".", "backups")
@@ -0,0 +1,103 @@
+"""Call-detail records: buffering, flush to SQLite, query/summary/export API."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _signup(client, username, password="abcdefgh1"):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": username, "email": f"{username}@x.com", "password": password},
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_ring_buffer_drops_oldest_and_counts_it():
+    from server.cdr import CdrLog
+
+    log = CdrLog(capacity=3, flush_interval=60)
+    for i in range(5):
+        log.record("call-request", f"u{i}", peer_id="x")
+    assert log.stats() == {
+        "enabled": True, "recorded": 5, "written": 0, "pending": 3, "dropped": 2,
+    }
+    assert asyncio.run(log.flush()) == 3
+    assert log.stats()["written"] == 3
+
+
+def test_summary_pairs_calls_and_room_sessions():
+    from server.cdr import summarize
+
+    def ev(ts, kind, user, peer=None, room=None, accepted=None, participants=None):  # type: ignore[no-untyped-def]
+        return {"ts": ts, "kind": kind, "user_id": user, "peer_id": peer, "room": room,
+                "accepted": accepted, "participants": participants}
+
+    out = summarize([
+        ev(0, "call-request", "a", "b"),
+        ev(1, "call-response", "b", "a", accepted=1),
+        ev(31, "hang-up", "a", "b"),
+        ev(40, "call-request", "a", "c"),
+        ev(41, "call-response", "c", "a", accepted=0),
+        ev(50, "room-join", "a", room="r", participants=1),
+        ev(55, "room-join", "b", room="r", participants=2),
+        ev(60, "room-join", "c", room="r", participants=3),
+        ev(70, "room-leave", "a", room="r", participants=2),
+        ev(80, "room-leave", "b", room="r", participants=1),
+        ev(90, "room-leave", "c", room="r", participants=0),
+    ])
+    assert out["calls"]["requested"] == 2
+    assert out["calls"]["accepted"] == 1
+    assert out["calls"]["declined"] == 1
+    assert out["calls"]["avg_duration_s"] == 30
+    assert out["rooms"]["completed"] == 1
+    assert out["rooms"]["avg_duration_s"] == 40
+    assert out["rooms"]["max_participants"] == 3
+
+
+def test_signaling_events_land_in_cdr_api(client):  # type: ignore[no-untyped-def]
+    alice = _signup(client, "alice")
+    bob = _signup(client, "bob")
+    bob_id = bob["user"]["id"]
+
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a:
+        a.receive_text(); a.receive_text()
+        with client.websocket_connect(f"/ws?token={bob['access_token']}") as b:
+            b.receive_text(); b.receive_text()
+
+            a.send_text(json.dumps({"type": "call-request", "to": bob_id}))
+            b.receive_text()
+            b.send_text(json.dumps({
+                "type": "call-response", "to": alice["user"]["id"], "data": {"accepted": True},
+            }))
+            a.receive_text()
+            a.send_text(json.dumps({"type": "hang-up", "to": bob_id}))
+            b.receive_text()
+
+            a.send_text(json.dumps({"type": "room-create"}))
+            a.receive_text()
+            a.send_text(json.dumps({"type": "room-leave"}))
+            a.receive_text()
+
+    r = client.get("/api/admin/cdr", headers=ADMIN)
+    assert r.status_code == 200
+    kinds = [e["kind"] for e in r.json()["events"]]
+    assert kinds == ["call-request", "call-response", "hang-up", "room-join", "room-leave"]
+
+    r = client.get("/api/admin/cdr", params={"kind": "call-response"}, headers=ADMIN)
+    [resp] = r.json()["events"]
+    assert resp["accepted"] == 1 and resp["peer_id"] == alice["user"]["id"]
+
+    summary = client.get("/api/admin/cdr/summary", headers=ADMIN).json()
+    assert summary["calls"]["completed"] == 1
+    assert summary["rooms"]["completed"] == 1
+
+    csv_text = client.get("/api/admin/cdr/export", params={"format": "csv"}, headers=ADMIN).text
+    lines = csv_text.strip().splitlines()
+    assert lines[0].startswith("id,ts,kind")
+    assert len(lines) == 6
+    assert client.get("/api/admin/cdr").status_code == 403
@@ -0,0 +1,164 @@
+"""Signaling wire size: thresholded permessage-deflate and compact SDP."""
+
+from __future__ import annotations
+
+import json
+
+SDP = "\r\n".join([
+    "v=0",
+    "o=- 4611731400430051336 2 IN IP4 127.0.0.1",
+    "s=-",
+    "t=0 0",
+    "a=group:BUNDLE 0",
+    "a=extmap-allow-mixed",
+    "a=msid-semantic: WMS 7d1f",
+    "m=audio 9 UDP/TLS/RTP/SAVPF 111 63 9 0 8 13 110 126",
+    "c=IN IP4 0.0.0.0",
+    "a=rtcp:9 IN IP4 0.0.0.0",
+    "a=ice-ufrag:Hn6t",
+    "a=ice-pwd:7PSrCMnx5uF3xX3PBDqKs9Eo",
+    "a=ice-options:trickle",
+    "a=fingerprint:sha-256 3C:5E:7A:1B:52:60:2F:8D:55:BD:5D:0E:63:17:8C:9B:1A:6E:03:9E:B5:33:C0:AF:41:6D:F0:36:D8:69:0E:9C",
+    "a=setup:actpass",
+    "a=mid:0",
+    "a=extmap:1 urn:ietf:params:rtp-hdrext:ssrc-audio-level",
+    "a=extmap:2 http://www.webrtc.org/experiments/rtp-hdrext/abs-send-time",
+    "a=extmap:3 http://www.ietf.org/id/draft-holmer-rmcat-transport-wide-cc-extensions-01",
+    "a=extmap:4 urn:ietf:params:rtp-hdrext:sdes:mid",
+    "a=sendrecv",
+    "a=msid:7d1f 0b8e",
+    "a=rtcp-mux",
+    "a=rtcp-rsize",
+    "a=rtpmap:111 opus/48000/2",
+    "a=rtcp-fb:111 transport-cc",
+    "a=fmtp:111 minptime=10;useinbandfec=1",
+    "a=rtpmap:63 red/48000/2",
+    "a=fmtp:63 111/111",
+    "a=rtpmap:9 G722/8000",
+    "a=rtpmap:0 PCMU/8000",
+    "a=rtpmap:8 PCMA/8000",
+    "a=rtpmap:13 CN/8000",
+    "a=rtpmap:110 telephone-event/48000",
+    "a=rtpmap:126 telephone-event/8000",
+    "a=ssrc:1583463731 cname:rA5t0pmFdn0Yh1G3",
+    "a=ssrc:1583463731 msid:7d1f 0b8e",
+    "",
+])
+
+
+def test_sdp_compaction_round_trips_and_shrinks():
+    from server.ws import sdp_compact
+
+    text = sdp_compact.compact(SDP)
+    assert text is not None and sdp_compact.expand(text) == SDP
+    assert len(json.dumps(text)) < 0.6 * len(json.dumps(SDP))
+    assert sdp_compact.compact("v=0\na=mid:0\r\n") is None      # bare LF: leave it alone
+    for bad in ("~", "~!", "~" + "Z"):
+        try:
+            sdp_compact.expand(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(bad)
+
+
+def test_deflate_skips_small_messages_and_counts_bytes():
+    from websockets.extensions.permessage_deflate import PerMessageDeflate
+    from websockets.frames import Frame, Opcode
+
+    from server.ws import compression
+
+    stats = compression.WireStats()
+    compression.wire_stats, saved = stats, compression.wire_stats
+    try:
+        factory = compression.ThresholdDeflateFactory(
+            256, server_max_window_bits=12, client_max_window_bits=12,
+            compress_settings={"memLevel": 5},
+        )
+        params, server = factory.process_request_params([("client_max_window_bits", None)], [])
+        assert ("server_max_window_bits", "12") in params
+        client = PerMessageDeflate(False, False, 12, 12)
+
+        small = json.dumps({"type": "ice-candidate", "data": {"candidate": "x"}}).encode()
+        big = json.dumps({"type": "offer", "data": {"type": "offer", "sdp": SDP}}).encode()
+        for payload in (small, big, big):
+            wire = server.encode(Frame(Opcode.TEXT, payload))
+            assert wire.rsv1 is (payload is big)
+            assert client.decode(wire).data == payload
+        inbound = client.encode(Frame(Opcode.TEXT, big))
+        assert server.decode(inbound).data == big
+
+        out = stats.stats()
+        assert out["out"]["ice-candidate"]["saved_bytes"] == 0
+        offer = out["out"]["offer"]
+        assert offer["messages"] == 2 and offer["compressed"] == 2
+        assert offer["wire_bytes"] < offer["raw_bytes"] / 2
+        assert out["in"]["offer"]["messages"] == 1
+    finally:
+        compression.wire_stats = saved
+
+
+def test_compact_sdp_is_opt_in_per_recipient(client):  # type: ignore[no-untyped-def]
+    tokens = {}
+    for name in ("alice", "bob"):
+        r = client.post(
+            "/api/auth/signup",
+            json={"username": name, "email": f"{name}@x.com", "password": "abcdefgh1"},
+        )
+        tokens[name] = r.json()
+    alice_id, bob_id = tokens["alice"]["user"]["id"], tokens["bob"]["user"]["id"]
+
+    with client.websocket_connect(f"/ws?token={tokens['alice']['access_token']}&sdp=compact") as a, \
+            client.websocket_connect(f"/ws?token={tokens['bob']['access_token']}") as b:
+        assert json.loads(a.receive_text())["data"]["sdpCompact"] == 1
+        a.receive_text()
+        assert "sdpCompact" not in json.loads(b.receive_text())["data"]
+        b.receive_text()
+
+        b.send_text(json.dumps({"type": "offer", "to": alice_id, "data": {"type": "offer", "sdp": SDP}}))
+        offer = json.loads(a.receive_text())["data"]
+        assert "sdp" not in offer and offer["sdpv"] == 1
+
+        answer = {"type": "answer", "sdpc": offer["sdpc"], "sdpv": 1}
+        a.send_text(json.dumps({"type": "answer", "to": bob_id, "data": answer}))
+        assert json.loads(b.receive_text())["data"] == {"type": "answer", "sdp": SDP}
+
+        a.send_text(json.dumps({"type": "answer", "to": bob_id, "data": {"sdpc": "~!", "sdpv": 1}}))
+        assert json.loads(a.receive_text())["data"]["message"] == "invalid compact SDP"
+
+    wire = client.get("/api/admin/wire", headers={"X-Admin-Token": "test-admin"}).json()
+    assert wire["sdp_compaction"]["messages"] == 1
+    assert wire["sdp_compaction"]["saved_bytes"] > 0
+
+
+def test_web_client_table_matches_server():
+    import ast
+    import re
+    from pathlib import Path
+
+    from server.ws import sdp_compact
+
+    ts = (Path(__file__).resolve().parents[2] / "web" / "src" / "lib" / "sdpCompact.ts").read_text()
+    body = re.search(r"const TABLE: readonly string\[\] = \[(.*?)\];", ts, re.S).group(1)
+    entries = tuple(ast.literal_eval(m) for m in re.findall(r"'(?:[^'\\]|\\.)*'", body))
+    assert entries == sdp_compact.TABLE
+    assert f"SDP_COMPACT_VERSION = {sdp_compact.VERSION};" in ts
+
+
+def test_falls_back_to_stock_protocol_when_uvicorn_moves_its_module(monkeypatch):  # type: ignore[no-untyped-def]
+    import importlib
+    import sys
+
+    from uvicorn.protocols.websockets.auto import AutoWebSocketsProtocol
+
+    from server.ws import compression
+
+    monkeypatch.setitem(sys.modules, "uvicorn.protocols.websockets.websockets_sansio_impl", None)
+    try:
+        importlib.reload(compression)
+        assert compression.TUNED is False
+        assert issubclass(compression.SignalingWebSocketProtocol, AutoWebSocketsProtocol)
+    finally:
+        monkeypatch.undo()
+        importlib.reload(compression)
+    assert compression.TUNED is True
@@ -0,0 +1,126 @@
+"""Contact graph: persisted edges, add-contact, contact-scoped presence."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+
+
+def _signup(client, username):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": username, "email": f"{username}@x.com", "password": "abcdefgh1"},
+    )
+    return r.json()
+
+
+def _recv(ws):  # type: ignore[no-untyped-def]
+    return json.loads(ws.receive_text())
+
+
+def test_edges_are_directed_and_indexed_both_ways(client):  # type: ignore[no-untyped-def]
+    from server import db
+
+    a, b, c = (_signup(client, n)["user"]["id"] for n in ("alice", "bob", "carol"))
+    assert db.add_contact(a, b) is True
+    assert db.add_contact(a, b) is False          # idempotent
+    db.add_contact(c, b)
+    assert db.get_contact_ids(a) == [b]
+    assert sorted(db.get_watcher_ids(b)) == sorted([a, c])
+    assert db.get_watcher_ids(a) == []
+
+    conn = sqlite3.connect(db.settings.db_path)
+    plan = " ".join(
+        str(r[-1]) for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT owner_id FROM contacts WHERE contact_id = ?", (b,)
+        )
+    )
+    conn.close()
+    assert "idx_contacts_reverse" in plan
+
+
+def test_presence_reaches_only_watchers(client):  # type: ignore[no-untyped-def]
+    alice, bob, carol = (_signup(client, n) for n in ("alice", "bob", "carol"))
+
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a, \
+            client.websocket_connect(f"/ws?token={carol['access_token']}") as c:
+        _recv(a); _recv(a)
+        _recv(c); assert [u["username"] for u in _recv(c)["data"]] == ["carol"]
+
+        a.send_text(json.dumps({"type": "add-contact", "data": {"username": "nobody"}}))
+        assert _recv(a)["data"]["message"] == "No such user."
+        # Emails never match, so add-contact can't tell who is registered.
+        a.send_text(json.dumps({"type": "add-contact", "data": {"username": "bob@x.com"}}))
+        assert _recv(a)["data"]["message"] == "No such user."
+        a.send_text(json.dumps({"type": "add-contact", "data": {"username": "alice"}}))
+        assert _recv(a)["data"]["message"] == "You can't add yourself."
+        a.send_text(json.dumps({"type": "add-contact", "data": {"username": "bob"}}))
+        assert _recv(a)["type"] == "contact-added"
+        assert [u["username"] for u in _recv(a)["data"]] == ["alice"]
+
+        with client.websocket_connect(f"/ws?token={bob['access_token']}") as b:
+            _recv(b)
+            # Bob hasn't added anyone: his roster is just himself.
+            assert [u["username"] for u in _recv(b)["data"]] == ["bob"]
+            roster = _recv(a)
+            assert {u["username"] for u in roster["data"]} == {"alice", "bob"}
+
+            online = client.get(
+                "/api/users/online",
+                headers={"Authorization": f"Bearer {alice['access_token']}"},
+            ).json()
+            assert {u["username"] for u in online} == {"alice", "bob"}
+
+        assert [u["username"] for u in _recv(a)["data"]] == ["alice"]  # bob left
+
+        # Carol watches nobody, so none of that reached her: the next frame she
+        # sees is the answer to her own round-trip.
+        c.send_text(json.dumps({"type": "room-create"}))
+        assert _recv(c)["type"] == "room-joined"
+
+
+def test_presence_scope_all_keeps_global_roster(client, monkeypatch):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    monkeypatch.setattr(signaling.manager, "presence_all", True)
+    alice, bob = (_signup(client, n) for n in ("alice", "bob"))
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a:
+        _recv(a); _recv(a)
+        with client.websocket_connect(f"/ws?token={bob['access_token']}") as b:
+            _recv(b); _recv(b)
+            assert {u["username"] for u in _recv(a)["data"]} == {"alice", "bob"}
+
+
+def test_graph_shares_empty_edges_until_one_is_added(client):  # type: ignore[no-untyped-def]
+    from server.ws.contacts import ContactGraph
+
+    a, b = (_signup(client, n)["user"]["id"] for n in ("alice", "bob"))
+    graph = ContactGraph()
+
+    async def load() -> None:
+        await graph.load(a)
+        await graph.load(b)
+
+    asyncio.run(load())
+    assert graph.contacts(a) is graph.watchers(b)           # one shared empty set
+    graph.add(a, b)
+    assert graph.contacts(a) == {b} and graph.watchers(b) == {a}
+    assert not graph.contacts(b) and graph.contacts(b) is graph.watchers(a)
+
+
+def test_edge_added_while_loading_is_kept(client):  # type: ignore[no-untyped-def]
+    from server import db
+    from server.ws.contacts import ContactGraph
+
+    a, b = (_signup(client, n)["user"]["id"] for n in ("alice", "bob"))
+    graph = ContactGraph()
+
+    async def scenario() -> None:
+        loading = asyncio.ensure_future(graph.load(a))
+        await asyncio.sleep(0)                    # lookup now running in a thread
+        graph.add(a, b)                           # mirrored before the DB row is seen
+        await loading
+
+    asyncio.run(scenario())
+    assert graph.contacts(a) == {b} and db.get_contact_ids(a) == []
@@ -0,0 +1,95 @@
+"""Schema migrations and the user lookups that depend on them."""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+
+def test_fresh_db_is_at_latest_version():
+    from server import db
+
+    with db._connect() as conn:
+        assert db.schema_version(conn) == db.MIGRATIONS[-1][0]
+
+
+def test_legacy_install_upgrades_in_place(tmp_path):  # type: ignore[no-untyped-def]
+    from server import db
+
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.executescript(db.SCHEMA)  # what init_db used to do, user_version 0
+    conn.execute(
+        "INSERT INTO users VALUES ('1', 'alice', 'Alice@Example.com', 'x', 'now')"
+    )
+    conn.commit()
+    assert db.schema_version(conn) == 0
+
+    assert db.migrate(conn) == db.MIGRATIONS[-1][0]
+    assert db.migrate(conn) == db.MIGRATIONS[-1][0]  # idempotent
+    assert conn.execute("SELECT count(*) FROM users").fetchone()[0] == 1
+    conn.close()
+
+
+def test_failed_migration_leaves_previous_version(tmp_path, monkeypatch):  # type: ignore[no-untyped-def]
+    from server import db
+
+    latest = db.MIGRATIONS[-1][0]
+    monkeypatch.setattr(
+        db, "MIGRATIONS", db.MIGRATIONS + [(99, "CREATE TABLE t (x); SELECT nope FROM t;")]
+    )
+    conn = sqlite3.connect(tmp_path / "m.db")
+    with pytest.raises(sqlite3.Error):
+        db.migrate(conn)
+    assert db.schema_version(conn) == latest
+    assert conn.execute(
+        "SELECT count(*) FROM sqlite_master WHERE name = 't'"
+    ).fetchone()[0] == 0
+    conn.close()
+
+
+def test_email_login_lookup_uses_an_index():
+    from server import db
+
+    db.create_user("alice", "Alice@Example.com", "hash")
+    assert db.find_user_by_identifier("alice@example.COM").username == "alice"
+    with db._connect() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM users "
+            "WHERE username = ? OR lower(email) = lower(?) LIMIT 1",
+            ("x", "x"),
+        ).fetchall()
+    details = " ".join(row[3] for row in plan)
+    assert "SCAN users" not in details
+    assert "idx_users_email_lower" in details
+
+
+def test_concurrent_signups_share_transactions_and_report_conflicts(monkeypatch):  # type: ignore[no-untyped-def]
+    from concurrent.futures import ThreadPoolExecutor
+
+    from server import db
+
+    db.close_writer()
+    writer = db.UserWriter(max_batch=16, max_wait_ms=20)
+    monkeypatch.setattr(db, "_writer", writer)
+
+    def signup(i: int):  # type: ignore[no-untyped-def]
+        # Every 10th request reuses an earlier username; every 7th an email.
+        name = f"user{i - 1}" if i % 10 == 9 else f"user{i}"
+        email = f"user{i - 1}@x.com" if i % 7 == 6 else f"user{i}@x.com"
+        try:
+            return db.create_user(name, email, "hash").username
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(signup, range(64)))
+    writer.close()
+
+    created = [r for r in results if r.startswith("user")]
+    assert "That username is already taken." in results
+    assert "An account with that email already exists." in results
+    assert writer.rows == 64
+    assert writer.batches < 64
+    for name in created:
+        assert db.find_user_by_identifier(name) is not None
@@ -0,0 +1,80 @@
+"""Graceful drain: admin trigger, reconnect hints, rooms allowed to finish."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _signup(client, username, password="abcdefgh1"):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": username, "email": f"{username}@x.com", "password": password},
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def _recv(ws):  # type: ignore[no-untyped-def]
+    return json.loads(ws.receive_text())
+
+
+def test_drain_requires_admin_token(client):  # type: ignore[no-untyped-def]
+    assert client.post("/api/admin/drain").status_code == 403
+    assert client.post("/api/admin/drain", headers={"X-Admin-Token": "nope"}).status_code == 403
+    r = client.get("/api/admin/drain", headers=ADMIN)
+    assert r.status_code == 200
+    assert r.json()["draining"] is False
+
+
+def test_drain_hints_and_closes_idle_sockets(client):  # type: ignore[no-untyped-def]
+    alice = _signup(client, "alice")
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a:
+        a.receive_text(); a.receive_text()
+
+        r = client.post("/api/admin/drain", headers=ADMIN)
+        assert r.status_code == 200
+        assert r.json()["draining"] is True
+
+        hint = _recv(a)
+        assert hint["type"] == "server-draining"
+        assert hint["data"]["inRoom"] is False
+        assert 1000 <= hint["data"]["retryAfterMs"] <= 20_000
+        with pytest.raises(WebSocketDisconnect) as exc:
+            a.receive_text()
+        assert exc.value.code == 1012
+
+    # New connections are turned away with a hint, before auth.
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as again:
+        assert _recv(again)["type"] == "server-draining"
+        with pytest.raises(WebSocketDisconnect):
+            again.receive_text()
+
+
+def test_drain_waits_for_room_to_end(client):  # type: ignore[no-untyped-def]
+    from server import db
+
+    # Snapshots are on, but without DRAIN_CUT_ROOMS the drain still waits.
+    alice = _signup(client, "alice")
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a:
+        a.receive_text(); a.receive_text()
+        a.send_text(json.dumps({"type": "room-create"}))
+        assert _recv(a)["type"] == "room-joined"
+
+        client.post("/api/admin/drain", headers=ADMIN)
+        hint = _recv(a)
+        assert hint["data"]["inRoom"] is True
+
+        # Still connected while the room is alive: a round-trip works.
+        a.send_text(json.dumps({"type": "room-leave"}))
+        assert _recv(a)["type"] == "room-left"
+        # Once the room is gone the socket is released.
+        with pytest.raises(WebSocketDisconnect) as exc:
+            a.receive_text()
+        assert exc.value.code == 1012
+    # The final snapshot is taken at the cut, and by then no room was left.
+    assert db.load_room_snapshot(0) == {}
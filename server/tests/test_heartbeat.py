@@ -0,0 +1,87 @@
+"""Timer wheel + heartbeat bookkeeping (driven with a fake clock)."""
+
+from __future__ import annotations
+
+from server.ws.heartbeat import Heartbeat, TimerWheel
+
+
+async def _noop(_: str) -> None:
+    return None
+
+
+def _hb(interval: float = 3.0, timeout: float = 2.0) -> Heartbeat[str]:
+    return Heartbeat(interval, timeout, 1.0, on_ping=_noop, on_dead=_noop)
+
+
+def test_wheel_expires_in_order_and_cancels():
+    wheel: TimerWheel[str] = TimerWheel(1.0, 8)
+    wheel.schedule("a", 1)
+    wheel.schedule("b", 3)
+    wheel.schedule("c", 3)
+    wheel.cancel("c")
+    assert wheel.advance() == ["a"]
+    assert wheel.advance() == []
+    assert wheel.advance() == ["b"]
+    assert len(wheel) == 0
+
+
+def test_wheel_handles_delays_longer_than_one_rotation():
+    wheel: TimerWheel[str] = TimerWheel(1.0, 4)
+    wheel.schedule("x", 10)
+    fired = [t for t in range(1, 13) if wheel.advance() == ["x"]]
+    assert fired == [10]
+
+
+def test_wheel_reschedule_replaces_previous_deadline():
+    wheel: TimerWheel[str] = TimerWheel(1.0, 8)
+    wheel.schedule("a", 1)
+    wheel.schedule("a", 2)
+    assert wheel.advance() == []
+    assert wheel.advance() == ["a"]
+
+
+def test_idle_socket_is_pinged_then_reaped():
+    hb = _hb()
+    hb.track("u", now=0)
+    assert hb.expire(1) == ([], [])
+    assert hb.expire(2) == ([], [])
+    assert hb.expire(3) == (["u"], [])   # interval reached → ping
+    assert hb.expire(4) == ([], [])
+    assert hb.expire(5) == ([], ["u"])   # no pong within timeout → dead
+    assert len(hb) == 0
+
+
+def test_traffic_defers_ping_and_pong_rescues():
+    hb = _hb()
+    hb.track("u", now=0)
+    hb.touch("u", now=2)
+    hb.expire(1); hb.expire(2)
+    assert hb.expire(3) == ([], [])      # seen at t=2, not idle long enough
+    assert hb.expire(4) == ([], [])
+    assert hb.expire(5) == (["u"], [])
+    hb.touch("u", now=6)                 # the pong
+    hb.expire(6)
+    assert hb.expire(7) == ([], [])      # alive again, back on the interval
+    assert len(hb) == 1
+
+
+def test_forgotten_socket_never_fires():
+    hb = _hb()
+    hb.track("u", now=0)
+    hb.forget("u")
+    assert [hb.expire(t) for t in range(1, 8)] == [([], [])] * 7
+
+
+def test_pong_frame_is_accepted_silently(client):  # type: ignore[no-untyped-def]
+    import json
+
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": "alice", "email": "alice@x.com", "password": "abcdefgh1"},
+    )
+    token = r.json()["access_token"]
+    with client.websocket_connect(f"/ws?token={token}") as ws:
+        ws.receive_text(); ws.receive_text()
+        ws.send_text(json.dumps({"type": "pong"}))
+        ws.send_text(json.dumps({"type": "room-create"}))
+        assert json.loads(ws.receive_text())["type"] == "room-joined"
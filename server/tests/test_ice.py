@@ -0,0 +1,79 @@
+"""ICE server config: coturn REST credentials, per-user caching, delivery."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+
+
+def _signup(client, username="alice"):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": username, "email": f"{username}@x.com", "password": "abcdefgh1"},
+    )
+    return r.json()
+
+
+def test_credential_matches_coturn_rest_scheme():
+    from server.ice import turn_credential
+
+    username, credential = turn_credential("s3cret", "u1", 1_700_000_000)
+    assert username == "1700000000:u1"
+    expected = hmac.new(b"s3cret", b"1700000000:u1", hashlib.sha1).digest()
+    assert base64.b64decode(credential) == expected
+
+
+def test_credentials_are_cached_until_near_expiry():
+    from server.ice import IceConfig
+
+    cfg = IceConfig(["stun:s:3478"], ["turn:t:3478"], "k", ttl=400, max_cached=2)
+    first = cfg.for_user("u1", now=1000)
+    assert first["iceServers"][0] == {"urls": ["stun:s:3478"]}
+    assert first["iceServers"][1]["username"] == "1400:u1"
+    assert first["ttl"] == 400
+
+    again = cfg.for_user("u1", now=1250)                   # 150s left > ttl/4
+    assert again["iceServers"][1] == first["iceServers"][1]
+    assert again["ttl"] == 150
+    fresh = cfg.for_user("u1", now=1350)                   # 50s left: reissue
+    assert fresh["iceServers"][1]["username"] == "1750:u1"
+    assert (cfg.issued, cfg.hits) == (2, 1)
+
+    cfg.for_user("u2", now=1350)
+    cfg.for_user("u3", now=1350)
+    assert cfg.stats()["cached"] == 2                      # u1 evicted
+
+
+def test_turn_is_omitted_without_a_secret():
+    from server.ice import IceConfig
+
+    cfg = IceConfig(["stun:s:3478"], ["turn:t:3478"], "", ttl=400)
+    assert cfg.for_user("u1") == {"iceServers": [{"urls": ["stun:s:3478"]}], "ttl": None}
+
+
+def test_endpoint_and_websocket_hello(client, monkeypatch):  # type: ignore[no-untyped-def]
+    from server import ice as ice_module
+    from server.routes import ice_routes
+    from server.ws import signaling
+
+    assert client.get("/api/ice-servers").status_code == 401
+
+    cfg = ice_module.IceConfig(["stun:s:3478"], ["turn:t:3478?transport=udp"], "k", ttl=3600)
+    monkeypatch.setattr(ice_routes, "ice", cfg)
+    monkeypatch.setattr(signaling, "ice", cfg)
+    alice = _signup(client)
+
+    r = client.get(
+        "/api/ice-servers", headers={"Authorization": f"Bearer {alice['access_token']}"}
+    )
+    assert r.status_code == 200
+    turn = r.json()["iceServers"][1]
+    assert turn["username"].endswith(":" + alice["user"]["id"])
+    assert r.headers["cache-control"] == "private, max-age=900"
+
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as ws:
+        hello = json.loads(ws.receive_text())
+    assert hello["data"]["ice"]["iceServers"][1] == turn
+    assert cfg.hits == 1
@@ -0,0 +1,89 @@
+"""Queued, sampled, structured logging."""
+
+from __future__ import annotations
+
+import json
+import logging
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _record(msg: str, **fields) -> logging.LogRecord:  # type: ignore[no-untyped-def]
+    record = logging.LogRecord("signaling", logging.WARNING, __file__, 1, msg, (), None)
+    if fields:
+        record.fields = fields  # type: ignore[attr-defined]
+    return record
+
+
+def test_formatter_appends_fields_or_writes_json():
+    from server.logs import StructuredFormatter
+
+    text = StructuredFormatter().format(_record("send failed", user="a b", error="OSError"))
+    assert text.endswith('WARNING signaling send failed user="a b" error=OSError')
+    line = json.loads(StructuredFormatter(json_lines=True).format(_record("x", user="u1")))
+    assert line["msg"] == "x" and line["user"] == "u1" and line["level"] == "WARNING"
+
+
+def test_sampling_is_per_call_site_and_reports_suppressed(monkeypatch):  # type: ignore[no-untyped-def]
+    from server import logs
+
+    seen: list[logging.LogRecord] = []
+
+    class Keep(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            seen.append(record)
+
+    logger = logging.getLogger("test.sampled")
+    logger.addHandler(Keep())
+    logger.propagate = False
+    clock = [100.0]
+    monkeypatch.setattr(logs.time, "monotonic", lambda: clock[0])
+    sampled = logs.Sampled(logger, window=10, burst=3)
+
+    def send_failed(user: str) -> None:
+        sampled.warning("send failure to %s", user, fields={"user": user})
+
+    for i in range(50):
+        send_failed(f"u{i}")
+    sampled.warning("other site")                     # separate budget
+    assert len(seen) == 4 and seen[-1].getMessage() == "other site"
+    assert seen[0].funcName == "send_failed"          # the caller, not logs.py
+
+    clock[0] += 11
+    send_failed("late")
+    send_failed("later")
+    assert seen[4].fields == {"user": "late", "suppressed": 47}  # type: ignore[attr-defined]
+    assert seen[5].fields == {"user": "later"}                   # type: ignore[attr-defined]
+    assert sampled.stats()["suppressed"] == 47
+
+
+def test_full_queue_drops_instead_of_blocking():
+    import queue
+
+    from server.logs import _DroppingQueueHandler
+
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=2))
+    for i in range(5):
+        handler.emit(_record(f"m{i}"))
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_json_lines_keep_the_traceback(capsys):  # type: ignore[no-untyped-def]
+    from server.logs import setup_logging, shutdown_logging
+
+    setup_logging(fmt="json")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("signaling").exception("relay failed for %s", "u1",
+                                                 extra={"fields": {"user": "u1"}})
+    shutdown_logging()
+    line = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert line["msg"] == "relay failed for u1" and line["user"] == "u1"
+    assert line["exc"].startswith("Traceback") and "ValueError: boom" in line["exc"]
+
+
+def test_admin_logging_stats(client):  # type: ignore[no-untyped-def]
+    body = client.get("/api/admin/logging", headers=ADMIN).json()
+    assert body["queued"] is True and body["dropped"] == 0
+    assert body["sampled"]["suppressed"] == 0
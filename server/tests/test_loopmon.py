@@ -0,0 +1,72 @@
+"""Event-loop lag monitor, stall capture and the sampling profiler."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _block_the_loop_for_a_while(seconds):  # type: ignore[no-untyped-def]
+    time.sleep(seconds)
+
+
+def test_monitor_measures_lag_and_captures_the_blocking_stack():
+    from server.loopmon import LoopMonitor
+
+    async def scenario():  # type: ignore[no-untyped-def]
+        mon = LoopMonitor(interval=0.02, stall_ms=50)
+        mon.start()
+        await asyncio.sleep(0.1)
+        _block_the_loop_for_a_while(0.3)
+        await asyncio.sleep(0.05)
+        await mon.stop()
+        return mon.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["lag"]["count"] >= 3
+    assert stats["max_lag_ms"] >= 200
+    assert stats["stalls"] == 1
+    assert any("_block_the_loop_for_a_while" in line for line in stats["last_stall"]["stack"])
+    assert "scenario" in stats["last_stall"]["task"]
+
+
+def _spin(stop):  # type: ignore[no-untyped-def]
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collapses_stacks_per_thread():
+    from server.loopmon import collapsed, sample_stacks
+
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        stacks, ticks = sample_stacks(0.1, 0.005, thread_id=worker.ident)
+    finally:
+        stop.set()
+        worker.join()
+    assert ticks >= 5
+    assert sum(stacks.values()) == ticks
+    text = collapsed(stacks)
+    top = text.splitlines()[0]
+    assert "_spin (test_loopmon.py:" in top
+    assert top.rsplit(" ", 1)[1].isdigit()
+
+
+def test_admin_endpoints(client):  # type: ignore[no-untyped-def]
+    assert client.get("/api/admin/loop").status_code == 403
+    loop = client.get("/api/admin/loop", headers=ADMIN).json()
+    assert loop["stalls"] == 0 and "lag" in loop
+
+    r = client.post("/api/admin/profile", params={"seconds": 0.2, "threads": "all"},
+                    headers=ADMIN)
+    assert r.status_code == 200
+    assert r.headers["content-disposition"].startswith("attachment; filename=\"profile-")
+    assert int(r.headers["x-profile-samples"]) > 0
+    assert r.text.strip()
+    assert client.post("/api/admin/profile", params={"seconds": 600},
+                       headers=ADMIN).status_code == 422
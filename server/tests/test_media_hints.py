@@ -0,0 +1,81 @@
+"""Opus media hints: the recommendation table and its delivery over /ws."""
+
+from __future__ import annotations
+
+import json
+
+LIMITS = {"uplink_budget_kbps": 192, "min_kbps": 12, "max_kbps": 64}
+
+
+def _quality(loss=None, rtt=None):  # type: ignore[no-untyped-def]
+    def stat(v):  # type: ignore[no-untyped-def]
+        return None if v is None else {"p50": v, "p95": v, "max": v, "mean": v}
+    return {"samples": 5, "packet_loss_pct": stat(loss), "rtt_ms": stat(rtt)}
+
+
+def test_bitrate_splits_uplink_budget_across_mesh_streams():
+    from server.ws.media_hints import recommend
+
+    assert recommend(2, None, **LIMITS)["maxBitrateKbps"] == 64   # capped at max
+    assert recommend(4, None, **LIMITS)["maxBitrateKbps"] == 64   # 192 / 3
+    assert recommend(7, None, **LIMITS)["maxBitrateKbps"] == 32   # 192 / 6
+    assert recommend(40, None, **LIMITS)["maxBitrateKbps"] == 12  # floor
+    two, three, four = (recommend(n, None, **LIMITS) for n in (2, 3, 4))
+    assert (two["dtx"], three["dtx"]) == (False, True)
+    assert (three["ptimeMs"], four["ptimeMs"]) == (20, 40)
+
+
+def test_telemetry_drives_fec_bitrate_and_ptime():
+    from server.ws.media_hints import recommend
+
+    clean = recommend(2, _quality(loss=0.2, rtt=40), **LIMITS)
+    assert clean["fec"] is False and clean["ptimeMs"] == 20
+    lossy = recommend(2, _quality(loss=8, rtt=40), **LIMITS)
+    assert lossy["fec"] is True and lossy["maxBitrateKbps"] == 48
+    far = recommend(2, _quality(loss=0.2, rtt=450), **LIMITS)
+    assert far["ptimeMs"] == 40
+    assert recommend(2, None, **LIMITS)["fec"] is True  # unknown network: stay safe
+
+
+def test_membership_messages_carry_hints_and_telemetry_pushes_changes(client, monkeypatch):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    monkeypatch.setattr(signaling, "_HINT_RECHECK_S", 0.0)
+    tokens = []
+    for name in ("alice", "bob"):
+        r = client.post(
+            "/api/auth/signup",
+            json={"username": name, "email": f"{name}@x.com", "password": "abcdefgh1"},
+        )
+        tokens.append(r.json()["access_token"])
+
+    with client.websocket_connect(f"/ws?token={tokens[0]}") as a:
+        a.receive_text(); a.receive_text()
+        a.send_text(json.dumps({"type": "room-create"}))
+        joined = json.loads(a.receive_text())
+        code = joined["data"]["code"]
+        assert joined["data"]["mediaHints"]["participants"] == 1
+
+        with client.websocket_connect(f"/ws?token={tokens[1]}") as b:
+            b.receive_text(); b.receive_text()
+            b.send_text(json.dumps({"type": "room-join", "data": {"code": code}}))
+            assert json.loads(b.receive_text())["data"]["mediaHints"]["participants"] == 2
+            pj = json.loads(a.receive_text())
+            assert pj["type"] == "participant-joined"
+            assert pj["data"]["mediaHints"]["maxBitrateKbps"] == 64
+
+            b.send_text(json.dumps({"type": "stats-report", "data": {"packetLossPct": 9}}))
+            for ws in (a, b):
+                pushed = json.loads(ws.receive_text())
+                assert pushed["type"] == "media-hints"
+                assert pushed["data"]["code"] == code
+                assert pushed["data"]["maxBitrateKbps"] == 48
+
+            # Same advice again: nothing is pushed, so the next frame is room-left.
+            b.send_text(json.dumps({"type": "stats-report", "data": {"packetLossPct": 9}}))
+            b.send_text(json.dumps({"type": "room-leave"}))
+            assert json.loads(b.receive_text())["type"] == "room-left"
+
+        left = json.loads(a.receive_text())
+        assert left["type"] == "participant-left"
+        assert left["data"]["mediaHints"]["participants"] == 1
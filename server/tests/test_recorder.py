@@ -0,0 +1,80 @@
+"""Traffic recorder: anonymised binary records, and the replayer's frame builder."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+
+def _signup(client, username):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": username, "email": f"{username}@x.com", "password": "abcdefgh1"},
+    )
+    return r.json()
+
+
+def test_records_round_trip_without_ids_or_payloads(tmp_path):  # type: ignore[no-untyped-def]
+    from server.ws.recorder import CONNECT, IN, OUT, ROOM, ROOM_BIT, TrafficRecorder, read_recording
+
+    path = str(tmp_path / "traffic.vrec")
+
+    async def session(second: bool) -> None:
+        rec = TrafficRecorder(path, max_bytes=1 << 20)
+        rec.connected("alice-uuid")
+        rec.inbound("alice-uuid", {"type": "offer", "to": "bob-uuid", "data": {"sdp": "secret"}}, 900)
+        rec.inbound("alice-uuid", {"type": "room-join", "data": {"code": "Red-Fox-12"}}, 60)
+        rec.inbound("alice-uuid", {"type": "Not A Type"}, 20)
+        rec.outbound("bob-uuid", "offer", 950)
+        if second:
+            rec.room_created("bob-uuid", "blue-owl-3")
+        await rec.stop()
+
+    asyncio.run(session(False))
+    asyncio.run(session(True))
+    raw = open(path, "rb").read()
+    assert b"uuid" not in raw and b"secret" not in raw and b"fox" not in raw.lower()
+
+    records = list(read_recording(path))
+    assert {r.segment for r in records} == {0, 1}
+    first = [(r.event, r.type, r.user, r.peer, r.size) for r in records if r.segment == 0]
+    assert first == [
+        (CONNECT, "other", 1, 0, 0),
+        (IN, "offer", 1, 2, 900),
+        (IN, "room-join", 1, ROOM_BIT | 1, 60),
+        (IN, "other", 1, 0, 20),
+        (OUT, "offer", 2, 0, 950),
+    ]
+    assert records[-1].event == ROOM and records[-1].peer == ROOM_BIT | 2   # red-fox was 1
+
+
+def test_endpoint_records_connect_frames_and_sends(client, tmp_path):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+    from server.ws.recorder import CONNECT, DISCONNECT, IN, OUT, TrafficRecorder, read_recording
+
+    path = str(tmp_path / "traffic.vrec")
+    signaling.manager.recorder = TrafficRecorder(path, max_bytes=1 << 20)
+    alice = _signup(client, "alice")
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as ws:
+        ws.receive_text()
+        ws.receive_text()
+        ws.send_text(json.dumps({"type": "room-create"}))
+        assert json.loads(ws.receive_text())["type"] == "room-joined"
+    client.portal.call(signaling.manager.recorder.flush)
+
+    events = [(r.event, r.type) for r in read_recording(path)]
+    assert events[0] == (CONNECT, "other")
+    assert (OUT, "websocket-connected") in events and (OUT, "contacts-update") in events
+    assert (IN, "room-create") in events and (OUT, "room-joined") in events
+    assert events[-1] == (DISCONNECT, "other")
+
+
+def test_replay_frames_keep_type_addressee_and_size():
+    from server.bench.replay import _payload
+    from server.ws.recorder import IN, ROOM_BIT, Record
+
+    frame = json.loads(_payload(Record(0, 1.0, IN, "offer", 1, 2, 800), {2: "bob"}, {}))
+    assert frame["type"] == "offer" and frame["to"] == "bob" and "sdp" in frame["data"]
+    assert abs(len(_payload(Record(0, 1.0, IN, "offer", 1, 2, 800), {2: "bob"}, {})) - 800) <= 2
+    join = json.loads(_payload(Record(0, 1.0, IN, "room-join", 1, ROOM_BIT | 4, 10), {}, {4: "rp-4"}))
+    assert join["data"]["code"] == "rp-4"
@@ -0,0 +1,117 @@
+"""Room-code allocator: uniqueness, exhaustion, explicit claims, release."""
+
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from server.ws.room_codes import RoomCodeAllocator, load_wordlist
+
+
+def _tiny(seed: int = 0) -> RoomCodeAllocator:
+    return RoomCodeAllocator(["red", "blue"], ["cat", "dog", "owl"], digits=1, rng=random.Random(seed))
+
+
+def test_allocates_every_code_exactly_once_then_reports_full():
+    alloc = _tiny()
+    assert alloc.capacity == 2 * 3 * 10
+    codes = {alloc.allocate() for _ in range(alloc.capacity)}
+    assert len(codes) == alloc.capacity
+    assert all(alloc.in_space(c) for c in codes)
+    assert alloc.stats()["utilization"] == 1.0
+    with pytest.raises(ValueError):
+        alloc.allocate()
+
+
+def test_release_makes_code_available_again():
+    alloc = _tiny()
+    codes = [alloc.allocate() for _ in range(alloc.capacity)]
+    alloc.release(codes[7])
+    alloc.release(codes[7])  # double release is a no-op
+    assert alloc.stats()["free"] == 1
+    assert alloc.allocate() == codes[7]
+
+
+def test_claimed_codes_are_never_allocated():
+    alloc = _tiny(seed=3)
+    assert alloc.claim("blue-owl-4")
+    assert not alloc.claim("blue-owl-4")
+    assert alloc.claim("not-a-space-code")  # custom names aren't tracked
+    handed_out = {alloc.allocate() for _ in range(alloc.capacity - 1)}
+    assert "blue-owl-4" not in handed_out
+
+
+def test_codes_decode_strictly():
+    alloc = RoomCodeAllocator(digits=2)
+    assert alloc.in_space("amber-fox-42")
+    assert not alloc.in_space("amber-fox-09")
+    assert not alloc.in_space("amber-fox-100")
+    assert not alloc.in_space("amber-unicorn-42")
+    assert not alloc.in_space("amber-fox-٤٢")          # Arabic-Indic digits
+    assert not alloc.in_space("amber-fox-４２")          # fullwidth digits
+    assert RoomCodeAllocator(digits=3).capacity == 46 * 59 * 900
+
+
+def test_wordlist_file(tmp_path):  # type: ignore[no-untyped-def]
+    f = tmp_path / "adj.txt"
+    f.write_text("# custom\nSleepy\n\nloud  # trailing comment\n")
+    assert load_wordlist(str(f), ["x"]) == ["sleepy", "loud"]
+    assert load_wordlist("", ["x"]) == ["x"]
+    with pytest.raises(ValueError):
+        RoomCodeAllocator(["a-b"], ["cat"])
+
+
+def test_room_code_returned_to_pool_when_room_empties(client):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": "alice", "email": "alice@x.com", "password": "abcdefgh1"},
+    )
+    token = r.json()["access_token"]
+    admin = {"X-Admin-Token": "test-admin"}
+    with client.websocket_connect(f"/ws?token={token}") as ws:
+        ws.receive_text(); ws.receive_text()
+        ws.send_text(json.dumps({"type": "room-create"}))
+        json.loads(ws.receive_text())
+        assert client.get("/api/admin/room-codes", headers=admin).json()["allocated"] == 1
+        ws.send_text(json.dumps({"type": "room-leave"}))
+        ws.receive_text()
+        assert client.get("/api/admin/room-codes", headers=admin).json()["allocated"] == 0
+
+
+def test_unicode_digit_alias_cannot_free_a_live_room(client):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    admin = {"X-Admin-Token": "test-admin"}
+    alice, bob = (
+        client.post(
+            "/api/auth/signup",
+            json={"username": name, "email": f"{name}@x.com", "password": "abcdefgh1"},
+        ).json()
+        for name in ("alice", "bob")
+    )
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a, \
+            client.websocket_connect(f"/ws?token={bob['access_token']}") as b:
+        for ws in (a, b):
+            ws.receive_text(); ws.receive_text()
+        a.send_text(json.dumps({"type": "room-create"}))
+        code = json.loads(a.receive_text())["data"]["code"]
+        alias = "".join(chr(ord(c) + 0xFEE0) if c.isdigit() else c for c in code)
+
+        b.send_text(json.dumps({"type": "room-join", "data": {"code": alias}}))
+        joined = json.loads(b.receive_text())
+        assert joined["type"] == "room-joined" and joined["data"]["code"] == alias
+        b.send_text(json.dumps({"type": "room-leave"}))
+        assert json.loads(b.receive_text())["type"] == "room-left"
+
+        # The alias room emptied without giving alice's code back to the pool.
+        assert client.get("/api/admin/room-codes", headers=admin).json()["allocated"] == 1
+        assert signaling.manager._rooms[code] == {alice["user"]["id"]}
+
+        # A code the allocator holds but no room owns is refused, not adopted.
+        held = "amber-ant-11" if code != "amber-ant-11" else "amber-ant-12"
+        assert signaling.manager.codes.claim(held)
+        b.send_text(json.dumps({"type": "room-join", "data": {"code": held}}))
+        assert json.loads(b.receive_text()) == {
+            "type": "room-error", "data": {"reason": "Room code already in use."}}
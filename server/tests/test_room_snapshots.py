@@ -0,0 +1,154 @@
+"""Warm restarts: room snapshots, re-attach on reconnect, expiry."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _signup(client, username):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": username, "email": f"{username}@x.com", "password": "abcdefgh1"},
+    )
+    return r.json()
+
+
+def _recv(ws):  # type: ignore[no-untyped-def]
+    return json.loads(ws.receive_text())
+
+
+def test_snapshot_round_trip_and_ttl():
+    from server import db
+
+    db.save_room_snapshot([("red-fox-1", "a"), ("red-fox-1", "b"), ("blue-owl-2", "c")], 1000.0)
+    assert db.load_room_snapshot(999.0) == {"red-fox-1": ["a", "b"], "blue-owl-2": ["c"]}
+    assert db.load_room_snapshot(1001.0) == {}
+    db.save_room_snapshot([("blue-owl-2", "c")], 2000.0)      # replaces, not appends
+    assert db.load_room_snapshot(0) == {"blue-owl-2": ["c"]}
+
+
+def test_drain_snapshots_rooms_and_cuts_immediately(client, monkeypatch):  # type: ignore[no-untyped-def]
+    from server import db
+    from server.ws import signaling
+
+    monkeypatch.setattr(signaling.manager, "drain_cut_rooms", True)
+    alice = _signup(client, "alice")
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a:
+        _recv(a); _recv(a)
+        a.send_text(json.dumps({"type": "room-create"}))
+        code = _recv(a)["data"]["code"]
+
+        client.post("/api/admin/drain", headers=ADMIN)
+        assert _recv(a)["data"]["inRoom"] is True
+        with pytest.raises(WebSocketDisconnect) as exc:
+            a.receive_text()                       # no waiting for the room to end
+        assert exc.value.code == 1012
+
+    assert db.load_room_snapshot(0) == {code: [alice["user"]["id"]]}
+    stats = client.get("/api/admin/room-snapshots", headers=ADMIN).json()
+    assert stats["frozen"] is True and stats["saves"] == 1
+    # Frozen: the departures that followed the cut weren't written over it.
+    assert client.portal.call(signaling.manager.snapshots.save) is False
+
+
+def test_returning_users_are_reattached_and_stragglers_expire(client):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    alice, bob, carol = (_signup(client, n) for n in ("alice", "bob", "carol"))
+    ids = [u["user"]["id"] for u in (alice, bob, carol)]
+    manager = signaling.manager
+    manager.restore_rooms({"calm-otter-7": ids}, ttl=60)
+    assert sorted(manager.room_membership()) == sorted(("calm-otter-7", i) for i in ids)
+
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a, \
+            client.websocket_connect(f"/ws?token={bob['access_token']}") as b:
+        _recv(a); _recv(a)
+        joined = _recv(a)
+        assert joined["type"] == "room-joined" and joined["data"]["restored"] is True
+        assert joined["data"]["code"] == "calm-otter-7" and joined["data"]["participants"] == []
+
+        _recv(b); _recv(b)
+        joined = _recv(b)
+        assert [p["username"] for p in joined["data"]["participants"]] == ["alice"]
+        arrived = _recv(a)
+        assert arrived["type"] == "participant-joined" and arrived["data"]["restored"] is True
+
+        # Carol never comes back: once the TTL lapses the others hear she left.
+        client.portal.call(manager.expire_restored)
+        assert manager.restoring_count() == 1
+        manager._restore_deadline = 0.0
+        client.portal.call(manager.expire_restored)
+        for ws in (a, b):
+            left = _recv(ws)
+            assert left["type"] == "participant-left" and left["data"]["userId"] == ids[2]
+        assert manager.restoring_count() == 0
+
+
+def test_restore_skips_codes_already_in_use(client):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    alice = _signup(client, "alice")
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a:
+        _recv(a); _recv(a)
+        a.send_text(json.dumps({"type": "room-create"}))
+        code = _recv(a)["data"]["code"]
+
+        signaling.manager.restore_rooms({code: ["someone-else"]}, ttl=60)
+        assert signaling.manager.restoring_count() == 0
+        assert signaling.manager.room_membership() == [(code, alice["user"]["id"])]
+
+
+def test_restored_code_stays_claimed_until_its_members_are_back(client):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+
+    alice, bob = _signup(client, "alice"), _signup(client, "bob")
+    manager = signaling.manager
+    manager.restore_rooms({"calm-otter-17": [alice["user"]["id"]]}, ttl=60)
+
+    # A stranger walks into the held room and out again before alice is back.
+    with client.websocket_connect(f"/ws?token={bob['access_token']}") as b:
+        _recv(b); _recv(b)
+        b.send_text(json.dumps({"type": "room-join", "data": {"code": "calm-otter-17"}}))
+        assert _recv(b)["type"] == "room-joined"
+        b.send_text(json.dumps({"type": "room-leave"}))
+        assert _recv(b)["type"] == "room-left"
+    assert not manager.codes.claim("calm-otter-17")   # still held, not back in the pool
+
+    with client.websocket_connect(f"/ws?token={alice['access_token']}") as a:
+        _recv(a); _recv(a)
+        joined = _recv(a)
+        assert joined["data"]["code"] == "calm-otter-17" and joined["data"]["restored"] is True
+        a.send_text(json.dumps({"type": "room-leave"}))
+        assert _recv(a)["type"] == "room-left"
+    # Everyone is back and gone again: now the code is free.
+    assert manager.codes.claim("calm-otter-17")
+
+
+def test_periodic_tick_runs_expiry_and_saves():
+    import asyncio
+
+    from server import db
+    from server.ws.room_snapshots import RoomSnapshots
+
+    async def scenario() -> int:
+        ticks = 0
+
+        async def on_tick() -> None:
+            nonlocal ticks
+            ticks += 1
+
+        snaps = RoomSnapshots(
+            0.01, 60, collect=lambda: [("red-fox-1", "a")], version=lambda: 1, on_tick=on_tick
+        )
+        snaps.start()
+        await asyncio.sleep(0.1)
+        await snaps.stop()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 2
+    assert db.load_room_snapshot(0) == {"red-fox-1": ["a"]}
@@ -0,0 +1,172 @@
+"""Cross-worker presence table: slot layout, ownership, dead-worker cleanup."""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+
+import pytest
+
+
+def _child(path: str, slots: int, user_id: str, ready, done) -> None:  # type: ignore[no-untyped-def]
+    from server.ws.shared_presence import SharedPresence
+
+    table = SharedPresence(path, slots)
+    table.add(user_id)
+    ready.set()
+    done.wait(10)
+    if done.is_set():
+        table.close()
+
+
+def test_add_remove_and_probing_through_tombstones(tmp_path):  # type: ignore[no-untyped-def]
+    from server.ws.shared_presence import SLOT_SIZE, SharedPresence
+
+    table = SharedPresence(str(tmp_path / "p"), 8)
+    assert SLOT_SIZE == 64
+    ids = [f"user-{i}" for i in range(8)]
+    assert all(table.add(u) for u in ids)
+    assert table.add("one-too-many") is False
+    assert all(u in table for u in ids) and "nobody" not in table
+    for u in ids[::2]:
+        table.remove(u)
+    assert sorted(table.online_ids()) == sorted(ids[1::2])
+    assert table.add("late") and "late" in table
+    stats = table.stats()
+    assert stats["live"] == 5 and stats["workers"] == 1
+    assert stats["tombstones"] <= 2                 # over a quarter of 8 starts a sweep
+    assert all(u in table for u in ids[1::2]) and not any(u in table for u in ids[::2])
+    table.close()
+
+    with pytest.raises(ValueError):
+        SharedPresence(str(tmp_path / "p"), 16)      # layout must match
+    with pytest.raises(ValueError):
+        SharedPresence(str(tmp_path / "q"), 12)
+
+
+def test_churn_keeps_tombstones_and_probes_bounded(tmp_path):  # type: ignore[no-untyped-def]
+    import random
+
+    from server.ws.shared_presence import SharedPresence
+
+    table = SharedPresence(str(tmp_path / "p"), 64)
+    reads = 0
+    read = table._read
+
+    def counting_read(index):  # type: ignore[no-untyped-def]
+        nonlocal reads
+        reads += 1
+        return read(index)
+
+    rng = random.Random(7)
+    online: list[str] = []
+    worst_miss = 0
+    for n in range(20_000):
+        if len(online) < 16 or (len(online) < 24 and rng.random() < 0.5):
+            online.append(f"user-{n}")
+            assert table.add(online[-1])
+        else:
+            table.remove(online.pop(rng.randrange(len(online))))
+        if n % 100 == 0:
+            table._read = counting_read              # type: ignore[method-assign]
+            reads = 0
+            assert table.owner(f"never-{n}") is None
+            worst_miss = max(worst_miss, reads)
+            table._read = read                       # type: ignore[method-assign]
+            assert table.stats()["tombstones"] <= 16
+    assert worst_miss < 32                           # not the whole table
+    assert sorted(table.online_ids()) == sorted(online)
+    table.close()
+
+
+def test_each_write_does_bounded_work_under_the_lock(tmp_path):  # type: ignore[no-untyped-def]
+    from server.ws.shared_presence import _SWEEP_READS, SharedPresence
+
+    table = SharedPresence(str(tmp_path / "p"), 4096)
+    ids = [f"user-{i}" for i in range(3000)]
+    for u in ids:
+        table.add(u)
+    read = table._read
+    worst = 0
+    for u in ids[:2500]:
+        reads = 0
+
+        def counting_read(index):  # type: ignore[no-untyped-def]
+            nonlocal reads
+            reads += 1
+            return read(index)
+
+        table._read = counting_read                  # type: ignore[method-assign]
+        table.remove(u)
+        table._read = read                           # type: ignore[method-assign]
+        worst = max(worst, reads)
+    assert worst < 4 * _SWEEP_READS                  # never a whole-table pass
+    assert table.stats()["tombstones"] <= 4096 // 4 + 1
+    assert sorted(table.online_ids()) == sorted(ids[2500:])
+    table.close()
+
+
+def test_workers_share_one_view_and_dead_workers_are_purged(tmp_path):  # type: ignore[no-untyped-def]
+    from server.ws.shared_presence import SharedPresence
+
+    path = str(tmp_path / "presence")
+    ctx = multiprocessing.get_context("spawn")
+    ready, done = ctx.Event(), ctx.Event()
+    worker = ctx.Process(target=_child, args=(path, 64, "remote", ready, done))
+    worker.start()
+    try:
+        assert ready.wait(30)
+        here = SharedPresence(path, 64)
+        here.add("local")
+        assert here.owner("remote") == worker.pid
+        assert here.owner("local") == os.getpid()
+        here.remove("remote")                         # not ours to drop
+        assert "remote" in here
+    finally:
+        worker.kill()
+        worker.join()
+
+    assert "remote" in here                           # killed: no clean close
+    assert here.purge_dead() == 1
+    assert here.online_ids() == ["local"]
+    here.close()
+
+
+def test_manager_uses_shared_table_for_online_view(client, tmp_path):  # type: ignore[no-untyped-def]
+    from server.ws import signaling
+    from server.ws.shared_presence import SharedPresence
+
+    tokens = {}
+    for name in ("alice", "bob"):
+        r = client.post(
+            "/api/auth/signup",
+            json={"username": name, "email": f"{name}@x.com", "password": "abcdefgh1"},
+        )
+        tokens[name] = r.json()
+    bob_id = tokens["bob"]["user"]["id"]
+
+    path = str(tmp_path / "presence")
+    signaling.manager.open_shared(path, 64)
+    other = SharedPresence(path, 64)
+    other.pid = os.getppid()                           # a live process that isn't us
+    other.add(bob_id)
+    try:
+        with client.websocket_connect(f"/ws?token={tokens['alice']['access_token']}") as a:
+            a.receive_text(); a.receive_text()
+            assert signaling.manager.shared is not None
+            assert tokens["alice"]["user"]["id"] in signaling.manager.shared
+            assert signaling.manager.is_online(bob_id)
+
+            a.send_text(json.dumps({"type": "call-request", "to": bob_id}))
+            failed = json.loads(a.receive_text())
+            assert failed["data"]["reason"] == "User is connected to another worker."
+
+            stats = client.get(
+                "/api/admin/presence", headers={"X-Admin-Token": "test-admin"}
+            ).json()
+            assert stats["local"] == 1 and stats["shared"]["live"] == 2
+        assert signaling.manager.online_ids() == [bob_id]
+    finally:
+        signaling.manager.close_shared()
+        other.close()
@@ -52,10 +52,16 @@ def test_call_request_forwarded(client):  # type: ignore[no-untyped-def]
         # Drain alice's hello + initial roster.
         a.receive_text()
         a.receive_text()
+        a.send_text(json.dumps({"type": "add-contact", "data": {"username": "bob"}}))
+        added = json.loads(a.receive_text())
+        assert added["type"] == "contact-added"
+        assert added["data"]["username"] == "bob"
+        a_roster = json.loads(a.receive_text())
+        assert {u["username"] for u in a_roster["data"]} == {"alice"}  # bob offline
         with client.websocket_connect(f"/ws?token={bob['access_token']}") as b:
             b.receive_text()
             b.receive_text()
-            # Alice gets a roster update when Bob joins.
+            # Alice gets a roster update when her contact Bob connects.
             a_roster = json.loads(a.receive_text())
             assert a_roster["type"] == "contacts-update"
             assert {u["username"] for u in a_roster["data"]} == {"alice", "bob"}
@@ -90,7 +96,6 @@ def test_sdp_offer_forwarded(client):  # type: ignore[no-untyped-def]
         a.receive_text(); a.receive_text()
         with client.websocket_connect(f"/ws?token={bob['access_token']}") as b:
             b.receive_text(); b.receive_text()
-            a.receive_text()  # roster update
 
             fake_offer = {"type": "offer", "sdp": "v=0..."}
             a.send_text(
@@ -100,3 +105,16 @@ def test_sdp_offer_forwarded(client):  # type: ignore[no-untyped-def]
             assert forwarded["type"] == "offer"
             assert forwarded["from"] == alice["user"]["id"]
             assert forwarded["data"] == fake_offer
+
+
+def test_session_keeps_interned_id_and_no_password_hash():
+    import sys
+
+    from server.db import UserRow
+    from server.ws.signaling import Session
+
+    uid = "".join(["3f1c", "-user"])          # built at runtime, so not interned yet
+    session = Session.from_row(UserRow(uid, "alice", "a@x.com", "$2b$12$hash", "2026-01-01"))
+    assert session.id is sys.intern("3f1c-user") and session.public["id"] is session.id
+    assert session.username == "alice"
+    assert "password_hash" not in session.public and not hasattr(session, "__dict__")
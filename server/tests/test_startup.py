@@ -0,0 +1,89 @@
+"""Cold start: deferred imports, phase timings, readiness vs liveness, sd_notify."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+from types import SimpleNamespace
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_import_leaves_admin_and_crypto_for_later(tmp_path):  # type: ignore[no-untyped-def]
+    code = (
+        "import sys, json, server.main\n"
+        "print(json.dumps([m for m in ('jwt', 'bcrypt', 'server.routes.admin_routes')"
+        " if m in sys.modules]))\n"
+    )
+    env = dict(os.environ, DB_PATH=str(tmp_path / "t.db"), PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    assert json.loads(out.strip().splitlines()[-1]) == []
+
+
+def test_ready_and_startup_phases(client):  # type: ignore[no-untyped-def]
+    assert client.get("/api/health").json() == {"status": "ok"}
+    r = client.get("/api/ready")
+    assert r.status_code == 200 and r.json() == {"status": "ready"}
+
+    stats = client.get("/api/admin/startup", headers=ADMIN).json()
+    assert {"imports", "build app", "init db", "background tasks"} <= set(stats["phases_ms"])
+    assert list(stats["deferred_ms"]) == ["crypto", "admin api"]
+    assert stats["settled_ms"] >= stats["ready_ms"] > 0
+
+
+def test_ready_is_503_while_draining(client):  # type: ignore[no-untyped-def]
+    assert client.post("/api/admin/drain", headers=ADMIN).status_code == 200
+    r = client.get("/api/ready")
+    assert r.status_code == 503 and r.json() == {"status": "draining"}
+    assert client.get("/api/health").status_code == 200
+
+
+def test_drain_is_mounted_before_the_deferred_admin_api(fresh_db):  # type: ignore[no-untyped-def]
+    paths = {getattr(r, "path", None) for r in fresh_db.routes}
+    assert "/api/admin/drain" in paths
+    assert "/api/admin/startup" not in paths
+
+
+def test_ready_is_sent_once_uvicorn_listens(tmp_path, monkeypatch, fresh_db):  # type: ignore[no-untyped-def]
+    from server import main
+
+    path = str(tmp_path / "notify")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+        s.bind(path)
+        s.setblocking(False)
+        monkeypatch.setenv("NOTIFY_SOCKET", path)
+        server = SimpleNamespace(started=False, should_exit=False)
+
+        async def run() -> None:
+            task = asyncio.create_task(main._notify_when_serving(server))
+            await asyncio.sleep(0.05)
+            try:
+                s.recv(64)
+            except BlockingIOError:
+                pass
+            else:
+                raise AssertionError("READY=1 sent before the socket was bound")
+            server.started = True
+            await asyncio.wait_for(task, 1)
+
+        asyncio.run(run())
+        assert s.recv(64) == b"READY=1"
+
+
+def test_sd_notify(tmp_path, monkeypatch):  # type: ignore[no-untyped-def]
+    from server.startup import sd_notify
+
+    monkeypatch.delenv("NOTIFY_SOCKET", raising=False)
+    assert sd_notify("READY=1") is False
+    path = str(tmp_path / "notify")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+        s.bind(path)
+        monkeypatch.setenv("NOTIFY_SOCKET", path)
+        assert sd_notify("READY=1") is True
+        assert s.recv(64) == b"READY=1"
@@ -0,0 +1,75 @@
+"""Call-quality telemetry: report parsing, rolling windows, admin API."""
+
+from __future__ import annotations
+
+import json
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def test_parse_report_keeps_only_sane_numbers():
+    from server.telemetry import parse_report
+
+    assert parse_report({"rttMs": 40, "jitterMs": "5", "packetLossPct": 250,
+                         "bitrateKbps": -3}) == {"rtt_ms": 40.0, "packet_loss_pct": 100.0}
+    assert parse_report({"rttMs": True}) is None
+    assert parse_report("nope") is None
+
+
+def test_window_is_bounded_and_ages_out_samples():
+    from server.telemetry import TelemetryAggregator
+
+    agg = TelemetryAggregator(window=10, horizon=60, max_keys=2)
+    for t in range(25):
+        agg.ingest("u1", "room-a", {"rttMs": t, "packetLossPct": 1}, now=1000 + t)
+    summary = agg.user_summary("u1", now=1024)
+    assert summary["samples"] == 10              # only the last 10 are kept
+    assert summary["rtt_ms"]["max"] == 24
+    assert summary["rtt_ms"]["p50"] == 19.5
+    assert agg.user_summary("u1", now=1080)["samples"] == 5    # t < 1020 aged out
+    assert agg.user_summary("u1", now=2000)["rtt_ms"] is None
+
+    agg.ingest("u2", None, {"rttMs": 1}, now=1000)
+    agg.ingest("u3", None, {"rttMs": 1}, now=1000)
+    assert agg.user_summary("u1") is None        # evicted: max_keys=2
+
+
+def test_worst_rooms_ranks_by_p95():
+    from server.telemetry import TelemetryAggregator
+
+    agg = TelemetryAggregator(window=50, horizon=600, max_keys=100)
+    for i in range(20):
+        agg.ingest("a", "good", {"packetLossPct": 0.5, "bitrateKbps": 32}, now=100 + i)
+        agg.ingest("b", "bad", {"packetLossPct": 12 if i % 4 == 0 else 1,
+                                "bitrateKbps": 8}, now=100 + i)
+    ranked = agg.worst_rooms("packet_loss_pct", now=130)
+    assert [r["room"] for r in ranked] == ["bad", "good"]
+    assert [r["room"] for r in agg.worst_rooms("bitrate_kbps", now=130)] == ["bad", "good"]
+
+
+def test_stats_report_over_ws_feeds_room_and_user(client):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": "alice", "email": "alice@x.com", "password": "abcdefgh1"},
+    )
+    body = r.json()
+    with client.websocket_connect(f"/ws?token={body['access_token']}") as ws:
+        ws.receive_text(); ws.receive_text()
+        ws.send_text(json.dumps({"type": "room-create"}))
+        code = json.loads(ws.receive_text())["data"]["code"]
+        for rtt in (30, 50, 70):
+            ws.send_text(json.dumps({"type": "stats-report",
+                                     "data": {"rttMs": rtt, "packetLossPct": 2}}))
+        ws.send_text(json.dumps({"type": "room-leave"}))
+        ws.receive_text()  # round-trip: reports above have been handled
+
+    room = client.get(f"/api/admin/telemetry/rooms/{code}", headers=ADMIN).json()
+    assert room["samples"] == 3
+    assert room["rtt_ms"]["p50"] == 50
+    user = client.get(f"/api/admin/telemetry/users/{body['user']['id']}", headers=ADMIN)
+    assert user.json()["samples"] == 3
+    worst = client.get("/api/admin/telemetry/rooms", params={"metric": "rtt_ms"}, headers=ADMIN)
+    assert worst.json()["rooms"][0]["room"] == code
+    assert client.get("/api/admin/telemetry/rooms", params={"metric": "x"},
+                      headers=ADMIN).status_code == 422
+    assert client.get("/api/admin/telemetry/rooms/nope", headers=ADMIN).status_code == 404
@@ -0,0 +1,118 @@
+"""Call-setup tracing: phase accounting, bounds, and the admin API."""
+
+from __future__ import annotations
+
+import json
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _tracer(**kw):  # type: ignore[no-untyped-def]
+    from server.tracing import CallTracer
+
+    args = {"slow_ms": 3000, "max_active": 100, "slow_keep": 10, "timeout": 60}
+    args.update(kw)
+    return CallTracer(**args)
+
+
+def test_histogram_quantiles_use_bucket_upper_bounds():
+    from server.tracing import Histogram
+
+    h = Histogram()
+    for ms in (3, 40, 40, 40, 200, 60_000):
+        h.add(ms)
+    snap = h.snapshot()
+    assert snap["count"] == 6
+    assert snap["p50_ms"] == 50
+    assert snap["p95_ms"] is None          # overflow bucket
+    assert snap["buckets"]["le_5"] == 1 and snap["buckets"]["inf"] == 1
+
+
+def test_call_trace_phases_and_slow_capture(monkeypatch):  # type: ignore[no-untyped-def]
+    from server import tracing
+
+    clock = [100.0]
+    monkeypatch.setattr(tracing.time, "monotonic", lambda: clock[0])
+    t = _tracer(slow_ms=1000)
+
+    trace_id = t.start("call", "alice", "bob")
+    clock[0] = 105.0                                    # 5s of ringing
+    assert t.mark("bob", "alice", "call-response") == trace_id
+    clock[0] = 105.2
+    t.mark("alice", "bob", "offer")
+    clock[0] = 105.3
+    t.mark("alice", "bob", "ice-candidate")
+    clock[0] = 106.7
+    t.mark("bob", "alice", "answer")                    # completes the trace
+    assert t.mark("bob", "alice", "ice-candidate") is None
+
+    stats = t.phase_stats()
+    assert stats["outcomes"] == {"connected": 1}
+    assert stats["phases"]["ring"]["mean_ms"] == 5000
+    assert stats["phases"]["answer"]["mean_ms"] == 1500
+    assert round(stats["phases"]["first-ice"]["mean_ms"]) == 100
+    assert stats["active"] == 0
+    slow = t.slow_traces()
+    assert [s["trace_id"] for s in slow] == [trace_id]  # 1.7s after accept ≥ 1s
+    assert slow[0]["timeline_ms"]["answer"] == 6700
+
+
+def test_unfinished_traces_are_closed_and_bounded(monkeypatch):  # type: ignore[no-untyped-def]
+    from server import tracing
+
+    clock = [0.0]
+    monkeypatch.setattr(tracing.time, "monotonic", lambda: clock[0])
+    t = _tracer(max_active=2, timeout=30)
+
+    t.start("call", "a", "b")
+    t.mark("b", "a", "call-response")
+    t.end("b", "a", "declined")
+    t.start("room", "c", "d", "room-1")
+    t.start("room", "c", "e", "room-1")
+    t.end_user("c", "left")
+    t.start("call", "f", "g")
+    t.start("call", "h", "i")
+    t.start("call", "j", "k")                           # evicts f-g
+    clock[0] = 31.0
+    t.start("call", "l", "m")                           # h-i and j-k time out
+    assert t.phase_stats()["outcomes"] == {
+        "declined": 1, "left": 2, "evicted": 1, "timeout": 2,
+    }
+    assert t.phase_stats()["active"] == 1
+    assert t.phase_stats()["phases"]["ring"]["count"] == 1
+
+
+def test_signaling_carries_trace_ids_and_feeds_admin_api(client):  # type: ignore[no-untyped-def]
+    tokens = {}
+    for name in ("alice", "bob"):
+        r = client.post(
+            "/api/auth/signup",
+            json={"username": name, "email": f"{name}@x.com", "password": "abcdefgh1"},
+        )
+        tokens[name] = r.json()
+    alice_id, bob_id = tokens["alice"]["user"]["id"], tokens["bob"]["user"]["id"]
+
+    with client.websocket_connect(f"/ws?token={tokens['alice']['access_token']}") as a, \
+            client.websocket_connect(f"/ws?token={tokens['bob']['access_token']}") as b:
+        a.receive_text(); a.receive_text()
+        b.receive_text(); b.receive_text()
+
+        a.send_text(json.dumps({"type": "call-request", "to": bob_id}))
+        ring = json.loads(b.receive_text())
+        trace_id = ring["traceId"]
+        for sender, receiver, to, kind, data in (
+            (b, a, alice_id, "call-response", {"accepted": True}),
+            (a, b, bob_id, "offer", {"sdp": "x"}),
+            (b, a, alice_id, "answer", {"sdp": "y"}),
+            (a, b, bob_id, "ice-candidate", {"candidate": "c"}),
+        ):
+            sender.send_text(json.dumps({"type": kind, "to": to, "data": data}))
+            relayed = json.loads(receiver.receive_text())
+            assert relayed["type"] == kind and relayed["traceId"] == trace_id
+
+    phases = client.get("/api/admin/traces/phases", headers=ADMIN).json()
+    assert phases["outcomes"]["connected"] == 1
+    assert phases["phases"]["setup"]["count"] == 1
+    assert phases["phases"]["relay"]["count"] == 4
+    assert client.get("/api/admin/traces/slow", headers=ADMIN).json()["traces"] == []
+    assert client.get("/api/admin/traces/slow").status_code == 403
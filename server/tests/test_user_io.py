@@ -0,0 +1,109 @@
+"""Bulk user import/export: round trips, validation, conflicts, index rebuild."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+
+HASH = "$2b$12$" + "a" * 53
+
+
+def _user(i: int, **over):  # type: ignore[no-untyped-def]
+    rec = {
+        "id": f"id-{i}",
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "password_hash": HASH,
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }
+    rec.update(over)
+    return rec
+
+
+def _write_jsonl(path, records) -> None:  # type: ignore[no-untyped-def]
+    with open(path, "w") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+
+
+def _indexes() -> set[str]:
+    from server import db
+
+    conn = sqlite3.connect(db.settings.db_path)
+    names = {r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'users'"
+    )}
+    conn.close()
+    return names
+
+
+def test_jsonl_and_csv_round_trip(tmp_path):  # type: ignore[no-untyped-def]
+    from server import db, user_io
+
+    before = _indexes()
+    src = tmp_path / "in.jsonl"
+    _write_jsonl(src, [_user(i) for i in range(25)])
+    assert user_io.main(["import", str(src), "--batch", "10", "--quiet"]) == 0
+    assert _indexes() == before
+    assert db.find_user_by_identifier("USER7@example.com").id == "id-7"
+
+    out = tmp_path / "out.csv"
+    assert user_io.main(["export", str(out), "--quiet"]) == 0
+    assert os.stat(out).st_mode & 0o777 == 0o600
+    lines = out.read_text().splitlines()
+    assert lines[0] == ",".join(db.USER_COLUMNS)
+    assert len(lines) == 26 and lines[1].startswith("id-0,user0,")
+
+    # Re-importing the export is a no-op with the default --on-conflict skip.
+    assert user_io.main(["import", str(out), "--quiet"]) == 0
+    assert len(list(db.iter_user_rows())) == 25
+
+
+def test_invalid_rows_are_skipped_and_missing_fields_filled(tmp_path, capsys):  # type: ignore[no-untyped-def]
+    from server import db, user_io
+
+    src = tmp_path / "in.jsonl"
+    _write_jsonl(src, [
+        _user(1, password_hash="hunter22"),       # plaintext, never hashed here
+        _user(2, username="no spaces allowed"),
+        _user(3, email="nope"),
+        {"username": "fresh", "email": "fresh@example.com", "password_hash": HASH},
+    ])
+    with open(src, "a") as f:
+        f.write("{not json\n")
+    assert user_io.main(["import", str(src), "--quiet"]) == 0
+    err = capsys.readouterr().err
+    assert "not a bcrypt hash" in err and "line 5: bad JSON" in err
+    assert "1 of 5 users" in err and "4 invalid" in err
+    user = db.find_user_by_identifier("fresh")
+    assert user is not None and len(user.id) == 36 and user.created_at
+
+
+def test_conflicts_skip_or_abort(tmp_path, capsys):  # type: ignore[no-untyped-def]
+    from server import db, user_io
+
+    db.create_user("user1", "taken@example.com", HASH)
+    src = tmp_path / "in.jsonl"
+    _write_jsonl(src, [_user(0), _user(1), _user(2, email="taken@example.com")])
+
+    assert user_io.main(["import", str(src), "--quiet"]) == 0
+    assert "2 already present" in capsys.readouterr().err
+    assert [r[1] for r in db.iter_user_rows()] == ["user1", "user0"]
+
+    _write_jsonl(src, [_user(5), _user(6), _user(1)])
+    assert user_io.main(["import", str(src), "--on-conflict", "abort", "--quiet"]) == 1
+    # The failing batch is rolled back as a whole, and the indexes still come back.
+    assert db.get_user_by_id("id-5") is None
+    assert "idx_users_email_lower" in _indexes()
+
+
+def test_init_db_restores_indexes_an_import_crashed_out_of():
+    from server import db
+
+    before = _indexes()
+    importer = db.BulkUserImport().__enter__()
+    importer._conn.close()                          # dies without __exit__
+    assert not any(name.startswith("idx_") for name in _indexes())
+    db.init_db()
+    assert _indexes() == before and "idx_users_username_lower" in before
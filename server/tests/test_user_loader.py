@@ -0,0 +1,87 @@
+"""User lookup coalescing: one query per tick, shared results, chunked batches."""
+
+from __future__ import annotations
+
+import asyncio
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _make_users(n: int) -> list[str]:
+    from server import db
+
+    return [db.create_user(f"user{i}", f"user{i}@x.com", "hash").id for i in range(n)]
+
+
+def _count_queries(monkeypatch) -> list[int]:  # type: ignore[no-untyped-def]
+    from server import db
+
+    sizes: list[int] = []
+    real = db.get_users_by_ids
+
+    def counting(ids):  # type: ignore[no-untyped-def]
+        ids = list(ids)
+        sizes.append(len(ids))
+        return real(ids)
+
+    monkeypatch.setattr(db, "get_users_by_ids", counting)
+    return sizes
+
+
+def test_same_tick_lookups_share_one_query(monkeypatch):  # type: ignore[no-untyped-def]
+    from server.ws.user_loader import UserLoader
+
+    ids = _make_users(5)
+    sizes = _count_queries(monkeypatch)
+
+    async def scenario():  # type: ignore[no-untyped-def]
+        loader = UserLoader()
+        results = await asyncio.gather(
+            *(loader.load(ids[i % 5]) for i in range(40)),
+            loader.load_many([ids[4], ids[0], ids[4]]),
+            loader.load("missing"),
+        )
+        again = await loader.load(ids[0])     # a later tick queries again
+        return loader, results, again
+
+    loader, results, again = asyncio.run(scenario())
+    assert [u.id for u in results[:5]] == ids
+    assert [u.id for u in results[40]] == [ids[4], ids[0]]
+    assert results[41] is None
+    assert again.id == ids[0]
+    assert sizes == [6, 1]
+    stats = loader.stats()
+    assert stats["calls"] == 43 and stats["queries"] == 2
+    assert stats["queries_saved"] == 41
+    assert stats["ids_shared"] == 37
+
+
+def test_large_batches_are_chunked_and_cancellation_is_isolated(monkeypatch):  # type: ignore[no-untyped-def]
+    from server.ws.user_loader import UserLoader
+
+    ids = _make_users(7)
+    sizes = _count_queries(monkeypatch)
+
+    async def scenario():  # type: ignore[no-untyped-def]
+        loader = UserLoader(max_batch=3)
+        quitter = asyncio.ensure_future(loader.load(ids[0]))
+        stayer = asyncio.ensure_future(loader.load_many(ids))
+        await asyncio.sleep(0)
+        quitter.cancel()                      # must not cancel the shared lookup
+        return await stayer
+
+    rows = asyncio.run(scenario())
+    assert [u.id for u in rows] == ids
+    assert sizes == [3, 3, 1]
+
+
+def test_websocket_auth_goes_through_loader(client):  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": "alice", "email": "alice@x.com", "password": "abcdefgh1"},
+    )
+    token = r.json()["access_token"]
+    with client.websocket_connect(f"/ws?token={token}") as ws:
+        ws.receive_text()
+    stats = client.get("/api/admin/user-lookups", headers=ADMIN).json()
+    assert stats["calls"] >= 1 and stats["queries"] >= 1
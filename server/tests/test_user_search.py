@@ -0,0 +1,91 @@
+"""Directory search: prefix matching, cursor pagination, hot-prefix cache."""
+
+from __future__ import annotations
+
+import sqlite3
+
+ADMIN = {"X-Admin-Token": "test-admin"}
+
+
+def _signup(client, name: str, email: str = "") -> str:  # type: ignore[no-untyped-def]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": name, "email": email or f"{name}@x.com", "password": "abcdefgh1"},
+    )
+    assert r.status_code == 201, r.text
+    return r.json()["access_token"]
+
+
+def _search(client, token: str, **params):  # type: ignore[no-untyped-def]
+    r = client.get("/api/users/search", params=params,
+                   headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_prefix_matches_usernames_never_emails(client):  # type: ignore[no-untyped-def]
+    token = _signup(client, "Alice", "alice@corp.example")
+    for name in ("alfred", "albert", "bob"):
+        _signup(client, name)
+
+    got = _search(client, token, q="AL")
+    assert [u["username"] for u in got["users"]] == ["albert", "alfred", "Alice"]
+    assert got["next_cursor"] is None
+    assert _search(client, token, q="al%")["users"] == []          # no LIKE wildcards
+    assert got["users"][0].keys() == {"id", "username"}               # no emails leak
+    assert _search(client, token, q="ALICE@C")["users"] == []
+    # Not even a registered address, matched whole: no probing who has an account.
+    assert _search(client, token, q="alice@corp.example")["users"] == []
+    assert _search(client, token, q="bob@x.com")["users"] == []
+
+    r = client.get("/api/users/search", params={"q": "a"})
+    assert r.status_code == 401
+
+
+def test_cursor_pages_through_everything_once(client):  # type: ignore[no-untyped-def]
+    token = _signup(client, "zed")
+    names = [f"user{i:02d}" for i in range(23)]
+    for name in names:
+        _signup(client, name)
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        params = {"q": "user", "limit": 5}
+        if cursor:
+            params["cursor"] = cursor
+        page = _search(client, token, **params)
+        seen += [u["username"] for u in page["users"]]
+        if len(seen) == 10:
+            _signup(client, "user00a")                 # lands behind the cursor
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == names                               # no repeats, no gaps
+
+    r = client.get("/api/users/search", params={"q": "user", "cursor": "!!"},
+                   headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 400
+
+
+def test_hot_prefixes_are_cached_and_signups_evict_them(client):  # type: ignore[no-untyped-def]
+    token = _signup(client, "carol")
+    _search(client, token, q="da")
+    _search(client, token, q="da")
+    stats = client.get("/api/admin/user-search", headers=ADMIN).json()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+    _signup(client, "dave")                             # evicts "d", "da", "dav", "dave"
+    assert [u["username"] for u in _search(client, token, q="da")["users"]] == ["dave"]
+
+
+def test_search_uses_the_index():  # type: ignore[no-untyped-def]
+    from server import db
+
+    conn = sqlite3.connect(db.settings.db_path)
+    plan = " ".join(r[3] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT rowid, * FROM users WHERE lower(username) >= 'a' "
+        "AND lower(username) < 'b' ORDER BY lower(username), rowid LIMIT 21"
+    ))
+    assert "USING INDEX" in plan and "TEMP B-TREE" not in plan, plan
+    conn.close()
@@ -0,0 +1,224 @@
+"""Call-setup tracing: where the seconds between "ring" and "audio" go.
+
+Every 1:1 call (from `call-request`) and every new room pairing (a joiner with
+each existing member) gets a trace id. As `_route` relays the setup messages
+for that pair it stamps the first occurrence of each milestone:
+
+  call:  call-request → call-response → offer → answer / first ice-candidate
+  room:  room-join    →                 offer → answer / first ice-candidate
+
+and, once both the answer and an ICE candidate have been seen, folds the gaps
+into per-phase histograms:
+
+  ring       call-request → call-response   callee (a human deciding)
+  offer      accept/join  → offer           caller's createOffer
+  answer     offer        → answer          callee's setRemote + createAnswer
+  first-ice  offer        → ice-candidate   candidate gathering (STUN/TURN)
+  setup      start        → both of the above
+  relay      time spent inside the server relaying one traced message
+
+so a slow setup can be pinned on the server, the callee or ICE. Setups slower
+than TRACE_SLOW_MS keep their full timeline in a bounded ring for inspection.
+Active traces are bounded too: the oldest are expired after TRACE_TIMEOUT_S,
+or evicted once TRACE_MAX_ACTIVE is reached.
+"""
+
+from __future__ import annotations
+
+import secrets
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from typing import Any, Optional
+
+from .config import settings
+
+
+PHASES = ("ring", "offer", "answer", "first-ice", "setup", "relay")
+
+# Upper bounds (ms) of the histogram buckets; one overflow bucket follows.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_MILESTONES = ("call-response", "offer", "answer", "ice-candidate")
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th sample (None past the last)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else None
+        return None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "buckets": {
+                **{f"le_{b}": n for b, n in zip(BUCKETS_MS, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class _Trace:
+    __slots__ = ("id", "kind", "caller", "callee", "room", "started", "wall", "marks")
+
+    def __init__(self, kind: str, caller: str, callee: str, room: Optional[str]) -> None:
+        self.id = secrets.token_hex(8)
+        self.kind = kind
+        self.caller = caller
+        self.callee = callee
+        self.room = room
+        self.started = time.monotonic()
+        self.wall = time.time()
+        self.marks: dict[str, float] = {}
+
+
+def _pair(a: str, b: str) -> tuple[str, str]:
+    return (a, b) if a < b else (b, a)
+
+
+class CallTracer:
+    def __init__(
+        self, slow_ms: float, max_active: int, slow_keep: int, timeout: float
+    ) -> None:
+        self.slow_ms = slow_ms
+        self.max_active = max_active
+        self.timeout = timeout
+        self._active: OrderedDict[tuple[str, str], _Trace] = OrderedDict()
+        self._by_user: dict[str, set[tuple[str, str]]] = {}
+        self._slow: deque[dict[str, Any]] = deque(maxlen=slow_keep)
+        self.histograms = {p: Histogram() for p in PHASES}
+        self.outcomes: dict[str, int] = {}
+
+    def start(self, kind: str, caller: str, callee: str, room: Optional[str] = None) -> str:
+        """Open a trace for this pair (replacing any stale one). Returns its id."""
+        self._expire(time.monotonic())
+        key = _pair(caller, callee)
+        if key in self._active:
+            self._finish(key, "restarted")
+        trace = self._active[key] = _Trace(kind, caller, callee, room)
+        for user_id in key:
+            self._by_user.setdefault(user_id, set()).add(key)
+        if len(self._active) > self.max_active:
+            self._finish(next(iter(self._active)), "evicted")
+        return trace.id
+
+    def mark(self, sender: str, recipient: str, milestone: str) -> Optional[str]:
+        """Stamp a relayed setup message. Returns the trace id, if the pair has one."""
+        key = _pair(sender, recipient)
+        trace = self._active.get(key)
+        if trace is None:
+            return None
+        if milestone in _MILESTONES and milestone not in trace.marks:
+            trace.marks[milestone] = time.monotonic()
+            if "answer" in trace.marks and "ice-candidate" in trace.marks:
+                self._finish(key, "connected")
+        return trace.id
+
+    def relayed(self, seconds: float) -> None:
+        self.histograms["relay"].add(seconds * 1000)
+
+    def end(self, a: str, b: str, outcome: str) -> None:
+        """Close a trace that won't complete (declined, hung up, peer left)."""
+        if _pair(a, b) in self._active:
+            self._finish(_pair(a, b), outcome)
+
+    def end_user(self, user_id: str, outcome: str) -> None:
+        for key in list(self._by_user.get(user_id, ())):
+            self._finish(key, outcome)
+
+    # -- internals ------------------------------------------------------------------
+
+    def _count(self, outcome: str) -> None:
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def _expire(self, now: float) -> None:
+        while self._active:
+            key, trace = next(iter(self._active.items()))
+            if now - trace.started < self.timeout:
+                return
+            self._finish(key, "timeout")
+
+    def _finish(self, key: tuple[str, str], outcome: str) -> None:
+        trace = self._active.pop(key)
+        for user_id in key:
+            keys = self._by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[user_id]
+        self._count(outcome)
+        m = trace.marks
+        phases: dict[str, float] = {}
+        if "call-response" in m:
+            phases["ring"] = m["call-response"] - trace.started
+        if "offer" in m:
+            phases["offer"] = m["offer"] - m.get("call-response", trace.started)
+            if "answer" in m:
+                phases["answer"] = m["answer"] - m["offer"]
+            if "ice-candidate" in m:
+                phases["first-ice"] = m["ice-candidate"] - m["offer"]
+        if outcome == "connected":
+            phases["setup"] = max(m["answer"], m["ice-candidate"]) - trace.started
+        phases_ms = {p: round(s * 1000, 1) for p, s in phases.items()}
+        for phase, ms in phases_ms.items():
+            self.histograms[phase].add(ms)
+
+        # Time spent ringing is the callee's choice, not setup latency.
+        work_ms = phases_ms.get("setup", 0.0) - phases_ms.get("ring", 0.0)
+        if outcome == "connected" and work_ms >= self.slow_ms:
+            self._slow.append({
+                "trace_id": trace.id,
+                "kind": trace.kind,
+                "caller": trace.caller,
+                "callee": trace.callee,
+                "room": trace.room,
+                "started_at": trace.wall,
+                "phases_ms": phases_ms,
+                "timeline_ms": {
+                    k: round((t - trace.started) * 1000, 1) for k, t in m.items()
+                },
+            })
+
+    # -- read side --------------------------------------------------------------------
+
+    def phase_stats(self) -> dict[str, Any]:
+        return {
+            "phases": {p: h.snapshot() for p, h in self.histograms.items()},
+            "outcomes": dict(self.outcomes),
+            "active": len(self._active),
+            "slow_threshold_ms": self.slow_ms,
+        }
+
+    def slow_traces(self, limit: int = 50) -> list[dict[str, Any]]:
+        """Most recent slow setups first."""
+        return list(reversed(self._slow))[:limit]
+
+
+tracer = CallTracer(
+    slow_ms=settings.trace_slow_ms,
+    max_active=settings.trace_max_active,
+    slow_keep=settings.trace_slow_keep,
+    timeout=settings.trace_timeout_s,
+)
@@ -0,0 +1,230 @@
+"""Bulk user import/export as JSONL or CSV.
+
+    python -m server.user_io export users.jsonl
+    python -m server.user_io import users.csv [--batch 50000] [--on-conflict skip|abort] [--durable]
+
+Both directions stream, so memory stays flat whatever the file size. Pass
+`-` as the file to use stdin/stdout, together with --format. Otherwise the
+format comes from the file extension (.jsonl/.ndjson or .csv).
+
+Each record has the fields of db.USER_COLUMNS. `password_hash` must already
+be a bcrypt hash (`$2a$`, `$2b$` or `$2y$`); plaintext passwords are rejected,
+never hashed here. A record without `id` gets a fresh UUID, and one without
+`created_at` gets the current time. Invalid records are counted and skipped;
+the first few are printed to stderr.
+
+Rows go in through db.BulkUserImport: --batch rows per executemany and
+transaction, sync relaxed and secondary indexes rebuilt once at the end.
+Import with the server stopped, and back up DB_PATH first unless you pass
+--durable. Exported files hold password hashes, so they are created with
+mode 0600.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, Optional, TextIO
+
+from . import db
+from .models import USERNAME_RE
+
+
+BCRYPT_RE = re.compile(r"^\$2[aby]\$\d\d\$[./A-Za-z0-9]{53}$")
+_EMAIL_RE = re.compile(r"^[^@\s]{1,64}@[^@\s]+\.[^@\s]+$")
+_SHOW_INVALID = 10
+_PROGRESS_EVERY_S = 2.0
+
+UserTuple = tuple[str, str, str, str, str]
+
+
+class _Progress:
+    def __init__(self, verb: str, quiet: bool) -> None:
+        self.verb = verb
+        self.quiet = quiet
+        self.rows = 0
+        self.t0 = self._last = time.perf_counter()
+
+    def add(self, n: int) -> None:
+        self.rows += n
+        now = time.perf_counter()
+        if not self.quiet and now - self._last >= _PROGRESS_EVERY_S:
+            self._last = now
+            print(f"{self.verb} {self.rows:,} rows ({self.rate():,.0f} rows/s)", file=sys.stderr)
+
+    def rate(self) -> float:
+        return self.rows / max(time.perf_counter() - self.t0, 1e-9)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+
+def _format(path: str, given: Optional[str]) -> str:
+    if given:
+        return given
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    raise SystemExit(f"can't tell the format of {path!r}; pass --format jsonl or csv")
+
+
+# --- Export ------------------------------------------------------------------------------
+
+
+def _open_private(path: str) -> TextIO:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return open(fd, "w", encoding="utf-8", newline="")
+
+
+def export_users(out: TextIO, fmt: str, progress: _Progress) -> None:
+    if fmt == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(db.USER_COLUMNS)
+        for row in db.iter_user_rows():
+            writer.writerow(row)
+            progress.add(1)
+        return
+    for row in db.iter_user_rows():
+        out.write(json.dumps(dict(zip(db.USER_COLUMNS, row))))
+        out.write("\n")
+        progress.add(1)
+
+
+# --- Import ------------------------------------------------------------------------------
+
+
+def _records(src: TextIO, fmt: str) -> Iterator[tuple[int, Any]]:
+    """(line number, parsed record) pairs. Unparseable JSON lines yield the error."""
+    if fmt == "csv":
+        reader = csv.DictReader(src)
+        for rec in reader:
+            yield reader.line_num, rec
+        return
+    for lineno, line in enumerate(src, 1):
+        if not line.strip():
+            continue
+        try:
+            yield lineno, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield lineno, ValueError(f"bad JSON: {exc.msg}")
+
+
+def validate(rec: Any, now: str) -> UserTuple:
+    """A record as a row for the users table. ValueError says what's wrong with it."""
+    if isinstance(rec, Exception):
+        raise rec
+    if not isinstance(rec, dict):
+        raise ValueError("not an object")
+    username = rec.get("username") or ""
+    email = (rec.get("email") or "").strip()
+    password_hash = rec.get("password_hash") or ""
+    if not isinstance(username, str) or not USERNAME_RE.match(username):
+        raise ValueError(f"bad username {username!r}")
+    if not isinstance(email, str) or not _EMAIL_RE.match(email) or len(email) > 320:
+        raise ValueError(f"bad email {email!r}")
+    if not isinstance(password_hash, str) or not BCRYPT_RE.match(password_hash):
+        raise ValueError("password_hash is not a bcrypt hash")
+    user_id = rec.get("id") or str(uuid.uuid4())
+    created_at = rec.get("created_at") or now
+    if not isinstance(user_id, str) or not isinstance(created_at, str):
+        raise ValueError("id and created_at must be strings")
+    return user_id, username, email, password_hash, created_at
+
+
+def import_users(src: TextIO, fmt: str, batch: int, skip_existing: bool, durable: bool,
+                 progress: _Progress) -> dict[str, int]:
+    now = datetime.now(timezone.utc).isoformat()
+    counts = {"read": 0, "inserted": 0, "duplicates": 0, "invalid": 0}
+    rows: list[UserTuple] = []
+
+    def flush(importer: db.BulkUserImport) -> None:
+        inserted = importer.insert(rows, skip_existing=skip_existing)
+        counts["inserted"] += inserted
+        counts["duplicates"] += len(rows) - inserted
+        progress.add(len(rows))
+        rows.clear()
+
+    with db.BulkUserImport(durable=durable) as importer:
+        for lineno, rec in _records(src, fmt):
+            counts["read"] += 1
+            try:
+                rows.append(validate(rec, now))
+            except ValueError as exc:
+                counts["invalid"] += 1
+                if counts["invalid"] <= _SHOW_INVALID:
+                    print(f"line {lineno}: {exc}", file=sys.stderr)
+                continue
+            if len(rows) >= batch:
+                flush(importer)
+        if rows:
+            flush(importer)
+    return counts
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m server.user_io",
+                                 description=__doc__.splitlines()[0])
+    ap.add_argument("command", choices=("export", "import"))
+    ap.add_argument("file", help="path, or - for stdin/stdout")
+    ap.add_argument("--format", choices=("jsonl", "csv"))
+    ap.add_argument("--batch", type=int, default=50_000, help="rows per transaction (import)")
+    ap.add_argument("--on-conflict", choices=("skip", "abort"), default="skip",
+                    help="rows whose id, username or email exists: skip them, or stop "
+                         "(the failing batch is rolled back, earlier ones are kept)")
+    ap.add_argument("--durable", action="store_true",
+                    help="keep normal fsync and journaling during import (slower)")
+    ap.add_argument("--quiet", action="store_true", help="no progress lines")
+    args = ap.parse_args(None if argv is None else list(argv))
+    if args.file == "-" and not args.format:
+        ap.error("--format is required with -")
+    if args.batch < 1:
+        ap.error("--batch must be positive")
+    fmt = _format(args.file, args.format)
+    db.init_db()
+
+    if args.command == "export":
+        progress = _Progress("exported", args.quiet)
+        if args.file == "-":
+            export_users(sys.stdout, fmt, progress)
+            sys.stdout.flush()
+        else:
+            with _open_private(args.file) as out:
+                export_users(out, fmt, progress)
+        print(f"exported {progress.rows:,} users in {progress.elapsed():.1f}s "
+              f"({progress.rate():,.0f} rows/s)", file=sys.stderr)
+        return 0
+
+    progress = _Progress("imported", args.quiet)
+    src: TextIO
+    if args.file == "-":
+        src = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        src = open(args.file, encoding="utf-8", newline="")
+    try:
+        with src:
+            counts = import_users(src, fmt, args.batch, args.on_conflict == "skip",
+                                  args.durable, progress)
+    except sqlite3.IntegrityError as exc:
+        print(f"aborted on a conflicting row ({exc}); {progress.rows:,} rows were committed "
+              f"before the failing batch", file=sys.stderr)
+        return 1
+    print(f"imported {counts['inserted']:,} of {counts['read']:,} users in "
+          f"{progress.elapsed():.1f}s ({progress.rate():,.0f} rows/s); "
+          f"{counts['duplicates']:,} already present, {counts['invalid']:,} invalid",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Typeahead search over the user directory, behind GET /api/users/search.
+
+A query is a case-insensitive username prefix: a range scan over the
+lower(username) index (migration 6), so a keystroke costs a seek plus
+`limit` rows, not a table scan. Emails are never matched, not even exactly,
+so search can't tell anyone whether an address has an account. A query
+containing "@" finds nobody.
+
+Results come in (key, rowid) order. `next_cursor` is an opaque token for the
+position after the last row, so the next page resumes with an index seek and
+rows don't repeat when users sign up between pages. A cursor is only good for
+a short while: a VACUUM can renumber rowids.
+
+The first page of each short prefix (up to CACHE_MAX_PREFIX characters) is
+cached (PrefixCache). Every typist's first keystrokes hit the same few
+prefixes ("a", "al", ...), and a hit skips opening a connection at all. A
+signup evicts the prefixes of its new username in this worker. Other workers
+see it when their entry expires after USER_SEARCH_CACHE_TTL_S.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from . import db
+from .config import settings
+
+
+MAX_LIMIT = 50
+# Longer prefixes are nearly unique to one typist, so caching them only churns the LRU.
+CACHE_MAX_PREFIX = 3
+_USERNAME_PREFIX = re.compile(r"^[a-z0-9_\-]+$")
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _fold(text: str) -> str:
+    """Lowercase like SQLite's lower(): ASCII letters only."""
+    return text.translate(_ASCII_LOWER)
+
+
+def encode_cursor(key: str, rowid: int) -> str:
+    raw = json.dumps([key, rowid], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, rowid = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("bad cursor") from exc
+    if not isinstance(key, str) or not isinstance(rowid, int):
+        raise ValueError("bad cursor")
+    return key, rowid
+
+
+Page = tuple[list[db.UserRow], Optional[str]]
+_Rows = list[tuple[str, int, db.UserRow]]
+
+
+class PrefixCache:
+    """LRU of (field, prefix) → first MAX_LIMIT + 1 matches, each kept for `ttl`s."""
+
+    def __init__(self, size: int, ttl: float) -> None:
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()   # sync routes run in the threadpool
+        self._entries: OrderedDict[tuple[str, str], tuple[float, _Rows]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, field: str, prefix: str) -> Optional[_Rows]:
+        if self.size <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((field, prefix))
+            if entry is None or now - entry[0] >= self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((field, prefix))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, field: str, prefix: str, rows: _Rows) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[(field, prefix)] = (time.monotonic(), rows)
+            self._entries.move_to_end((field, prefix))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, field: str, value: str) -> None:
+        """Forget every cached prefix of `value` (a lowercased key)."""
+        with self._lock:
+            for i in range(1, min(len(value), CACHE_MAX_PREFIX) + 1):
+                self._entries.pop((field, value[:i]), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "capacity": self.size,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "evictions": self.evictions,
+        }
+
+
+cache = PrefixCache(settings.user_search_cache_size, settings.user_search_cache_ttl_s)
+
+
+def search(query: str, limit: int = 20, cursor: Optional[str] = None) -> Page:
+    """One page of users matching `query`, and the cursor for the next (None at the end).
+
+    ValueError for a malformed cursor.
+    """
+    prefix = _fold(query.strip())
+    field = "username"
+    limit = max(1, min(limit, MAX_LIMIT))
+    after = decode_cursor(cursor) if cursor else None
+    if not _USERNAME_PREFIX.match(prefix):
+        return [], None   # no username can match; skip the query
+
+    if after is None and len(prefix) <= CACHE_MAX_PREFIX:
+        rows = cache.get(field, prefix)
+        if rows is None:
+            rows = db.search_users(field, prefix, MAX_LIMIT + 1)
+            cache.put(field, prefix, rows)
+    else:
+        rows = db.search_users(field, prefix, limit + 1, after)
+    page = rows[:limit]
+    more = len(rows) > limit
+    next_cursor = encode_cursor(page[-1][0], page[-1][1]) if more else None
+    return [user for _, _, user in page], next_cursor
+
+
+def user_added(user: db.UserRow) -> None:
+    cache.invalidate("username", _fold(user.username))
@@ -0,0 +1,141 @@
+"""Admission control for new /ws connections under overload.
+
+A new connection is cheap to refuse, but once it is admitted it costs a
+token check, a user lookup, a registration and a roster broadcast to that
+user's watchers. A reconnect stampede multiplies that cost by every client
+at once. That can starve the sockets that are already carrying calls. So a
+new socket is checked before it is accepted. Three live signals are read:
+
+  loop lag      The event loop's scheduling lag (loopmon), smoothed. If it is
+                over WS_ADMIT_MAX_LAG_MS, the loop is already behind, and the
+                socket is refused.
+  open sockets  Sockets open on this worker plus handshakes in flight. Once
+                they reach WS_MAX_CONNECTIONS, the socket is refused.
+  handshakes    Admitted sockets still authenticating and registering.
+                At most WS_ADMIT_MAX_HANDSHAKES run at once. Later ones wait
+                in FIFO order, up to WS_ADMIT_WAIT_MS each, and are refused
+                if no slot opens up. A waiter is only a parked coroutine, so
+                the wait, not a queue length, bounds the queue.
+
+A refused socket is accepted only long enough to close it with 1013 (Try
+Again Later). The close reason carries a jittered hint such as
+"busy retry-after-ms=4210", drawn from WS_ADMIT_RETRY_SPREAD_S. The client
+waits that long before it reconnects, so refused clients come back spread
+out instead of all at once. Established connections are never touched.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from collections import Counter, deque
+from typing import Any, Callable, Optional
+
+
+LAGGING = "lagging"
+FULL = "full"
+BUSY = "busy"
+
+
+class Admission:
+    def __init__(
+        self,
+        *,
+        open_sockets: Callable[[], int],
+        loop_lag_ms: Callable[[], float],
+        max_connections: int = 0,
+        max_handshakes: int = 32,
+        max_lag_ms: float = 200.0,
+        wait_s: float = 1.0,
+        retry_spread_s: float = 10.0,
+    ) -> None:
+        self._open_sockets = open_sockets
+        self._loop_lag_ms = loop_lag_ms
+        self.max_connections = max_connections
+        self.max_handshakes = max_handshakes
+        self.max_lag_ms = max_lag_ms
+        self.wait_s = wait_s
+        self.retry_spread_s = retry_spread_s
+        self._inflight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._admitted = 0
+        self._delayed = 0
+        self._refused: Counter[str] = Counter()
+
+    def _refusal(self, holding: int = 0) -> Optional[str]:
+        """Why a new socket can't come in now, not counting a slot it already holds."""
+        if self.max_lag_ms > 0 and self._loop_lag_ms() > self.max_lag_ms:
+            return LAGGING
+        if 0 < self.max_connections <= self._open_sockets() + self._inflight - holding:
+            return FULL
+        return None
+
+    async def enter(self) -> Optional[str]:
+        """Claim a handshake slot. None if admitted (call `leave()` later), else why not."""
+        reason = self._refusal()
+        if reason is None:
+            if 0 < self.max_handshakes <= self._inflight:
+                reason = await self._wait_for_slot()
+                # A slot was handed over. Re-check, since things may be worse now.
+                if reason is None and (reason := self._refusal(holding=1)) is not None:
+                    self.leave()
+            else:
+                self._inflight += 1
+        if reason is not None:
+            self._refused[reason] += 1
+            return reason
+        self._admitted += 1
+        return None
+
+    async def _wait_for_slot(self) -> Optional[str]:
+        if self.wait_s <= 0:
+            return BUSY
+        self._delayed += 1
+        slot: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(slot)
+        try:
+            await asyncio.wait_for(asyncio.shield(slot), self.wait_s)
+        except asyncio.TimeoutError:
+            if slot.done():
+                return None            # handed over just as the wait ran out
+            slot.cancel()
+            self._waiters.remove(slot)
+            return BUSY
+        except asyncio.CancelledError:
+            if slot.done() and not slot.cancelled():
+                self.leave()           # pass the slot on rather than leak it
+            else:
+                slot.cancel()
+                self._waiters.remove(slot)
+            raise
+        return None
+
+    def leave(self) -> None:
+        """Release a handshake slot, handing it straight to the longest waiter."""
+        while self._waiters:
+            slot = self._waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)   # the slot moves over; _inflight is unchanged
+                return
+        self._inflight -= 1
+
+    def retry_after_ms(self) -> int:
+        """A reconnect delay drawn from the spread window, so refusals don't come back together."""
+        return int(random.uniform(1000, max(self.retry_spread_s, 1.0) * 1000))
+
+    def close_reason(self, reason: str) -> str:
+        return f"{reason} retry-after-ms={self.retry_after_ms()}"
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "max_handshakes": self.max_handshakes,
+            "max_lag_ms": self.max_lag_ms,
+            "open_sockets": self._open_sockets(),
+            "loop_lag_ms": round(self._loop_lag_ms(), 1),
+            "handshakes": self._inflight,
+            "waiting": len(self._waiters),
+            "admitted": self._admitted,
+            "delayed": self._delayed,
+            "refused": dict(self._refused),
+        }
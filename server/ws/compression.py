@@ -0,0 +1,183 @@
+"""permessage-deflate tuned for signaling traffic, plus wire-size accounting.
+
+uvicorn's built-in deflate compresses every frame. Signaling is mostly tiny
+frames (pings, ICE candidates, acks) plus a few large, repetitive ones (SDP,
+rosters). This module adds a uvicorn WebSocket protocol that:
+
+  - leaves messages under WS_DEFLATE_MIN_BYTES uncompressed. RFC 7692 allows
+    this per message, and we skip zlib's flush overhead where it can't pay off;
+  - caps the LZ77 window (WS_DEFLATE_WINDOW_BITS) and zlib memLevel, so each
+    connection's compressor stays small. WS_DEFLATE_CONTEXT_TAKEOVER=0 also
+    frees it between messages, at some cost in ratio;
+  - records raw and on-wire bytes per message `type`, for /api/admin/wire.
+
+Enable it with:
+
+    uvicorn server.main:app --ws server.ws.compression:SignalingWebSocketProtocol
+
+The message type is read from the start of each frame. Everything the server
+sends starts with `{"type": "...`, because json.dumps keeps key order.
+
+The protocol subclasses uvicorn's sans-I/O implementation, which is not a
+public module (uvicorn is pinned in requirements.txt for that reason). If a
+uvicorn upgrade moves it, this falls back to uvicorn's stock protocol with
+plain deflate, and the first connection logs which one is in use.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from typing import Any, Optional
+
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+from websockets.frames import Frame, Opcode
+from websockets.server import ServerProtocol
+
+from ..config import settings
+
+try:
+    from uvicorn.protocols.websockets.websockets_sansio_impl import (
+        WebSocketsSansIOProtocol as _BaseProtocol,
+    )
+    TUNED = True
+except ImportError:  # pragma: no cover - depends on the installed uvicorn
+    from uvicorn.protocols.websockets.auto import (  # type: ignore[assignment]
+        AutoWebSocketsProtocol as _BaseProtocol,
+    )
+    TUNED = False
+
+log = logging.getLogger("signaling.wire")
+
+_TYPE = re.compile(rb'^\{\s*"type"\s*:\s*"([A-Za-z0-9_-]{1,40})"')
+
+
+def message_type(data: bytes) -> str:
+    m = _TYPE.match(data[:64])
+    return m.group(1).decode() if m else "other"
+
+
+class WireStats:
+    """Per-direction, per-type byte counters. Thread-safe; updated per frame."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (direction, type) → [messages, raw bytes, wire bytes, compressed messages]
+        self._counts: dict[tuple[str, str], list[int]] = {}
+        self._sdp = [0, 0, 0]  # messages, raw bytes, compact bytes
+
+    def record(self, direction: str, kind: str, raw: int, wire: int) -> None:
+        with self._lock:
+            c = self._counts.setdefault((direction, kind), [0, 0, 0, 0])
+            c[0] += 1
+            c[1] += raw
+            c[2] += wire
+            c[3] += wire != raw
+
+    def record_sdp(self, raw: int, compact: int) -> None:
+        with self._lock:
+            self._sdp[0] += 1
+            self._sdp[1] += raw
+            self._sdp[2] += compact
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counts = {k: list(v) for k, v in self._counts.items()}
+            sdp = list(self._sdp)
+        out: dict[str, Any] = {"in": {}, "out": {}}
+        for (direction, kind), (n, raw, wire, compressed) in sorted(counts.items()):
+            out[direction][kind] = {
+                "messages": n,
+                "compressed": compressed,
+                "raw_bytes": raw,
+                "wire_bytes": wire,
+                "saved_bytes": raw - wire,
+            }
+        out["sdp_compaction"] = {
+            "messages": sdp[0],
+            "raw_bytes": sdp[1],
+            "compact_bytes": sdp[2],
+            "saved_bytes": sdp[1] - sdp[2],
+        }
+        return out
+
+
+wire_stats = WireStats()
+
+
+class ThresholdDeflate(PerMessageDeflate):
+    """PerMessageDeflate that sends small messages as-is and counts bytes."""
+
+    def __init__(self, *args: Any, min_bytes: int, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.min_bytes = min_bytes
+
+    def encode(self, frame: Frame) -> Frame:
+        if frame.opcode not in (Opcode.TEXT, Opcode.BINARY) or not frame.fin:
+            return super().encode(frame)     # control frames; we never fragment
+        raw = len(frame.data)
+        out = frame if raw < self.min_bytes else super().encode(frame)
+        wire_stats.record("out", message_type(frame.data), raw, len(out.data))
+        return out
+
+    def decode(self, frame: Frame, *, max_size: Optional[int] = None) -> Frame:
+        out = super().decode(frame, max_size=max_size)
+        if frame.opcode in (Opcode.TEXT, Opcode.BINARY) and frame.fin:
+            wire_stats.record("in", message_type(out.data), len(out.data), len(frame.data))
+        return out
+
+
+class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, min_bytes: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.min_bytes = min_bytes
+
+    def process_request_params(self, params: Any, accepted_extensions: Any) -> Any:
+        response, ext = super().process_request_params(params, accepted_extensions)
+        return response, ThresholdDeflate(
+            ext.remote_no_context_takeover,
+            ext.local_no_context_takeover,
+            ext.remote_max_window_bits,
+            ext.local_max_window_bits,
+            ext.compress_settings,
+            min_bytes=self.min_bytes,
+        )
+
+
+def deflate_factory() -> ThresholdDeflateFactory:
+    """The extension as configured by the WS_DEFLATE_* settings."""
+    bits = settings.ws_deflate_window_bits
+    return ThresholdDeflateFactory(
+        settings.ws_deflate_min_bytes,
+        server_no_context_takeover=not settings.ws_deflate_context_takeover,
+        client_no_context_takeover=not settings.ws_deflate_context_takeover,
+        server_max_window_bits=bits,
+        client_max_window_bits=bits,
+        compress_settings={"memLevel": settings.ws_deflate_mem_level},
+    )
+
+
+class SignalingWebSocketProtocol(_BaseProtocol):  # type: ignore[misc,valid-type]
+    """uvicorn's sans-I/O websockets protocol with the tuned deflate extension."""
+
+    _announced = False
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        if not SignalingWebSocketProtocol._announced:
+            SignalingWebSocketProtocol._announced = True
+            if TUNED:
+                log.info("websocket protocol: sans-I/O with tuned permessage-deflate")
+            else:
+                log.warning("websocket protocol: uvicorn default; tuned deflate unavailable "
+                            "(uvicorn's sans-I/O module moved)")
+        if TUNED and self.config.ws_per_message_deflate:
+            self.conn = ServerProtocol(
+                extensions=[deflate_factory()],
+                max_size=self.config.ws_max_size,
+                logger=self.conn.logger,
+            )
@@ -0,0 +1,84 @@
+"""In-memory contact adjacency for online users, for presence fan-out.
+
+Edges are directed: `owner → contact` means the owner sees the contact's
+presence. The database holds the full graph (db.contacts). This keeps only
+the edges that touch currently connected users, loaded when a user connects
+and dropped when they leave:
+
+  contacts[u]   who u has added        → builds u's roster
+  watchers[u]   who has added u        → who to notify when u comes or goes
+
+Both sides are indexed, so a presence change costs O(degree) rather than
+O(online users). Ids are interned so they share storage with the sessions'
+own ids. Users with no edges on a side (most of them) share one empty
+frozenset instead of holding two empty sets each.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from typing import AbstractSet
+
+from .. import db
+
+
+_NONE: frozenset[str] = frozenset()
+
+
+class ContactGraph:
+    def __init__(self) -> None:
+        self._contacts: dict[str, AbstractSet[str]] = {}
+        self._watchers: dict[str, AbstractSet[str]] = {}
+
+    async def load(self, user_id: str) -> None:
+        """Cache a connecting user's edges. The two indexed lookups run in a worker thread.
+
+        The user's entries exist (as open sets) before the lookups start, so an
+        edge that `add` mirrors while they run is kept rather than overwritten.
+        """
+        for index in (self._contacts, self._watchers):
+            index[user_id] = set(index.get(user_id, _NONE))
+        contacts, watchers = await asyncio.to_thread(_fetch, user_id)
+        _merge(self._contacts, user_id, contacts)
+        _merge(self._watchers, user_id, watchers)
+
+    def unload(self, user_id: str) -> None:
+        self._contacts.pop(user_id, None)
+        self._watchers.pop(user_id, None)
+
+    def add(self, owner_id: str, contact_id: str) -> None:
+        """Mirror a new edge into the cache for whichever ends are online."""
+        _add(self._contacts, owner_id, contact_id)
+        _add(self._watchers, contact_id, owner_id)
+
+    def contacts(self, user_id: str) -> AbstractSet[str]:
+        return self._contacts.get(user_id, _NONE)
+
+    def watchers(self, user_id: str) -> AbstractSet[str]:
+        return self._watchers.get(user_id, _NONE)
+
+    def __len__(self) -> int:
+        return len(self._contacts)
+
+
+def _fetch(user_id: str) -> tuple[list[str], list[str]]:
+    return db.get_contact_ids(user_id), db.get_watcher_ids(user_id)
+
+
+def _merge(index: dict[str, AbstractSet[str]], key: str, loaded: list[str]) -> None:
+    edges = index.get(key)
+    if edges is None:
+        return                                   # unloaded while the lookup ran
+    merged = set(edges) | {sys.intern(i) for i in loaded}
+    index[key] = merged or _NONE
+
+
+def _add(index: dict[str, AbstractSet[str]], key: str, value: str) -> None:
+    edges = index.get(key)
+    if edges is None:
+        return
+    if isinstance(edges, set):
+        edges.add(value)
+    else:
+        index[key] = {value}
@@ -0,0 +1,182 @@
+"""Application-level keepalive for /ws, driven by one shared timer wheel.
+
+Every socket gets a deadline in a hashed timing wheel instead of its own
+sleeping task. Inbound traffic only stamps `last_seen` (one dict store), and the
+wheel re-checks that stamp when the deadline comes round:
+
+  idle < interval          → reschedule for the remainder
+  idle ≥ interval          → send `ping`, schedule a pong deadline
+  no frame since the ping  → reap (close + roster/room cleanup)
+
+A tick therefore costs O(sockets due in that slot), independent of how many
+sockets are connected in total, which keeps 50k+ idle clients cheap.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+
+log = logging.getLogger("signaling.heartbeat")
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TimerWheel(Generic[K]):
+    """Hashed timing wheel with O(1) schedule/cancel.
+
+    Each slot maps key → remaining full rotations. Size the wheel so the longest
+    delay fits in one rotation and `advance` only ever touches keys that are due.
+    """
+
+    def __init__(self, tick: float, slots: int) -> None:
+        if tick <= 0 or slots < 2:
+            raise ValueError("TimerWheel needs tick > 0 and at least 2 slots.")
+        self.tick = tick
+        self._slots: list[dict[K, int]] = [{} for _ in range(slots)]
+        self._where: dict[K, int] = {}
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._where
+
+    def schedule(self, key: K, delay: float) -> None:
+        """(Re)arm `key` to expire `delay` seconds from the current tick."""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        n = len(self._slots)
+        slot = (self._cursor + ticks) % n
+        self._slots[slot][key] = (ticks - 1) // n
+        self._where[key] = slot
+
+    def cancel(self, key: K) -> None:
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            self._slots[slot].pop(key, None)
+
+    def advance(self) -> list[K]:
+        """Move one tick forward and return the keys that expired."""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        bucket = self._slots[self._cursor]
+        expired: list[K] = []
+        for key, rounds in list(bucket.items()):
+            if rounds:
+                bucket[key] = rounds - 1
+            else:
+                del bucket[key]
+                del self._where[key]
+                expired.append(key)
+        return expired
+
+
+class Heartbeat(Generic[K]):
+    """Ping idle sockets and reap the ones that never answer.
+
+    `on_ping` and `on_dead` are coroutines supplied by the owner (the
+    ConnectionManager); they run as fire-and-forget tasks so a slow peer can't
+    stall the wheel.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        timeout: float,
+        tick: float,
+        on_ping: Callable[[K], Awaitable[None]],
+        on_dead: Callable[[K], Awaitable[None]],
+    ) -> None:
+        self.interval = interval
+        self.timeout = timeout
+        slots = math.ceil(max(interval, timeout) / tick) + 2
+        self._wheel: TimerWheel[K] = TimerWheel(tick, slots)
+        self._seen: dict[K, float] = {}
+        self._pinged: dict[K, float] = {}
+        self._on_ping = on_ping
+        self._on_dead = on_dead
+        self._task: Optional[asyncio.Task[None]] = None
+        self._inflight: set[asyncio.Task[None]] = set()
+        self.reaped = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def track(self, key: K, now: Optional[float] = None) -> None:
+        self._seen[key] = time.monotonic() if now is None else now
+        self._pinged.pop(key, None)
+        self._wheel.schedule(key, self.interval)
+
+    def touch(self, key: K, now: Optional[float] = None) -> None:
+        """Record inbound traffic. Deliberately does not touch the wheel."""
+        if key in self._seen:
+            self._seen[key] = time.monotonic() if now is None else now
+
+    def forget(self, key: K) -> None:
+        self._seen.pop(key, None)
+        self._pinged.pop(key, None)
+        self._wheel.cancel(key)
+
+    def expire(self, now: float) -> tuple[list[K], list[K]]:
+        """Advance one tick. Returns (keys to ping, keys to reap)."""
+        to_ping: list[K] = []
+        dead: list[K] = []
+        for key in self._wheel.advance():
+            seen = self._seen.get(key)
+            if seen is None:
+                continue
+            pinged_at = self._pinged.get(key)
+            if pinged_at is not None:
+                if seen <= pinged_at:
+                    self.forget(key)
+                    dead.append(key)
+                    continue
+                del self._pinged[key]
+            idle = now - seen
+            if idle >= self.interval:
+                self._pinged[key] = now
+                self._wheel.schedule(key, self.timeout)
+                to_ping.append(key)
+            else:
+                self._wheel.schedule(key, self.interval - idle)
+        return to_ping, dead
+
+    # -- driver -------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        tick = self._wheel.tick
+        next_at = time.monotonic()
+        while True:
+            next_at += tick
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            to_ping, dead = self.expire(time.monotonic())
+            for key in to_ping:
+                self._spawn(self._on_ping(key))
+            for key in dead:
+                self.reaped += 1
+                self._spawn(self._on_dead(key))
+            if dead:
+                log.info("reaped %d unresponsive sockets", len(dead))
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
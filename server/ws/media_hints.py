@@ -0,0 +1,71 @@
+"""Recommended Opus settings for a mesh room, pushed as `media-hints`.
+
+In a mesh every member encodes and uploads one stream per other member, so the
+uplink a browser needs grows with N−1. The hint caps each stream so the total
+stays inside MEDIA_UPLINK_BUDGET_KBPS, and adjusts for what the room's own
+stats-reports say about the network:
+
+  maxBitrateKbps  budget / (N−1), clamped to [min, max]; trimmed by a quarter
+                  under heavy loss to leave room for FEC
+  dtx             on from 3 participants — silence costs nothing per stream
+  fec             in-band FEC unless the room reports a clean network
+  ptimeMs         40 ms frames (half the packet overhead) for 4+ participants
+                  or high RTT, else 20 ms
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+
+# Loss (p95 %) above which FEC is worth its bits, and above which we also back
+# the bitrate off. RTT (p95 ms) above which larger frames are preferred.
+LOSS_FEC_PCT = 1.0
+LOSS_HEAVY_PCT = 5.0
+RTT_HIGH_MS = 300.0
+
+
+def _p95(summary: Optional[dict[str, Any]], metric: str) -> Optional[float]:
+    stat = (summary or {}).get(metric)
+    return stat["p95"] if stat else None
+
+
+def recommend(
+    participants: int,
+    quality: Optional[dict[str, Any]],
+    *,
+    uplink_budget_kbps: float,
+    min_kbps: float,
+    max_kbps: float,
+) -> dict[str, Any]:
+    """Opus parameters for a room of `participants` given its telemetry summary."""
+    streams = max(participants - 1, 1)
+    bitrate = min(max(uplink_budget_kbps / streams, min_kbps), max_kbps)
+    reasons = [f"{streams} uplink stream(s) within {uplink_budget_kbps:g} kbps"]
+
+    loss = _p95(quality, "packet_loss_pct")
+    rtt = _p95(quality, "rtt_ms")
+
+    fec = loss is None or loss >= LOSS_FEC_PCT
+    if loss is not None and loss >= LOSS_HEAVY_PCT:
+        bitrate = max(bitrate * 0.75, min_kbps)
+        reasons.append(f"p95 loss {loss:.1f}%: FEC on, bitrate trimmed")
+    elif loss is not None and fec:
+        reasons.append(f"p95 loss {loss:.1f}%: FEC on")
+
+    ptime = 20
+    if participants >= 4:
+        ptime = 40
+        reasons.append("4+ participants: 40 ms frames")
+    elif rtt is not None and rtt >= RTT_HIGH_MS:
+        ptime = 40
+        reasons.append(f"p95 RTT {rtt:.0f} ms: 40 ms frames")
+
+    return {
+        "participants": participants,
+        "maxBitrateKbps": int(bitrate),
+        "dtx": participants >= 3,
+        "fec": fec,
+        "ptimeMs": ptime,
+        "reasons": reasons,
+    }
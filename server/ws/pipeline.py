@@ -0,0 +1,168 @@
+"""Inbound /ws message pipeline: read continuously, handle on a bounded pool.
+
+Each socket's reader parses a frame and queues it on a *lane*, keyed by
+(sender, recipient). Frames without a recipient (room control, stats, contacts)
+share the sender's control lane (sender, None). A fixed set of worker tasks
+drains the lanes:
+
+  - a lane is handed to one worker at a time, so frames on it run in order;
+  - after each frame the lane goes to the back of the ready queue, so one busy
+    lane (a big room fan-out) can't starve the others, including the same
+    sender's ICE candidates to someone else;
+  - each connection may have at most `max_pending` frames queued or running.
+    Beyond that its reader stops reading, and TCP pushes back on the client.
+
+Frames for different recipients can therefore be handled out of arrival order.
+The protocol never relies on that order: a client waits for `room-joined`
+before it sends offers to the room.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+log = logging.getLogger("signaling.pipeline")
+
+Job = Callable[[], Awaitable[None]]
+
+
+class InboundPipeline:
+    def __init__(self, workers: int, max_pending: int) -> None:
+        if workers < 1 or max_pending < 1:
+            raise ValueError("InboundPipeline needs at least one worker and one pending slot.")
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lanes: dict[Hashable, deque[tuple[float, Job, Inbox]]] = {}
+        self._ready: asyncio.Queue[Hashable] = asyncio.Queue()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._busy = 0
+        self._handled = 0
+        self._failed = 0
+        self._max_wait = 0.0
+
+    # -- lifecycle --------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._lanes.clear()
+        self._ready = asyncio.Queue()
+
+    # -- per connection ---------------------------------------------------------------
+
+    def inbox(self) -> "Inbox":
+        return Inbox(self)
+
+    def _submit(self, lane: Hashable, job: Job, inbox: Inbox) -> None:
+        queued = self._lanes.get(lane)
+        if queued is None:
+            self._lanes[lane] = deque([(time.monotonic(), job, inbox)])
+            self._ready.put_nowait(lane)
+        else:
+            queued.append((time.monotonic(), job, inbox))
+
+    # -- workers ----------------------------------------------------------------------
+
+    async def _work(self) -> None:
+        while True:
+            lane = await self._ready.get()
+            queued = self._lanes[lane]
+            enqueued, job, inbox = queued.popleft()
+            self._max_wait = max(self._max_wait, time.monotonic() - enqueued)
+            self._busy += 1
+            try:
+                await job()
+                self._handled += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                self._failed += 1
+                log.exception("inbound handler failed on lane %s", lane)
+            finally:
+                self._busy -= 1
+                inbox._finished()
+                if queued:
+                    self._ready.put_nowait(lane)
+                else:
+                    del self._lanes[lane]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "busy": self._busy,
+            "lanes": len(self._lanes),
+            "queued": sum(len(q) for q in self._lanes.values()),
+            "handled": self._handled,
+            "failed": self._failed,
+            "max_wait_ms": round(self._max_wait * 1000, 3),  # longest queueing delay seen
+        }
+
+
+class Inbox:
+    """One connection's handle on the pipeline; bounds what it has in flight.
+
+    There is one per socket, so it stays small: the semaphore allocates its
+    waiter queue only once a reader has to wait, and `drain` creates its
+    future only when there's something to wait for.
+    """
+
+    __slots__ = ("_pipeline", "_slots", "_pending", "_idle")
+
+    def __init__(self, pipeline: InboundPipeline) -> None:
+        self._pipeline = pipeline
+        self._slots = asyncio.Semaphore(pipeline.max_pending)
+        self._pending = 0
+        self._idle: Optional[asyncio.Future[None]] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def submit(self, sender: str, recipient: Optional[str], job: Job) -> None:
+        """Queue `job` on the (sender, recipient) lane; waits while this connection is full."""
+        await self._slots.acquire()
+        self._pending += 1
+        self._pipeline._submit((sender, recipient), job, self)
+
+    def _finished(self) -> None:
+        self._pending -= 1
+        self._slots.release()
+        if not self._pending and self._idle is not None:
+            if not self._idle.done():
+                self._idle.set_result(None)
+            self._idle = None
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait for everything this connection queued to finish. False on timeout.
+
+        Returns without yielding when nothing is queued, which is the usual
+        case on disconnect.
+        """
+        if not self._pending:
+            return True
+        if self._idle is None:
+            self._idle = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._idle), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
@@ -0,0 +1,231 @@
+"""Opt-in recording of /ws traffic shape, for replaying production-like load.
+
+With WS_RECORD_PATH set, the server appends one small binary record to that
+file for every connect, disconnect, inbound frame and outbound message. A
+record holds only metadata: when it happened, the message type, who sent it
+or received it, who it was addressed to, and its size in bytes. Payloads are
+never written. User ids and room codes become per-recording sequence numbers,
+and the mapping stays in memory only. So a recording shows the traffic mix
+and timing without identifying anyone.
+
+Each process start appends a segment: a header, then records.
+
+  header   "VREC" u16 version  u16 0  f64 unix start time
+  record   u8 event  u32 ms since start  u16 type  u32 user  u32 peer  u32 size
+
+`peer` is 0 (none), a user alias, or a room alias with ROOM_BIT set. A
+TYPE record (user = peer = 0) defines a type index: `size` bytes of name
+follow it. A ROOM record ties a `room-create` the server allocated a code
+for to its room alias.
+
+Records go to an in-memory buffer. A background task appends it to the file
+every WS_RECORD_FLUSH_S from a worker thread, so the event loop never writes
+to disk. If the buffer outgrows the flusher, records are dropped and counted.
+Once the file reaches WS_RECORD_MAX_MB, recording stops.
+
+Replay a recording with `python -m server.bench.replay`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import struct
+import time
+from typing import Any, Iterator, NamedTuple, Optional
+
+
+log = logging.getLogger("signaling.recorder")
+
+MAGIC = b"VREC"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxd")
+RECORD = struct.Struct("<BIHIII")
+
+CONNECT, DISCONNECT, IN, OUT, TYPE, ROOM = range(6)
+ROOM_BIT = 0x8000_0000
+
+_TYPE_NAME = re.compile(r"^[a-z][a-z0-9-]{0,31}$")
+_MAX_TYPES = 256
+_MAX_BUFFER = 8 << 20
+
+
+class TrafficRecorder:
+    def __init__(self, path: str, max_bytes: int, flush_interval: float = 1.0) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._t0 = time.monotonic()
+        self._buffer = bytearray(HEADER.pack(MAGIC, VERSION, time.time()))
+        self._users: dict[str, int] = {}
+        self._rooms: dict[str, int] = {}
+        self._types: dict[str, int] = {}
+        self._size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._stopped = False
+        self._records = 0
+        self._dropped = 0
+        self._task: Optional[asyncio.Task[None]] = None
+        self._flush_lock = asyncio.Lock()
+        self._type("other")  # index 0: anything unnamed or past _MAX_TYPES
+
+    # -- recording (event loop) ----------------------------------------------------
+
+    def _alias(self, table: dict[str, int], key: str) -> int:
+        alias = table.get(key)
+        if alias is None:
+            alias = table[key] = len(table) + 1
+        return alias
+
+    def _type(self, name: Any) -> int:
+        if not isinstance(name, str) or not _TYPE_NAME.match(name):
+            name = "other"
+        index = self._types.get(name)
+        if index is None:
+            if len(self._types) >= _MAX_TYPES:
+                return self._types["other"]
+            index = self._types[name] = len(self._types)
+            raw = name.encode()
+            self._write(TYPE, index, 0, 0, len(raw), raw)
+        return index
+
+    def _write(self, event: int, type_index: int, user: int, peer: int, size: int,
+               tail: bytes = b"") -> None:
+        if self._stopped:
+            return
+        if len(self._buffer) >= _MAX_BUFFER:
+            self._dropped += 1
+            return
+        ms = int((time.monotonic() - self._t0) * 1000) & 0xFFFF_FFFF
+        self._buffer += RECORD.pack(event, ms, type_index, user, peer, size)
+        if tail:
+            self._buffer += tail
+        self._records += 1
+
+    def connected(self, user_id: str) -> None:
+        self._write(CONNECT, 0, self._alias(self._users, user_id), 0, 0)
+
+    def disconnected(self, user_id: str) -> None:
+        self._write(DISCONNECT, 0, self._alias(self._users, user_id), 0, 0)
+
+    def inbound(self, user_id: str, msg: dict[str, Any], size: int) -> None:
+        kind = msg.get("type")
+        peer = 0
+        to = msg.get("to")
+        if isinstance(to, str):
+            peer = self._alias(self._users, to)
+        elif kind in ("room-join", "room-create"):
+            data = msg.get("data")
+            code = data.get("code") if isinstance(data, dict) else None
+            if isinstance(code, str) and code.strip():
+                peer = ROOM_BIT | self._alias(self._rooms, code.lower().strip())
+        self._write(IN, self._type(kind), self._alias(self._users, user_id), peer, size)
+
+    def outbound(self, user_id: str, kind: Optional[str], size: int) -> None:
+        self._write(OUT, self._type(kind), self._alias(self._users, user_id), 0, size)
+
+    def room_created(self, user_id: str, code: str) -> None:
+        self._write(ROOM, 0, self._alias(self._users, user_id),
+                    ROOM_BIT | self._alias(self._rooms, code), 0)
+
+    # -- flushing ---------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Append what's buffered. Returns the number of bytes written."""
+        if not self._buffer:
+            return 0
+        async with self._flush_lock:
+            chunk, self._buffer = bytes(self._buffer), bytearray()
+            if not chunk:
+                return 0
+            try:
+                await asyncio.to_thread(_append, self.path, chunk)
+            except OSError as exc:
+                log.warning("traffic recording stopped, write failed: %s", exc)
+                self._stopped = True
+                return 0
+            self._size += len(chunk)
+            if self._size >= self.max_bytes and not self._stopped:
+                log.info("traffic recording reached %d bytes, stopping", self._size)
+                self._stopped = True
+            return len(chunk)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": self.path,
+            "recording": not self._stopped,
+            "records": self._records,
+            "dropped": self._dropped,
+            "buffered_bytes": len(self._buffer),
+            "file_bytes": self._size,
+            "users": len(self._users),
+            "rooms": len(self._rooms),
+            "types": len(self._types),
+        }
+
+
+def _append(path: str, chunk: bytes) -> None:
+    with open(path, "ab") as f:
+        f.write(chunk)
+
+
+# --- Reading ----------------------------------------------------------------------------
+
+
+class Record(NamedTuple):
+    segment: int
+    t: float           # seconds since the segment started
+    event: int
+    type: str
+    user: int
+    peer: int
+    size: int
+
+
+def read_recording(path: str) -> Iterator[Record]:
+    """Every record in `path`, with type indexes resolved to names."""
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    segment = -1
+    types: dict[int, str] = {}
+    while pos < len(data):
+        if data[pos:pos + 4] == MAGIC:
+            _, version, _ = HEADER.unpack_from(data, pos)
+            if version != VERSION:
+                raise ValueError(f"unsupported recording version {version}")
+            segment += 1
+            types = {}
+            pos += HEADER.size
+            continue
+        if segment < 0:
+            raise ValueError(f"{path} is not a traffic recording")
+        if pos + RECORD.size > len(data):
+            break  # cut short by a crash mid-write
+        event, ms, type_index, user, peer, size = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        if event == TYPE:
+            types[type_index] = data[pos:pos + size].decode()
+            pos += size
+            continue
+        yield Record(segment, ms / 1000, event, types.get(type_index, "other"), user, peer, size)
@@ -0,0 +1,179 @@
+"""Room-code allocator: readable codes ("purple-fox-42") with O(1) allocation.
+
+The code space is adjectives × animals × N-digit numbers, and every code maps
+to an index in [0, capacity). Free indices live in the prefix [0, free) of a
+virtual permutation of the whole range; only the positions that have been
+swapped away from identity are stored, so memory grows with the number of
+allocated codes rather than the size of the space.
+
+  allocate   pick a random free position, swap it to the end of the free prefix
+  claim      move a specific code out of the free prefix (explicit room codes)
+  release    move a code back into the free prefix
+
+All three are O(1), and allocation never retries: it only fails once every
+code in the space is genuinely in use.
+"""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+
+DEFAULT_ADJECTIVES = [
+    "amber", "azure", "brave", "bright", "calm", "clever", "coral", "crisp",
+    "dewy", "eager", "fiery", "frosty", "gentle", "golden", "happy", "humble",
+    "indigo", "jolly", "jade", "keen", "kind", "lively", "lucky", "merry",
+    "misty", "noble", "olive", "plucky", "proud", "quick", "rosy", "scarlet",
+    "silver", "snappy", "soft", "spry", "sunny", "swift", "teal", "tidy",
+    "vivid", "warm", "witty", "wild", "young", "zany",
+]
+DEFAULT_ANIMALS = [
+    "ant", "ape", "bat", "bee", "boar", "bug", "cat", "cod", "cow", "crab",
+    "crow", "deer", "dog", "duck", "eel", "elk", "emu", "fox", "frog", "goat",
+    "hare", "hawk", "hen", "ibis", "kiwi", "koala", "lamb", "lark", "lion",
+    "lynx", "mole", "moose", "moth", "newt", "otter", "owl", "panda", "pig",
+    "puma", "quail", "ram", "rat", "robin", "seal", "shark", "sheep", "snail",
+    "squid", "stork", "swan", "tiger", "toad", "trout", "tuna", "wasp",
+    "whale", "wolf", "yak", "zebra",
+]
+
+
+def load_wordlist(path: str, default: Sequence[str]) -> list[str]:
+    """One word per line; blank lines and `#` comments ignored. Empty path → default."""
+    if not path:
+        return list(default)
+    words = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        word = line.split("#", 1)[0].strip().lower()
+        if word:
+            words.append(word)
+    return words
+
+
+class RoomCodeAllocator:
+    def __init__(
+        self,
+        adjectives: Sequence[str] = DEFAULT_ADJECTIVES,
+        animals: Sequence[str] = DEFAULT_ANIMALS,
+        digits: int = 2,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        for name, words in (("adjectives", adjectives), ("animals", animals)):
+            if not words:
+                raise ValueError(f"Room-code {name} list is empty.")
+            if len(set(words)) != len(words):
+                raise ValueError(f"Room-code {name} list has duplicates.")
+            if any("-" in w or not w.isalnum() for w in words):
+                raise ValueError(f"Room-code {name} must be alphanumeric without '-'.")
+        if not 1 <= digits <= 6:
+            raise ValueError("Room-code digits must be between 1 and 6.")
+        self._adjectives = list(adjectives)
+        self._animals = list(animals)
+        self._adj_index = {w: i for i, w in enumerate(self._adjectives)}
+        self._animal_index = {w: i for i, w in enumerate(self._animals)}
+        # 2 digits → 10..99, like the original generator; 1 digit → 0..9.
+        self._num_lo = 10 ** (digits - 1) if digits > 1 else 0
+        self._num_count = 10 ** digits - self._num_lo
+        self._digits = digits
+        self.capacity = len(self._adjectives) * len(self._animals) * self._num_count
+        self._free = self.capacity
+        self._at: dict[int, int] = {}      # position → index, where not identity
+        self._where: dict[int, int] = {}   # index → position, where not identity
+        self._rng = rng or random.Random()
+
+    # -- code <-> index -----------------------------------------------------------
+
+    def _encode(self, index: int) -> str:
+        rest, num = divmod(index, self._num_count)
+        adj, animal = divmod(rest, len(self._animals))
+        return f"{self._adjectives[adj]}-{self._animals[animal]}-{num + self._num_lo}"
+
+    def _decode(self, code: str) -> Optional[int]:
+        parts = code.split("-")
+        # isdigit() alone takes "٥" and "５", and int() reads both as 5: an alias.
+        if len(parts) != 3 or not (parts[2].isascii() and parts[2].isdigit()):
+            return None
+        adj = self._adj_index.get(parts[0])
+        animal = self._animal_index.get(parts[1])
+        num = int(parts[2]) - self._num_lo
+        if adj is None or animal is None or not 0 <= num < self._num_count:
+            return None
+        if len(parts[2]) != len(str(num + self._num_lo)):
+            return None  # "fox-07" and "fox-7" must not alias
+        return (adj * len(self._animals) + animal) * self._num_count + num
+
+    def in_space(self, code: str) -> bool:
+        return self._decode(code) is not None
+
+    # -- sparse permutation ---------------------------------------------------------
+
+    def _value(self, pos: int) -> int:
+        return self._at.get(pos, pos)
+
+    def _position(self, index: int) -> int:
+        return self._where.get(index, index)
+
+    def _put(self, pos: int, index: int) -> None:
+        if pos == index:
+            self._at.pop(pos, None)
+            self._where.pop(index, None)
+        else:
+            self._at[pos] = index
+            self._where[index] = pos
+
+    def _swap(self, p: int, q: int) -> None:
+        a, b = self._value(p), self._value(q)
+        self._put(p, b)
+        self._put(q, a)
+
+    # -- public API -----------------------------------------------------------------
+
+    def allocate(self) -> str:
+        """Return a random free code and mark it used. Raises ValueError when full."""
+        if self._free == 0:
+            raise ValueError("No free room codes left.")
+        pos = self._rng.randrange(self._free)
+        index = self._value(pos)
+        self._swap(pos, self._free - 1)
+        self._free -= 1
+        return self._encode(index)
+
+    def claim(self, code: str) -> bool:
+        """Mark a specific code used. False if it's already taken.
+
+        Codes outside the space (custom names) are not tracked here and always
+        succeed; the caller's own room table is authoritative for those.
+        """
+        index = self._decode(code)
+        if index is None:
+            return True
+        pos = self._position(index)
+        if pos >= self._free:
+            return False
+        self._swap(pos, self._free - 1)
+        self._free -= 1
+        return True
+
+    def release(self, code: str) -> None:
+        index = self._decode(code)
+        if index is None:
+            return
+        pos = self._position(index)
+        if pos < self._free:
+            return  # already free
+        self._swap(pos, self._free)
+        self._free += 1
+
+    def stats(self) -> dict[str, Any]:
+        allocated = self.capacity - self._free
+        return {
+            "capacity": self.capacity,
+            "allocated": allocated,
+            "free": self._free,
+            "utilization": allocated / self.capacity,
+            "digits": self._digits,
+            "adjectives": len(self._adjectives),
+            "animals": len(self._animals),
+        }
@@ -0,0 +1,106 @@
+"""Room membership snapshots, so a restart doesn't dissolve every room.
+
+Rooms live in ConnectionManager memory. Every ROOM_SNAPSHOT_INTERVAL_S this
+writes who is in which room to the `room_snapshot` table, from a worker
+thread, and only if membership changed since the last write. A graceful
+drain writes one final snapshot and then freezes it, so the sockets closing
+after that can't overwrite it.
+
+On startup a snapshot younger than ROOM_SNAPSHOT_TTL_S is loaded back. Each
+user in it is re-attached to their room when they reconnect (see
+`ConnectionManager.restore_rooms`). Media flows peer to peer and usually
+survives the restart, so re-attaching takes one `room-joined` message rather
+than a full join and renegotiation. Users who don't return before the TTL
+runs out are dropped from their rooms.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from ..db import load_room_snapshot, save_room_snapshot
+
+
+log = logging.getLogger("signaling.snapshots")
+
+
+class RoomSnapshots:
+    def __init__(
+        self,
+        interval: float,
+        ttl: float,
+        *,
+        collect: Callable[[], list[tuple[str, str]]],
+        version: Callable[[], int],
+        on_tick: Callable[[], Awaitable[None]],
+    ) -> None:
+        self.interval = interval
+        self.ttl = ttl
+        self._collect = collect
+        self._version = version
+        self._on_tick = on_tick
+        self._saved_version = -1
+        self._frozen = False
+        self._saves = 0
+        self._last_saved: Optional[float] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def load(self) -> dict[str, list[str]]:
+        """code → member ids from the last snapshot, if it's recent enough."""
+        rooms = load_room_snapshot(time.time() - self.ttl)
+        if rooms:
+            log.info("restoring %d rooms (%d members) from snapshot",
+                     len(rooms), sum(len(m) for m in rooms.values()))
+        return rooms
+
+    async def save(self, *, final: bool = False) -> bool:
+        """Write the current membership if it changed. `final` also freezes it."""
+        if self._frozen:
+            return False
+        version = self._version()
+        if final:
+            self._frozen = True
+        if version == self._saved_version:
+            return False
+        members = self._collect()
+        saved_at = time.time()
+        try:
+            await asyncio.to_thread(save_room_snapshot, members, saved_at)
+        except Exception as exc:  # noqa: BLE001
+            log.warning("room snapshot failed: %s", exc)
+            return False
+        self._saved_version = version
+        self._saves += 1
+        self._last_saved = saved_at
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._on_tick()
+            await self.save()
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "interval_s": self.interval,
+            "ttl_s": self.ttl,
+            "saves": self._saves,
+            "last_saved": self._last_saved,
+            "frozen": self._frozen,
+        }
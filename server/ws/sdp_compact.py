@@ -0,0 +1,108 @@
+"""Compact SDP text for clients that opt in (`/ws?...&sdp=compact`).
+
+An audio-only WebRTC offer is 3–8 KB, and most of it is the same few dozen
+line prefixes in every message. Compaction swaps each known prefix for a
+two-character token (`~` plus one table index) and uses `\\n` line endings.
+JSON escapes `\\r\\n` as four bytes, so the shorter ending counts.
+Lines that match nothing are kept verbatim. Real SDP lines always start with
+`<letter>=`, so a leading `~` can't be mistaken for SDP text.
+
+The table is versioned and mirrored in web/src/lib/sdpCompact.ts. Never
+reorder it or change an entry; only append, and bump VERSION if you must
+change an existing entry. This complements permessage-deflate: it helps
+when deflate isn't negotiated (some proxies strip it) and on the first SDP,
+before deflate's context window has seen anything.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+
+VERSION = 1
+
+_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+TABLE: tuple[str, ...] = (
+    "v=0",
+    "o=- ",
+    "s=-",
+    "t=0 0",
+    "a=group:BUNDLE ",
+    "a=extmap-allow-mixed",
+    "a=msid-semantic: WMS",
+    "m=audio 9 UDP/TLS/RTP/SAVPF ",
+    "c=IN IP4 0.0.0.0",
+    "a=rtcp:9 IN IP4 0.0.0.0",
+    "a=ice-ufrag:",
+    "a=ice-pwd:",
+    "a=ice-options:trickle",
+    "a=fingerprint:sha-256 ",
+    "a=setup:actpass",
+    "a=setup:active",
+    "a=setup:passive",
+    "a=mid:",
+    "a=extmap:1 urn:ietf:params:rtp-hdrext:ssrc-audio-level",
+    "a=extmap:2 http://www.webrtc.org/experiments/rtp-hdrext/abs-send-time",
+    "a=extmap:3 http://www.ietf.org/id/draft-holmer-rmcat-transport-wide-cc-extensions-01",
+    "a=extmap:4 urn:ietf:params:rtp-hdrext:sdes:mid",
+    "a=extmap:",
+    "a=sendrecv",
+    "a=sendonly",
+    "a=recvonly",
+    "a=inactive",
+    "a=msid:",
+    "a=rtcp-mux",
+    "a=rtcp-rsize",
+    "a=rtpmap:111 opus/48000/2",
+    "a=rtcp-fb:111 transport-cc",
+    "a=fmtp:111 minptime=10;useinbandfec=1",
+    "a=rtpmap:63 red/48000/2",
+    "a=fmtp:63 111/111",
+    "a=rtpmap:9 G722/8000",
+    "a=rtpmap:0 PCMU/8000",
+    "a=rtpmap:8 PCMA/8000",
+    "a=rtpmap:13 CN/8000",
+    "a=rtpmap:110 telephone-event/48000",
+    "a=rtpmap:126 telephone-event/8000",
+    "a=rtpmap:",
+    "a=rtcp-fb:",
+    "a=fmtp:",
+    "a=ssrc:",
+    "a=ssrc-group:FID ",
+    "a=candidate:",
+    "a=end-of-candidates",
+)
+assert len(TABLE) <= len(_ALPHABET)
+
+# Longest first, so the most specific entry wins.
+_BY_LENGTH = sorted(range(len(TABLE)), key=lambda i: -len(TABLE[i]))
+
+
+def compact(sdp: str) -> Optional[str]:
+    """Compact form of `sdp`, or None if it can't round-trip exactly."""
+    if "\n" in sdp.replace("\r\n", ""):
+        return None
+    out = []
+    for line in sdp.split("\r\n"):
+        if line.startswith("~"):
+            return None
+        for i in _BY_LENGTH:
+            if line.startswith(TABLE[i]):
+                line = "~" + _ALPHABET[i] + line[len(TABLE[i]):]
+                break
+        out.append(line)
+    return "\n".join(out)
+
+
+def expand(text: str) -> str:
+    """Inverse of `compact`. Raises ValueError on an unknown token."""
+    out = []
+    for line in text.split("\n"):
+        if line.startswith("~"):
+            i = _ALPHABET.find(line[1]) if len(line) > 1 else -1
+            if i < 0 or i >= len(TABLE):
+                raise ValueError(f"unknown SDP token {line[:2]!r}")
+            line = TABLE[i] + line[2:]
+        out.append(line)
+    return "\r\n".join(out)
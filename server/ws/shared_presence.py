@@ -0,0 +1,370 @@
+"""Cross-worker presence registry in a memory-mapped file.
+
+With `uvicorn --workers N` each process only sees its own sockets. When
+PRESENCE_SHM_PATH is set, every worker also records its users in one shared
+slot table (put it on tmpfs, e.g. /dev/shm/voip-presence). Any worker can
+then answer "is this user online, and where?" without an external service.
+
+Layout: a 16-byte header (magic, version, slot count, tombstone count),
+followed by a power-of-two number of 64-byte slots addressed by open
+addressing with linear probing:
+
+  seq      u32  generation counter; odd while a writer is mid-update
+  pid      u32  worker process that owns the socket
+  hash     u64  blake2b-64 of the user id (stable across processes)
+  state    u8   0 empty, 1 live, 2 tombstone
+  idlen    u8
+  updated  u32  unix seconds of the last write
+  user_id  40s
+
+Readers take no lock. They use a seqlock: read seq, read the slot, re-read
+seq, and retry if it changed or was odd. Writers are rare (connect and
+disconnect only), so they serialise on an flock of the file, and every
+write holds it for a bounded amount of work. When a worker starts, it clears
+slots left behind by dead workers. When it shuts down cleanly, it clears its
+own. Both find their slots with a lock-free scan first and take the lock
+only to free them.
+
+Tombstones must not pile up. Once no slot is EMPTY, every miss has to probe
+the whole table. So a freed slot becomes EMPTY whenever the next slot is
+EMPTY, and the walk back turns the tombstones before it EMPTY too. Once
+tombstones pass a quarter of the table anyway, each write also does one
+sweep step: at most _SWEEP_READS slots, resuming where the last step
+stopped. A step moves a live entry back to the first free slot on its probe
+path, and empties any tombstone that no live entry's path crosses.
+
+A lookup can miss during a sweep. The entry is written to its new slot
+before its old slot is freed, but a reader already past the new slot finds
+neither copy. So owner() can briefly answer None for someone online. That
+only happens while the table is being compacted, which it should rarely
+need. Presence is advisory anyway: a caller sees "offline" and tries again.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Callable, Iterator, Optional
+
+
+log = logging.getLogger("signaling.presence")
+
+_MAGIC = b"VPRS"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIII")        # magic, version, slots, tombstones
+_TOMBSTONES_AT = 12
+_SLOT = struct.Struct("<IIQBB2xI40s")
+_SEQ = struct.Struct("<I")
+SLOT_SIZE = _SLOT.size  # 64
+
+_EMPTY, _LIVE, _TOMBSTONE = 0, 1, 2
+_MAX_RETRIES = 10_000
+_SWEEP_FRACTION = 0.25     # sweep while tombstones exceed this share of the slots
+_SWEEP_READS = 256         # slot reads one sweep step may spend under the lock
+
+
+def _hash(user_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedPresence:
+    def __init__(self, path: str, slots: int) -> None:
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError("Presence slot count must be a power of two.")
+        self.path = path
+        self.slots = slots
+        self._mask = slots - 1
+        self.pid = os.getpid()
+        self._sweep_at = 0
+        size = _HEADER.size + slots * SLOT_SIZE
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _HEADER.pack(_MAGIC, _VERSION, slots, 0), 0)
+            magic, version, existing, _ = _HEADER.unpack(os.pread(self._fd, _HEADER.size, 0))
+        if magic != _MAGIC or version != _VERSION or existing != slots:
+            os.close(self._fd)
+            raise ValueError(
+                f"{path} holds a different presence table "
+                f"({magic!r} v{version}, {existing} slots); remove it or match PRESENCE_SHM_SLOTS."
+            )
+        self._mm = mmap.mmap(self._fd, size)
+        self.purge_dead()
+        # The count is a hint kept by writers; start every worker near the truth.
+        tombstones = self.stats()["tombstones"]
+        with self._locked():
+            self._set_tombstones(tombstones)
+
+    # -- low level --------------------------------------------------------------------
+
+    def _locked(self) -> "_FileLock":
+        return _FileLock(self._fd)
+
+    def _offset(self, index: int) -> int:
+        return _HEADER.size + index * SLOT_SIZE
+
+    def _read(self, index: int) -> tuple[int, int, int, int, int, int, bytes]:
+        off = self._offset(index)
+        mm = self._mm
+        for _ in range(_MAX_RETRIES):
+            before = _SEQ.unpack_from(mm, off)[0]
+            if before & 1:
+                continue
+            fields = _SLOT.unpack_from(mm, off)
+            if _SEQ.unpack_from(mm, off)[0] == before:
+                return fields
+        # A writer died mid-update and left seq odd; the next write repairs it.
+        return _SLOT.unpack_from(mm, off)
+
+    def _write(self, index: int, pid: int, h: int, state: int, user_id: bytes) -> None:
+        """Caller holds the file lock."""
+        off = self._offset(index)
+        seq = _SEQ.unpack_from(self._mm, off)[0] | 1     # odd, even if a dead writer left it so
+        _SEQ.pack_into(self._mm, off, seq)
+        _SLOT.pack_into(self._mm, off, seq, pid, h, state, len(user_id), int(time.time()), user_id)
+        _SEQ.pack_into(self._mm, off, (seq + 1) & 0xFFFFFFFF)
+
+    def _tombstones(self) -> int:
+        return _SEQ.unpack_from(self._mm, _TOMBSTONES_AT)[0]
+
+    def _set_tombstones(self, count: int) -> None:
+        """Caller holds the file lock."""
+        _SEQ.pack_into(self._mm, _TOMBSTONES_AT, max(count, 0))
+
+    def _state(self, index: int) -> int:
+        return self._read(index)[3]
+
+    def _free(self, index: int) -> None:
+        """Release a slot. Caller holds the file lock."""
+        if self._state((index + 1) & self._mask) != _EMPTY:
+            self._write(index, 0, 0, _TOMBSTONE, b"")
+            self._set_tombstones(self._tombstones() + 1)
+            return
+        self._clear_run(index)
+
+    def _clear_run(self, index: int) -> None:
+        """Empty `index` and the tombstones just before it. Caller holds the file lock.
+
+        Only valid when no live entry's probe path runs through `index`, e.g.
+        because the next slot is EMPTY. Then none runs through those
+        tombstones either.
+        """
+        self._write(index, 0, 0, _EMPTY, b"")
+        cleared = 0
+        j = (index - 1) & self._mask
+        while j != index and self._state(j) == _TOMBSTONE:
+            self._write(j, 0, 0, _EMPTY, b"")
+            cleared += 1
+            j = (j - 1) & self._mask
+        if cleared:
+            self._set_tombstones(self._tombstones() - cleared)
+
+    def _sweep(self) -> None:
+        """One bounded compaction step, if tombstones call for it. Caller holds the file lock."""
+        if self._tombstones() <= self.slots * _SWEEP_FRACTION:
+            return
+        budget = _SWEEP_READS
+        i = self._sweep_at
+        while budget > 0:
+            _, pid, h, state, idlen, _, raw = self._read(i)
+            budget -= 1
+            if state == _LIVE:
+                budget -= self._pull_back(i, pid, h, raw[:idlen], budget)
+            elif state == _TOMBSTONE:
+                budget -= self._clear_if_uncrossed(i, budget)
+            i = (i + 1) & self._mask
+        self._sweep_at = i
+
+    def _pull_back(self, index: int, pid: int, h: int, key: bytes, limit: int) -> int:
+        """Move a live entry to the first free slot on its probe path. Returns slots read."""
+        j = h & self._mask
+        reads = 0
+        while j != index and reads < limit:
+            state = self._state(j)
+            reads += 1
+            if state != _LIVE:
+                self._write(j, pid, h, _LIVE, key)     # the copy first, then the original
+                if state == _TOMBSTONE:
+                    self._set_tombstones(self._tombstones() - 1)
+                self._free(index)
+                break
+            j = (j + 1) & self._mask
+        return reads
+
+    def _clear_if_uncrossed(self, index: int, limit: int) -> int:
+        """Empty a tombstone no live entry probes through. Returns slots read.
+
+        Walks the rest of the cluster. If it is longer than `limit`, the
+        tombstone is left for a later step.
+        """
+        p = (index + 1) & self._mask
+        reads = 0
+        while p != index:                              # p == index: a full table, walked round
+            if reads >= limit:
+                return reads
+            _, _, h, state, _, _, _ = self._read(p)
+            reads += 1
+            if state == _EMPTY:
+                break
+            if state == _LIVE and (p - h) & self._mask >= (p - index) & self._mask:
+                return reads                           # its path runs through `index`
+            p = (p + 1) & self._mask
+        self._set_tombstones(self._tombstones() - 1)
+        self._clear_run(index)
+        return reads
+
+    def _find(self, user_id: bytes, h: int) -> tuple[Optional[int], Optional[int]]:
+        """(index of the live slot for user_id, first reusable index on the probe path)."""
+        reusable = None
+        i = h & self._mask
+        for _ in range(self.slots):
+            _, _, slot_hash, state, idlen, _, raw = self._read(i)
+            if state == _EMPTY:
+                return None, reusable if reusable is not None else i
+            if state == _TOMBSTONE:
+                if reusable is None:
+                    reusable = i
+            elif slot_hash == h and raw[:idlen] == user_id:
+                return i, None
+            i = (i + 1) & self._mask
+        return None, reusable
+
+    # -- API --------------------------------------------------------------------------
+
+    def add(self, user_id: str) -> bool:
+        """Mark `user_id` online in this worker. False if the table is full."""
+        key = user_id.encode("utf-8")[:40]
+        h = _hash(user_id)
+        with self._locked():
+            index, free = self._find(key, h)
+            target = index if index is not None else free
+            if target is None:
+                log.warning("shared presence table full (%d slots)", self.slots)
+                return False
+            if index is None and self._state(target) == _TOMBSTONE:
+                self._set_tombstones(self._tombstones() - 1)
+            self._write(target, self.pid, h, _LIVE, key)
+            self._sweep()
+        return True
+
+    def remove(self, user_id: str) -> None:
+        """Drop `user_id`, unless another worker has since taken them over."""
+        key = user_id.encode("utf-8")[:40]
+        h = _hash(user_id)
+        with self._locked():
+            index, _ = self._find(key, h)
+            if index is not None and self._read(index)[1] == self.pid:
+                self._free(index)
+            self._sweep()
+
+    def owner(self, user_id: str) -> Optional[int]:
+        """pid of the worker holding `user_id`'s socket, or None. Lock-free."""
+        key = user_id.encode("utf-8")[:40]
+        h = _hash(user_id)
+        i = h & self._mask
+        for _ in range(self.slots):
+            _, pid, slot_hash, state, idlen, _, raw = self._read(i)
+            if state == _EMPTY:
+                return None
+            if state == _LIVE and slot_hash == h and raw[:idlen] == key:
+                return pid
+            i = (i + 1) & self._mask
+        return None
+
+    def __contains__(self, user_id: object) -> bool:
+        return isinstance(user_id, str) and self.owner(user_id) is not None
+
+    def _live(self) -> Iterator[tuple[int, int, str]]:
+        for i in range(self.slots):
+            _, pid, _, state, idlen, _, raw = self._read(i)
+            if state == _LIVE:
+                yield i, pid, raw[:idlen].decode("utf-8")
+
+    def online_ids(self) -> list[str]:
+        """Every user online in any worker.
+
+        O(slots) lock-free reads: call it from a thread, not the event loop.
+        """
+        return [user_id for _, _, user_id in self._live()]
+
+    def _release_where(self, gone: Callable[[int], bool]) -> int:
+        """Free live slots whose pid is `gone`. Returns how many.
+
+        Candidates are found without the lock. Each one is checked again under
+        the lock, so other workers' writers wait only for the frees. A sweep
+        can move an entry after the scan has seen it, so scan again until a
+        pass finds nothing left to do.
+        """
+        freed = 0
+        for _ in range(3):
+            candidates = [(i, pid) for i, pid, _ in self._live() if gone(pid)]
+            if not candidates:
+                break
+            with self._locked():
+                for i, pid in candidates:
+                    _, owner, _, state, _, _, _ = self._read(i)
+                    if state == _LIVE and owner == pid:
+                        self._free(i)
+                        freed += 1
+                self._sweep()
+        return freed
+
+    def purge_dead(self) -> int:
+        """Free slots whose worker no longer exists. Returns how many."""
+        alive: dict[int, bool] = {}
+
+        def dead(pid: int) -> bool:
+            if pid not in alive:
+                alive[pid] = pid == self.pid or _pid_alive(pid)
+            return not alive[pid]
+
+        purged = self._release_where(dead)
+        if purged:
+            log.info("cleared %d presence slots left by dead workers", purged)
+        return purged
+
+    def close(self) -> None:
+        """Release this worker's slots and unmap."""
+        self._release_where(lambda pid: pid == self.pid)
+        self._mm.close()
+        os.close(self._fd)
+
+    def stats(self) -> dict[str, int]:
+        """Slot counts. O(slots) lock-free reads, like `online_ids`."""
+        live = tombstones = 0
+        workers: set[int] = set()
+        for i in range(self.slots):
+            _, pid, _, state, _, _, _ = self._read(i)
+            if state == _LIVE:
+                live += 1
+                workers.add(pid)
+            elif state == _TOMBSTONE:
+                tombstones += 1
+        return {"slots": self.slots, "live": live, "tombstones": tombstones, "workers": len(workers)}
+
+
+class _FileLock:
+    def __init__(self, fd: int) -> None:
+        self._fd = fd
+
+    def __enter__(self) -> None:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc: object) -> None:
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
@@ -7,21 +7,26 @@ Wire protocol (JSON messages, all keyed by `type`).
     call-request    { to }                              ring a single user
     call-response   { to, data: { accepted } }          accept/decline
     hang-up         { to }
-    add-contact     { username }
+    add-contact     { data: { username } }              see their presence from now on
 
     -- rooms (multi-party Meet-like) --
     room-create     { data?: { code? } }                make a room, returns code
     room-join       { data: { code } }                  join an existing room
     room-leave                                          leave the current room
 
+    pong                                                reply to a server `ping`
+    stats-report    { data: { rttMs?, jitterMs?, packetLossPct?, bitrateKbps?, peer? } }
+                                                        periodic getStats summary
+
     -- signaling (used by both 1:1 and rooms) --
     offer           { to, data: <RTCSessionDescription> }
     answer          { to, data: <RTCSessionDescription> }
     ice-candidate   { to, data: <RTCIceCandidate> }
 
   Outbound (server → client):
-    websocket-connected   { data: { user } }
-    contacts-update       { data: PublicUser[] }
+    websocket-connected   { data: { user, ice: { iceServers, ttl } } }
+    contacts-update       { data: PublicUser[] }              you + your online contacts
+    contact-added         { data: PublicUser }
     call-request          { from, data: { callerId, callerName } }
     call-response         { from, data: { accepted } }
     call-failed           { data: { reason } }
@@ -29,67 +34,120 @@ Wire protocol (JSON messages, all keyed by `type`).
     offer/answer/ice-candidate { from, data }                forwarded
 
     -- room events --
-    room-joined           { data: { code, participants: PublicUser[], you: PublicUser } }
+    room-joined           { data: { code, participants: PublicUser[], you: PublicUser, mediaHints } }
     room-left             { data: { code } }
     room-error            { data: { reason } }
-    participant-joined    { data: { participant: PublicUser, code } }
-    participant-left      { data: { userId, code } }
+    participant-joined    { data: { participant: PublicUser, code, mediaHints } }
+    participant-left      { data: { userId, code, mediaHints } }
+    media-hints           { data: { code, maxBitrateKbps, dtx, fec, ptimeMs, ... } }
+                          only when telemetry changes the advice between membership events
+
+    -- lifecycle --
+    ping                  { data: { t } }                      keepalive probe, answer with `pong`
+    server-draining       { data: { retryAfterMs, inRoom } }   reconnect hint before a restart
 
 Auth: the JWT is supplied as a query parameter so browsers can use the standard
 WebSocket API (which can't set Authorization headers). Tokens are short-lived
 JWTs and the channel must run over TLS in production.
 
+Presence: `contacts-update` is your own roster: you plus the contacts you
+have added who are online. When someone connects or disconnects, only the
+users who have them as a contact are sent a fresh roster. ws/contacts.py
+keeps both adjacency directions for online users, so that costs O(degree).
+PRESENCE_SCOPE=all restores the old behaviour, where everyone sees everyone
+online.
+
+With several uvicorn workers, PRESENCE_SHM_PATH gives every worker the same
+view of who is online (ws/shared_presence.py) for point lookups and
+GET /api/users/online. Messages are still relayed only between sockets held
+by the same worker, so the roster pushed on connect and disconnect lists this
+worker's users and never scans the table. A call to someone on another worker
+fails with a reason that says so.
+
 Room model: in-memory, mesh-topology. The server only relays signaling — actual
 audio packets fly peer-to-peer between browsers via WebRTC. A room is identified
-by a short readable code (e.g. "purple-fox-42"). Empty rooms are garbage-
-collected automatically on the last leave.
+by a short readable code (e.g. "purple-fox-42") handed out by a free-index
+allocator (ws/room_codes.py), so allocation never retries. Empty rooms are
+garbage-collected automatically on the last leave, returning their code.
+
+Drain: before a restart (SIGTERM or POST /api/admin/drain) the manager stops
+accepting new sockets, hands every client a randomized reconnect delay, closes
+idle sockets straight away and lets active rooms run until they empty or the
+drain deadline passes. Reconnects then arrive spread over the hint window
+instead of as one stampede.
+
+Admission: a new socket is checked before it is accepted (ws/admission.py).
+While the event loop lags, the worker is at its connection ceiling, or too
+many handshakes are already in flight, the socket is closed with 1013 and a
+jittered retry hint. It never reaches auth or the roster broadcast, so open
+calls keep the loop.
+
+Liveness: any inbound frame counts as proof of life. After HEARTBEAT_INTERVAL_S
+of silence the server sends `ping`; a socket that stays silent for another
+HEARTBEAT_TIMEOUT_S is reaped (room left, roster updated) without waiting for
+TCP to notice. See ws/heartbeat.py for the shared timer wheel behind this.
+
+Media hints: every membership message (room-joined, participant-joined,
+participant-left) carries `mediaHints`, the Opus settings recommended for the
+room's new size (ws/media_hints.py). If stats-reports later change the advice,
+a standalone `media-hints` goes to the whole room.
 """
 
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 import logging
 import random
-from typing import Any, Optional
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import AbstractSet, Any, Optional
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 
 from ..auth import decode_token
-from ..db import UserRow, get_user_by_id, get_users_by_ids
+from ..cdr import cdr
+from ..config import settings
+from ..db import (
+    UserRow,
+    add_contact,
+    get_user_by_username,
+)
+from ..ice import ice
+from ..logs import Sampled
+from ..loopmon import monitor
 from ..models import PublicUser
+from ..telemetry import telemetry
+from ..tracing import tracer
+from . import sdp_compact
+from .admission import Admission
+from .compression import wire_stats
+from .contacts import ContactGraph
+from .heartbeat import Heartbeat
+from .media_hints import recommend
+from .pipeline import InboundPipeline
+from .room_codes import (
+    DEFAULT_ADJECTIVES,
+    DEFAULT_ANIMALS,
+    RoomCodeAllocator,
+    load_wordlist,
+)
+from .recorder import TrafficRecorder
+from .room_snapshots import RoomSnapshots
+from .shared_presence import SharedPresence
+from .user_loader import UserLoader
 
 
 log = logging.getLogger("signaling")
+# For sites that fire once per socket when a network event kills many at once.
+noisy = Sampled(log, settings.log_sample_window_s, settings.log_sample_burst)
 
 router = APIRouter()
 
 
-# --- Room-code generator --------------------------------------------------------------
-
-_ADJECTIVES = [
-    "amber", "azure", "brave", "bright", "calm", "clever", "coral", "crisp",
-    "dewy", "eager", "fiery", "frosty", "gentle", "golden", "happy", "humble",
-    "indigo", "jolly", "jade", "keen", "kind", "lively", "lucky", "merry",
-    "misty", "noble", "olive", "plucky", "proud", "quick", "rosy", "scarlet",
-    "silver", "snappy", "soft", "spry", "sunny", "swift", "teal", "tidy",
-    "vivid", "warm", "witty", "wild", "young", "zany",
-]
-_ANIMALS = [
-    "ant", "ape", "bat", "bee", "boar", "bug", "cat", "cod", "cow", "crab",
-    "crow", "deer", "dog", "duck", "eel", "elk", "emu", "fox", "frog", "goat",
-    "hare", "hawk", "hen", "ibis", "kiwi", "koala", "lamb", "lark", "lion",
-    "lynx", "mole", "moose", "moth", "newt", "otter", "owl", "panda", "pig",
-    "puma", "quail", "ram", "rat", "robin", "seal", "shark", "sheep", "snail",
-    "squid", "stork", "swan", "tiger", "toad", "trout", "tuna", "wasp",
-    "whale", "wolf", "yak", "zebra",
-]
-
-
-def _generate_room_code() -> str:
-    return f"{random.choice(_ADJECTIVES)}-{random.choice(_ANIMALS)}-{random.randint(10, 99)}"
-
-
 # --- ConnectionManager ----------------------------------------------------------------
 
 
@@ -102,48 +160,211 @@ class ConnectionManager:
 
     def __init__(self) -> None:
         self._sockets: dict[str, WebSocket] = {}            # user_id → ws
+        self._profiles: dict[str, dict[str, Any]] = {}      # user_id → PublicUser dict
+        self.compact_sdp: set[str] = set()                  # users who take compact SDP
+        self.contacts = ContactGraph()
+        self.presence_all = settings.presence_scope == "all"
+        self.shared: Optional[SharedPresence] = None        # other workers' users too
         self._rooms: dict[str, set[str]] = {}               # room_code → {user_id, ...}
         self._user_room: dict[str, str] = {}                # user_id → room_code
+        self._room_hints: dict[str, tuple[float, dict[str, Any]]] = {}  # code → (checked, hints)
+        self._rooms_version = 0                             # bumped on every membership change
+        self._restoring: dict[str, str] = {}                # user_id → code, from a snapshot
+        self._restoring_codes: Counter[str] = Counter()     # code → members still due back
+        self._restore_deadline = 0.0
         self._lock = asyncio.Lock()
+        self.users = UserLoader()                           # batches concurrent user lookups
+        self.codes = RoomCodeAllocator(
+            load_wordlist(settings.room_code_adjectives_file, DEFAULT_ADJECTIVES),
+            load_wordlist(settings.room_code_animals_file, DEFAULT_ANIMALS),
+            settings.room_code_digits,
+        )
+        self._drain_task: Optional[asyncio.Task[None]] = None
+        self._drain_spread = 0.0
+        self.admission = Admission(
+            open_sockets=lambda: len(self._sockets),
+            loop_lag_ms=monitor.current_lag_ms,
+            max_connections=settings.ws_max_connections,
+            max_handshakes=settings.ws_admit_max_handshakes,
+            max_lag_ms=settings.ws_admit_max_lag_ms,
+            wait_s=settings.ws_admit_wait_ms / 1000,
+            retry_spread_s=settings.ws_admit_retry_spread_s,
+        )
+        self.pipeline: Optional[InboundPipeline] = None
+        if settings.ws_workers > 0:
+            self.pipeline = InboundPipeline(settings.ws_workers, settings.ws_max_pending)
+        self.recorder: Optional[TrafficRecorder] = None
+        if settings.ws_record_path:
+            self.recorder = TrafficRecorder(
+                settings.ws_record_path,
+                int(settings.ws_record_max_mb * (1 << 20)),
+                settings.ws_record_flush_s,
+            )
+        self.snapshots: Optional[RoomSnapshots] = None
+        self.drain_cut_rooms = settings.drain_cut_rooms
+        if settings.room_snapshot_interval_s > 0:
+            self.snapshots = RoomSnapshots(
+                settings.room_snapshot_interval_s,
+                settings.room_snapshot_ttl_s,
+                collect=self.room_membership,
+                version=lambda: self._rooms_version,
+                on_tick=self.expire_restored,
+            )
+        self.heartbeat: Optional[Heartbeat[str]] = None
+        if settings.heartbeat_interval_s > 0:
+            self.heartbeat = Heartbeat(
+                settings.heartbeat_interval_s,
+                settings.heartbeat_timeout_s,
+                settings.heartbeat_tick_s,
+                on_ping=self._ping,
+                on_dead=self._reap,
+            )
 
     # -- presence -----------------------------------------------------------------
 
-    async def register(self, user_id: str, ws: WebSocket) -> None:
+    async def register(
+        self, user_id: str, ws: WebSocket, profile: Optional[dict[str, Any]] = None
+    ) -> None:
+        if not self.presence_all:
+            await self.contacts.load(user_id)     # DB reads in a thread, before the lock
         async with self._lock:
             old = self._sockets.get(user_id)
             self._sockets[user_id] = ws
+            if self.shared is not None:
+                self.shared.add(user_id)
+            if profile is not None:
+                self._profiles[user_id] = profile
+            if self.heartbeat is not None:
+                self.heartbeat.track(user_id)
         if old is not None:
             try:
                 await old.close(code=status.WS_1008_POLICY_VIOLATION)
             except Exception:  # noqa: BLE001
                 pass
 
-    async def unregister(self, user_id: str, ws: WebSocket) -> None:
+    async def unregister(self, user_id: str, ws: WebSocket) -> bool:
+        """Drop the socket if it is still the user's current one. Returns whether it was."""
         async with self._lock:
             if self._sockets.get(user_id) is ws:
                 self._sockets.pop(user_id, None)
+                self._profiles.pop(user_id, None)
+                self.compact_sdp.discard(user_id)
+                self.contacts.unload(user_id)
+                if self.shared is not None:
+                    self.shared.remove(user_id)
+                if self.heartbeat is not None:
+                    self.heartbeat.forget(user_id)
+                return True
+            return False
 
-    def is_online(self, user_id: str) -> bool:
+    def touch(self, user_id: str) -> None:
+        """Note inbound traffic from the user (keeps the heartbeat quiet)."""
+        if self.heartbeat is not None:
+            self.heartbeat.touch(user_id)
+
+    async def _ping(self, user_id: str) -> None:
+        await self.send_to(
+            user_id, {"type": "ping", "data": {"t": int(time.time() * 1000)}}
+        )
+
+    async def _reap(self, user_id: str) -> None:
+        ws = self._sockets.get(user_id)
+        if ws is None:
+            return
+        noisy.info("heartbeat timeout for %s", user_id, fields={"user": user_id})
+        # Clean up first so the roster stops showing a ghost right away; the
+        # close may take a while against a peer that's gone.
+        await _release(user_id, ws)
+        try:
+            await asyncio.wait_for(
+                ws.close(code=status.WS_1001_GOING_AWAY, reason="heartbeat timeout"), 1.0
+            )
+        except Exception:  # noqa: BLE001
+            pass
+
+    def open_shared(self, path: str, slots: int) -> None:
+        """Publish presence in the cross-worker table at `path` (see shared_presence)."""
+        self.shared = SharedPresence(path, slots)
+        for user_id in list(self._sockets):
+            self.shared.add(user_id)
+
+    def close_shared(self) -> None:
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
+    def local_count(self) -> int:
+        return len(self._sockets)
+
+    def is_local(self, user_id: str) -> bool:
+        """Whether this worker holds the user's socket."""
         return user_id in self._sockets
 
+    def is_online(self, user_id: str) -> bool:
+        """Online in any worker when the shared table is enabled, else in this one."""
+        return user_id in self._sockets or (self.shared is not None and user_id in self.shared)
+
     def online_ids(self) -> list[str]:
+        """Everyone online; with the shared table an O(slots) scan, so not on the loop."""
+        if self.shared is not None:
+            return self.shared.online_ids()
         return list(self._sockets.keys())
 
     async def send_to(self, user_id: str, payload: dict[str, Any]) -> bool:
+        if user_id not in self._sockets:
+            return False
+        return await self.send_text_to(user_id, json.dumps(payload), payload.get("type"))
+
+    async def send_text_to(self, user_id: str, text: str, kind: Optional[str] = None) -> bool:
+        """`send_to` for an already-encoded payload, so a fan-out encodes once."""
         ws = self._sockets.get(user_id)
         if ws is None:
             return False
         try:
-            await ws.send_text(json.dumps(payload))
-            return True
+            await ws.send_text(text)
         except Exception as exc:  # noqa: BLE001
-            log.warning("send failure to %s: %s", user_id, exc)
+            noisy.warning("send failure to %s: %s", user_id, exc,
+                          fields={"user": user_id, "type": kind, "error": type(exc).__name__})
             return False
+        if self.recorder is not None:
+            self.recorder.outbound(user_id, kind, len(text))
+        return True
+
+    def roster_for(self, user_id: str) -> list[dict[str, Any]]:
+        """`user_id` plus their online contacts (everyone online with PRESENCE_SCOPE=all)."""
+        ids = (
+            self._sockets.keys()
+            if self.presence_all
+            else [user_id, *(c for c in self.contacts.contacts(user_id) if c in self._sockets)]
+        )
+        return [self._profiles[i] for i in ids if i in self._profiles]
+
+    async def send_roster(self, user_id: str) -> None:
+        await self.send_to(user_id, {"type": "contacts-update", "data": self.roster_for(user_id)})
+
+    async def announce(
+        self, user_id: str, watchers: Optional[AbstractSet[str]] = None
+    ) -> None:
+        """Tell whoever should know that `user_id` came online or went offline.
+
+        Pass `watchers` for a departure, captured before `unregister` dropped
+        the user's edges.
+        """
+        if self.presence_all:
+            await self.broadcast_roster()
+            return
+        if watchers is None:
+            watchers = self.contacts.watchers(user_id)
+        targets = [w for w in watchers if w in self._sockets]
+        if user_id in self._sockets:
+            targets.append(user_id)
+        for target in targets:
+            await self.send_roster(target)
 
     async def broadcast_roster(self) -> None:
-        """Push the current online roster to every connected client."""
-        ids = self.online_ids()
-        users = get_users_by_ids(ids)
+        """Push this worker's online roster to every client connected to it."""
+        ids = list(self._sockets)
+        users = await self.users.load_many(ids)
         payload = {
             "type": "contacts-update",
             "data": [
@@ -153,13 +374,18 @@ class ConnectionManager:
                 for u in users
             ],
         }
+        text = json.dumps(payload)
         async with self._lock:
             sockets = list(self._sockets.items())
         for uid, ws in sockets:
             try:
-                await ws.send_text(json.dumps(payload))
+                await ws.send_text(text)
             except Exception as exc:  # noqa: BLE001
-                log.warning("roster broadcast to %s failed: %s", uid, exc)
+                noisy.warning("roster broadcast to %s failed: %s", uid, exc,
+                              fields={"user": uid, "error": type(exc).__name__})
+                continue
+            if self.recorder is not None:
+                self.recorder.outbound(uid, "contacts-update", len(text))
 
     # -- rooms --------------------------------------------------------------------
 
@@ -172,15 +398,60 @@ class ConnectionManager:
     async def create_room(self, requested: Optional[str] = None) -> str:
         """Reserve an empty room. The caller has to follow up with `join_room`."""
         async with self._lock:
-            for _ in range(20):
-                code = (requested or _generate_room_code()).lower().strip()
-                if code and code not in self._rooms:
+            if requested:
+                code = requested.lower().strip()
+                if code and code not in self._rooms and self.codes.claim(code):
                     self._rooms[code] = set()
                     return code
-                if requested:
-                    # caller insisted on a specific code that's taken
-                    raise ValueError("Room code already in use.")
-            raise ValueError("Could not allocate a unique room code, try again.")
+                # caller insisted on a specific code that's taken
+                raise ValueError("Room code already in use.")
+            code = self.codes.allocate()
+            while code in self._rooms:
+                # The allocator and the room table disagree; never hand out a live room.
+                log.error("allocator returned %s, which is in use; skipping it", code)
+                code = self.codes.allocate()
+            self._rooms[code] = set()
+            return code
+
+    def _drop_room_if_empty(self, code: str) -> None:
+        if code in self._rooms and not self._rooms[code]:
+            self._rooms.pop(code, None)
+            self._room_hints.pop(code, None)
+            if code not in self._restoring_codes:   # else held for its snapshot members
+                self.codes.release(code)
+
+    # -- media hints --------------------------------------------------------------
+
+    def _recommend(self, code: str) -> dict[str, Any]:
+        return recommend(
+            len(self._rooms.get(code, ())),
+            telemetry.room_summary(code),
+            uplink_budget_kbps=settings.media_uplink_budget_kbps,
+            min_kbps=settings.media_min_bitrate_kbps,
+            max_kbps=settings.media_max_bitrate_kbps,
+        )
+
+    def media_hints(self, code: str) -> dict[str, Any]:
+        """Current Opus advice for the room; remembered so telemetry can diff against it."""
+        hints = self._recommend(code)
+        if code in self._rooms:
+            self._room_hints[code] = (time.monotonic(), hints)
+        return hints
+
+    def changed_media_hints(self, code: str) -> Optional[dict[str, Any]]:
+        """Re-check a room after new telemetry. Returns new hints only if the advice moved.
+
+        Rate-limited to one re-check per room every _HINT_RECHECK_S.
+        """
+        checked, last = self._room_hints.get(code, (0.0, None))
+        now = time.monotonic()
+        if code not in self._rooms or now - checked < _HINT_RECHECK_S:
+            return None
+        hints = self._recommend(code)
+        self._room_hints[code] = (now, hints)
+        if last is not None and _same_advice(last, hints):
+            return None
+        return hints
 
     async def join_room(self, code: str, user_id: str) -> set[str]:
         """Add user to room. Returns the OTHER members already present."""
@@ -189,17 +460,23 @@ class ConnectionManager:
             if code not in self._rooms:
                 # Be lenient: if the code looks well-formed, auto-create.
                 # That way two people can agree on a code in chat and just join.
+                # A code held for a restored room was claimed by restore_rooms.
+                if not self.codes.claim(code) and code not in self._restoring_codes:
+                    raise ValueError("Room code already in use.")
                 self._rooms[code] = set()
             # If this user was in another room, drop that membership first.
             prev = self._user_room.get(user_id)
             if prev and prev != code:
                 self._rooms.get(prev, set()).discard(user_id)
-                if prev in self._rooms and not self._rooms[prev]:
-                    self._rooms.pop(prev, None)
+                cdr.record("room-leave", user_id, room=prev,
+                           participants=len(self._rooms.get(prev, ())))
+                self._drop_room_if_empty(prev)
             existing_others = set(self._rooms[code])
             existing_others.discard(user_id)
             self._rooms[code].add(user_id)
             self._user_room[user_id] = code
+            self._rooms_version += 1
+            cdr.record("room-join", user_id, room=code, participants=len(self._rooms[code]))
             return existing_others
 
     async def leave_room(self, user_id: str) -> Optional[tuple[str, set[str]]]:
@@ -210,10 +487,144 @@ class ConnectionManager:
                 return None
             members = self._rooms.get(code, set())
             members.discard(user_id)
-            if not members:
-                self._rooms.pop(code, None)
+            self._rooms_version += 1
+            cdr.record("room-leave", user_id, room=code, participants=len(members))
+            self._drop_room_if_empty(code)
             return code, set(members)
 
+    # -- warm restarts ------------------------------------------------------------
+
+    def room_membership(self) -> list[tuple[str, str]]:
+        """(code, user_id) for everyone in a room, plus restored users not back yet."""
+        pairs = [(code, uid) for uid, code in self._user_room.items()]
+        pairs += [(code, uid) for uid, code in self._restoring.items() if uid not in self._user_room]
+        return pairs
+
+    def restoring_count(self) -> int:
+        return len(self._restoring)
+
+    def restore_rooms(self, rooms: dict[str, list[str]], ttl: float) -> None:
+        """Hold snapshot rooms for their members to reclaim within `ttl` seconds."""
+        for code, members in rooms.items():
+            if not self.codes.claim(code):
+                log.warning("snapshot room %s skipped: its code is already in use", code)
+                continue
+            for uid in members:
+                self._restoring[uid] = code
+                self._restoring_codes[code] += 1
+        self._restore_deadline = time.monotonic() + ttl
+        self._rooms_version += 1
+
+    async def reattach(self, user_id: str) -> Optional[tuple[str, set[str]]]:
+        """Put a returning user back in their snapshot room. Returns (code, others)."""
+        code = self._restoring.pop(user_id, None)
+        if code is None:
+            return None
+        try:
+            if user_id in self._user_room:
+                return None
+            return code, await self.join_room(code, user_id)
+        finally:
+            self._restoring_codes[code] -= 1
+            if self._restoring_codes[code] <= 0:
+                del self._restoring_codes[code]
+                if code not in self._rooms:
+                    self.codes.release(code)
+
+    async def expire_restored(self) -> None:
+        """Give up on snapshot members who didn't come back before the deadline."""
+        if not self._restoring or time.monotonic() < self._restore_deadline:
+            return
+        gone, self._restoring = self._restoring, {}
+        self._restoring_codes.clear()
+        self._rooms_version += 1
+        log.info("%d snapshot members never returned", len(gone))
+        for uid, code in gone.items():
+            if code not in self._rooms:
+                self.codes.release(code)            # idempotent; one call per member
+                continue
+            members = set(self._rooms[code])
+            await _broadcast_to_room(code, members, {
+                "type": "participant-left",
+                "data": {"userId": uid, "code": code, "mediaHints": self.media_hints(code)},
+            })
+
+
+    # -- drain --------------------------------------------------------------------
+
+    @property
+    def draining(self) -> bool:
+        return self._drain_task is not None
+
+    def drain_status(self) -> dict[str, Any]:
+        return {
+            "draining": self.draining,
+            "done": self._drain_task is not None and self._drain_task.done(),
+            "connections": len(self._sockets),
+            "rooms": len(self._rooms),
+        }
+
+    def drain_hint(self, user_id: Optional[str] = None) -> dict[str, Any]:
+        """`server-draining` message with a reconnect delay drawn from the spread window."""
+        spread_ms = max(self._drain_spread, 1.0) * 1000
+        return {
+            "type": "server-draining",
+            "data": {
+                "retryAfterMs": int(random.uniform(1000, spread_ms)),
+                "inRoom": user_id is not None and user_id in self._user_room,
+            },
+        }
+
+    def start_drain(self, timeout: float, spread: float) -> asyncio.Task[None]:
+        """Begin a graceful drain. Idempotent: a second call returns the running task."""
+        if self._drain_task is None:
+            self._drain_spread = spread
+            self._drain_task = asyncio.create_task(self._drain(timeout))
+        return self._drain_task
+
+    async def _drain(self, timeout: float) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        hinted: set[str] = set()
+        log.info("draining %d sockets / %d rooms (deadline %.0fs)",
+                 len(self._sockets), len(self._rooms), timeout)
+        cut = self.snapshots is not None and self.drain_cut_rooms
+        if cut:
+            # Rooms survive the restart, so don't wait for them to end.
+            await self.snapshots.save(final=True)  # type: ignore[union-attr]
+            deadline = loop.time()
+        while True:
+            async with self._lock:
+                sockets = list(self._sockets.items())
+            for uid, ws in sockets:
+                if uid not in hinted:
+                    hinted.add(uid)
+                    await _safe_send(ws, self.drain_hint(uid))
+                # Idle sockets (or ones whose room just ended) can go now.
+                if uid not in self._user_room:
+                    await _close_for_restart(ws)
+            if not self._rooms or loop.time() >= deadline:
+                break
+            await asyncio.sleep(0.25)
+        if self.snapshots is not None and not cut:
+            # Only the rooms the deadline is about to cut need restoring.
+            await self.snapshots.save(final=True)
+        async with self._lock:
+            sockets = list(self._sockets.items())
+        for _, ws in sockets:
+            await _close_for_restart(ws)
+        log.info("drain complete (%d rooms cut at deadline)", len(self._rooms))
+
+
+_HINT_RECHECK_S = 10.0
+_INBOX_DRAIN_S = 5.0
+
+
+def _same_advice(a: dict[str, Any], b: dict[str, Any]) -> bool:
+    return {k: v for k, v in a.items() if k != "reasons"} == {
+        k: v for k, v in b.items() if k != "reasons"
+    }
+
 
 manager = ConnectionManager()
 
@@ -221,7 +632,30 @@ manager = ConnectionManager()
 # --- Connection bootstrap -------------------------------------------------------------
 
 
-async def _authenticate(ws: WebSocket) -> Optional[UserRow]:
+@dataclass(slots=True, frozen=True)
+class Session:
+    """What a live connection keeps about its user.
+
+    The id is interned, so every registry keyed by it shares one string, and
+    `public` is the one PublicUser dict used in the roster and room messages.
+    The password hash and the rest of the row are not kept.
+    """
+
+    id: str
+    public: dict[str, Any]
+
+    @classmethod
+    def from_row(cls, row: UserRow) -> "Session":
+        public = _public(row)
+        public["id"] = user_id = sys.intern(row.id)
+        return cls(user_id, public)
+
+    @property
+    def username(self) -> str:
+        return self.public["username"]
+
+
+async def _authenticate(ws: WebSocket) -> Optional[Session]:
     token = ws.query_params.get("token")
     if not token:
         await ws.close(code=status.WS_1008_POLICY_VIOLATION, reason="missing token")
@@ -230,47 +664,105 @@ async def _authenticate(ws: WebSocket) -> Optional[UserRow]:
     if not user_id:
         await ws.close(code=status.WS_1008_POLICY_VIOLATION, reason="invalid token")
         return None
-    user = get_user_by_id(user_id)
-    if not user:
+    row = await manager.users.load(user_id)
+    if not row:
         await ws.close(code=status.WS_1008_POLICY_VIOLATION, reason="user not found")
         return None
-    return user
+    return Session.from_row(row)
+
 
+async def _safe_send(ws: WebSocket, payload: dict[str, Any], user_id: Optional[str] = None) -> None:
+    """Send, ignoring failures. Pass `user_id` to have the send recorded."""
+    text = json.dumps(payload)
+    try:
+        await ws.send_text(text)
+    except Exception:  # noqa: BLE001
+        return
+    if user_id is not None and manager.recorder is not None:
+        manager.recorder.outbound(user_id, payload["type"], len(text))
+
+
+async def _close_for_restart(ws: WebSocket) -> None:
+    try:
+        await ws.close(code=status.WS_1012_SERVICE_RESTART, reason="server restarting")
+    except Exception:  # noqa: BLE001
+        pass
 
-async def _safe_send(ws: WebSocket, payload: dict[str, Any]) -> None:
+
+async def _close_overloaded(ws: WebSocket, reason: str) -> None:
     try:
-        await ws.send_text(json.dumps(payload))
+        await ws.close(code=status.WS_1013_TRY_AGAIN_LATER,
+                       reason=manager.admission.close_reason(reason))
     except Exception:  # noqa: BLE001
         pass
 
 
+async def _welcome(ws: WebSocket, user: Session) -> None:
+    """Send the greeting and roster to a registered socket, re-attach a restored room.
+
+    Kept out of `ws_endpoint` so the greeting (profile, ICE servers) isn't held
+    in the endpoint's frame for the whole life of the connection.
+    """
+    hello: dict[str, Any] = {
+        "user": user.public,
+        # Same payload as GET /api/ice-servers, so ICE gathering can
+        # start without an extra round-trip.
+        "ice": ice.for_user(user.id),
+    }
+    if settings.sdp_compaction and ws.query_params.get("sdp") == "compact":
+        manager.compact_sdp.add(user.id)
+        hello["sdpCompact"] = sdp_compact.VERSION
+    await _safe_send(ws, {"type": "websocket-connected", "data": hello}, user.id)
+    await manager.announce(user.id)
+    rejoined = await manager.reattach(user.id)
+    if rejoined is not None:
+        await _announce_join(user, *rejoined, restored=True)
+
+
 @router.websocket("/ws")
 async def ws_endpoint(ws: WebSocket) -> None:
-    await ws.accept()
-    user = await _authenticate(ws)
-    if not user:
+    if manager.draining:
+        # Ahead of admission: a draining worker owes every client its
+        # reconnect hint, not a "busy" refusal or a wait for a handshake slot.
+        await ws.accept()
+        await _safe_send(ws, manager.drain_hint())
+        await _close_for_restart(ws)
         return
-
-    await manager.register(user.id, ws)
-    await _safe_send(
-        ws,
-        {
-            "type": "websocket-connected",
-            "data": {
-                "user": PublicUser(
-                    id=user.id,
-                    username=user.username,
-                    email=user.email,
-                    created_at=user.created_at,
-                ).model_dump()
-            },
-        },
-    )
-    await manager.broadcast_roster()
-
+    # Decided before the upgrade: a socket waiting for a handshake slot holds
+    # nothing but its TCP connection.
+    refused = await manager.admission.enter()
+    if refused is not None:
+        noisy.warning("refused /ws connection: %s", refused, fields={"reason": refused})
+        await ws.accept()
+        await _close_overloaded(ws, refused)
+        return
+    recorder = manager.recorder
+    try:
+        await ws.accept()
+        if manager.draining:
+            # The drain began while this socket waited for a handshake slot.
+            await _safe_send(ws, manager.drain_hint())
+            await _close_for_restart(ws)
+            return
+        user = await _authenticate(ws)
+        if not user:
+            return
+        if recorder is not None:
+            recorder.connected(user.id)
+        await manager.register(user.id, ws, user.public)
+    finally:
+        # Once registered the socket counts as open, so it stops counting as a
+        # handshake here rather than after the welcome.
+        manager.admission.leave()
+    await _welcome(ws, user)
+
+    # Keep reading while earlier frames are handled; see ws/pipeline.py.
+    pipeline = manager.pipeline
+    inbox = pipeline.inbox() if pipeline is not None and pipeline.running else None
     try:
         while True:
             raw = await ws.receive_text()
+            manager.touch(user.id)
             try:
                 msg = json.loads(raw)
             except json.JSONDecodeError:
@@ -278,23 +770,56 @@ async def ws_endpoint(ws: WebSocket) -> None:
                     ws, {"type": "error", "data": {"message": "invalid JSON"}}
                 )
                 continue
-
-            await _route(user, msg)
+            if not isinstance(msg, dict):
+                await _safe_send(
+                    ws, {"type": "error", "data": {"message": "expected a JSON object"}}
+                )
+                continue
+            if recorder is not None:
+                recorder.inbound(user.id, msg, len(raw))
+
+            if inbox is None:
+                await _route(user, msg)
+            else:
+                to = msg.get("to")
+                await inbox.submit(
+                    user.id, to if isinstance(to, str) else None, functools.partial(_route, user, msg)
+                )
     except WebSocketDisconnect:
         pass
     except Exception as exc:  # noqa: BLE001
-        log.warning("ws error for %s: %s", user.id, exc)
+        noisy.warning("ws error for %s: %s", user.id, exc,
+                      fields={"user": user.id, "error": type(exc).__name__})
     finally:
-        # If they were in a room, tell the rest of the room.
-        left = await manager.leave_room(user.id)
-        if left:
-            code, remaining = left
-            await _broadcast_to_room(code, remaining, {
-                "type": "participant-left",
-                "data": {"userId": user.id, "code": code},
-            })
-        await manager.unregister(user.id, ws)
-        await manager.broadcast_roster()
+        # Let frames already read finish first, so a queued room-join can't
+        # land after the cleanup and leave a ghost member behind.
+        if inbox is not None and not await inbox.drain(_INBOX_DRAIN_S):
+            noisy.warning("gave up waiting for %s's queued frames", user.id,
+                          fields={"user": user.id, "pending": inbox.pending})
+        await _release(user.id, ws)
+        if recorder is not None:
+            recorder.disconnected(user.id)
+
+
+async def _release(user_id: str, ws: WebSocket) -> None:
+    """Tear down a user's session: leave their room and drop them from the roster.
+
+    Safe to call twice (heartbeat reap, then the endpoint's own `finally`).
+    """
+    tracer.end_user(user_id, "left")
+    # If they were in a room, tell the rest of the room.
+    left = await manager.leave_room(user_id)
+    if left:
+        code, remaining = left
+        await _broadcast_to_room(code, remaining, {
+            "type": "participant-left",
+            "data": {"userId": user_id, "code": code, "mediaHints": manager.media_hints(code)},
+        })
+    watchers = manager.contacts.watchers(user_id)
+    removed = await manager.unregister(user_id, ws)
+    # Mid-drain everyone is on their way out; skip the roster churn.
+    if removed and not manager.draining:
+        await manager.announce(user_id, watchers)
 
 
 # --- Message routing ------------------------------------------------------------------
@@ -306,12 +831,77 @@ def _public(u: UserRow) -> dict[str, Any]:
     ).model_dump()
 
 
+async def _announce_join(
+    user: Session, code: str, existing: set[str], restored: bool = False
+) -> None:
+    """`room-joined` to the user, `participant-joined` to everyone already there.
+
+    `restored` marks a re-attach after a restart. Peers that still have a
+    working connection to each other should keep it and not renegotiate.
+    """
+    members = await manager.users.load_many(existing)
+    hints = manager.media_hints(code)
+    joined: dict[str, Any] = {
+        "code": code,
+        "you": user.public,
+        "participants": [_public(m) for m in members],
+        "mediaHints": hints,
+    }
+    arrived: dict[str, Any] = {"participant": user.public, "code": code, "mediaHints": hints}
+    if restored:
+        joined["restored"] = arrived["restored"] = True
+    await manager.send_to(user.id, {"type": "room-joined", "data": joined})
+    await _broadcast_to_room(code, existing, {"type": "participant-joined", "data": arrived})
+
+
 async def _broadcast_to_room(code: str, member_ids: set[str], payload: dict[str, Any]) -> None:
+    text = json.dumps(payload)
     for uid in member_ids:
-        await manager.send_to(uid, payload)
+        await manager.send_text_to(uid, text, payload["type"])
+
+
+def _sdp_for(recipient: str, desc: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """An offer/answer body in the SDP form `recipient` asked for.
+
+    Senders that opted in may send `sdpc` (compact) instead of `sdp`. It is
+    expanded for recipients that didn't opt in. Returns None if `sdpc` is
+    from another table version or doesn't parse.
+    """
+    text = desc.get("sdpc")
+    if isinstance(text, str):
+        if desc.get("sdpv") != sdp_compact.VERSION:
+            return None
+        try:
+            sdp = sdp_compact.expand(text)
+        except ValueError:
+            return None
+        if recipient in manager.compact_sdp:
+            wire_stats.record_sdp(len(sdp), len(text))
+            return desc
+        return {k: v for k, v in desc.items() if k not in ("sdpc", "sdpv")} | {"sdp": sdp}
+    sdp = desc.get("sdp")
+    if recipient not in manager.compact_sdp or not isinstance(sdp, str):
+        return desc
+    text = sdp_compact.compact(sdp)
+    if text is None:
+        return desc
+    wire_stats.record_sdp(len(sdp), len(text))
+    return {k: v for k, v in desc.items() if k != "sdp"} | {"sdpc": text, "sdpv": sdp_compact.VERSION}
+
+
+def _add_contact_by_username(owner_id: str, username: str) -> Optional[UserRow]:
+    """Worker thread: find the contact and store the edge. Returns the user found.
+
+    Username only: matching emails too would let any client probe whether an
+    address is registered.
+    """
+    target = get_user_by_username(username)
+    if target is not None and target.id != owner_id:
+        add_contact(owner_id, target.id)
+    return target
 
 
-async def _route(sender: UserRow, msg: dict[str, Any]) -> None:
+async def _route(sender: Session, msg: dict[str, Any]) -> None:
     msg_type = msg.get("type")
     to = msg.get("to")
     data = msg.get("data") or {}
@@ -320,19 +910,40 @@ async def _route(sender: UserRow, msg: dict[str, Any]) -> None:
     if msg_type == "call-request":
         if not isinstance(to, str):
             return
+        cdr.record("call-request", sender.id, peer_id=to)
+        trace_id = tracer.start("call", sender.id, to)
         delivered = await manager.send_to(
             to,
             {
                 "type": "call-request",
                 "from": sender.id,
+                "traceId": trace_id,
                 "data": {"callerId": sender.id, "callerName": sender.username},
             },
         )
         if not delivered:
-            await manager.send_to(
-                sender.id,
-                {"type": "call-failed", "data": {"reason": "User is offline."}},
-            )
+            # Relaying across workers is not supported: with the shared table we
+            # can at least tell the caller why the ring didn't go through.
+            elsewhere = not manager.is_local(to) and manager.is_online(to)
+            tracer.end(sender.id, to, "other-worker" if elsewhere else "offline")
+            reason = "User is connected to another worker." if elsewhere else "User is offline."
+            await manager.send_to(sender.id, {"type": "call-failed", "data": {"reason": reason}})
+        return
+
+    # --- contacts ---
+    if msg_type == "add-contact":
+        name = data.get("username") if isinstance(data, dict) else None
+        target = (
+            await asyncio.to_thread(_add_contact_by_username, sender.id, name.strip())
+            if isinstance(name, str) else None
+        )
+        if target is None or target.id == sender.id:
+            reason = "You can't add yourself." if target else "No such user."
+            await manager.send_to(sender.id, {"type": "error", "data": {"message": reason}})
+            return
+        manager.contacts.add(sender.id, target.id)
+        await manager.send_to(sender.id, {"type": "contact-added", "data": _public(target)})
+        await manager.send_roster(sender.id)
         return
 
     # --- room control ---
@@ -345,17 +956,23 @@ async def _route(sender: UserRow, msg: dict[str, Any]) -> None:
                 sender.id, {"type": "room-error", "data": {"reason": str(e)}}
             )
             return
+        if manager.recorder is not None:
+            manager.recorder.room_created(sender.id, code)
         # Auto-join the creator so the next message can already be signaling.
         existing = await manager.join_room(code, sender.id)
-        members = get_users_by_ids(existing)
+        for member_id in existing:
+            tracer.start("room", sender.id, member_id, code)
+        members = await manager.users.load_many(existing)
+        hints = manager.media_hints(code)
         await manager.send_to(
             sender.id,
             {
                 "type": "room-joined",
                 "data": {
                     "code": code,
-                    "you": _public(sender),
+                    "you": sender.public,
                     "participants": [_public(m) for m in members],
+                    "mediaHints": hints,
                 },
             },
         )
@@ -363,7 +980,7 @@ async def _route(sender: UserRow, msg: dict[str, Any]) -> None:
         # but matters if create was called with an already-known code).
         await _broadcast_to_room(code, existing, {
             "type": "participant-joined",
-            "data": {"participant": _public(sender), "code": code},
+            "data": {"participant": sender.public, "code": code, "mediaHints": hints},
         })
         return
 
@@ -375,38 +992,44 @@ async def _route(sender: UserRow, msg: dict[str, Any]) -> None:
                 sender.id, {"type": "room-error", "data": {"reason": "Missing room code."}}
             )
             return
-        existing = await manager.join_room(code, sender.id)
-        members = get_users_by_ids(existing)
-        await manager.send_to(
-            sender.id,
-            {
-                "type": "room-joined",
-                "data": {
-                    "code": code,
-                    "you": _public(sender),
-                    "participants": [_public(m) for m in members],
-                },
-            },
-        )
-        await _broadcast_to_room(code, existing, {
-            "type": "participant-joined",
-            "data": {"participant": _public(sender), "code": code},
-        })
+        try:
+            existing = await manager.join_room(code, sender.id)
+        except ValueError as e:
+            await manager.send_to(
+                sender.id, {"type": "room-error", "data": {"reason": str(e)}}
+            )
+            return
+        for member_id in existing:
+            tracer.start("room", sender.id, member_id, code)
+        await _announce_join(sender, code, existing)
         return
 
     if msg_type == "room-leave":
         left = await manager.leave_room(sender.id)
         if left:
+            tracer.end_user(sender.id, "left")
             code, remaining = left
             await manager.send_to(
                 sender.id, {"type": "room-left", "data": {"code": code}}
             )
             await _broadcast_to_room(code, remaining, {
                 "type": "participant-left",
-                "data": {"userId": sender.id, "code": code},
+                "data": {"userId": sender.id, "code": code, "mediaHints": manager.media_hints(code)},
             })
         return
 
+    # --- call-quality telemetry ---
+    if msg_type == "stats-report":
+        room = manager.room_of(sender.id)
+        if telemetry.ingest(sender.id, room, data) and room is not None:
+            hints = manager.changed_media_hints(room)
+            if hints is not None:
+                await _broadcast_to_room(room, set(manager.members(room)), {
+                    "type": "media-hints",
+                    "data": {"code": room, **hints},
+                })
+        return
+
     # --- per-peer signaling (works for both 1:1 calls and rooms) ---
     if msg_type in {"call-response", "offer", "answer", "ice-candidate", "hang-up"}:
         if not isinstance(to, str):
@@ -417,11 +1040,31 @@ async def _route(sender: UserRow, msg: dict[str, Any]) -> None:
             members = set(manager.members(sender_room))
             if to not in members:
                 return
-        await manager.send_to(to, {
-            "type": msg_type,
-            "from": sender.id,
-            "data": msg.get("data"),
-        })
+        relay_started = time.perf_counter()
+        trace_id = tracer.mark(sender.id, to, msg_type)
+        if msg_type == "call-response":
+            accepted = isinstance(data, dict) and bool(data.get("accepted"))
+            cdr.record("call-response", sender.id, peer_id=to, accepted=accepted)
+            if not accepted:
+                tracer.end(sender.id, to, "declined")
+        elif msg_type == "hang-up":
+            cdr.record("hang-up", sender.id, peer_id=to)
+            tracer.end(sender.id, to, "hung-up")
+        payload = msg.get("data")
+        if msg_type in ("offer", "answer") and isinstance(payload, dict):
+            payload = _sdp_for(to, payload)
+            if payload is None:
+                await manager.send_to(
+                    sender.id, {"type": "error", "data": {"message": "invalid compact SDP"}}
+                )
+                return
+        out: dict[str, Any] = {"type": msg_type, "from": sender.id, "data": payload}
+        if trace_id is not None:
+            out["traceId"] = trace_id
+        await manager.send_to(to, out)
+        if trace_id is not None:
+            tracer.relayed(time.perf_counter() - relay_started)
         return
 
-    # Unknown types are silently dropped.
+    # `pong` (and anything else unknown) is silently dropped; the frame
+    # arriving at all is what refreshed the heartbeat.
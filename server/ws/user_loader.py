@@ -0,0 +1,96 @@
+"""Coalesce concurrent user lookups into one query per loop tick.
+
+In a reconnect storm, many coroutines look up overlapping user ids within
+the same millisecond. `_authenticate` does this for each socket, and
+`broadcast_roster` and room joins do it for each roster. Each of those used to
+be its own SELECT.
+
+`UserLoader` works like a dataloader. Ids requested during one event-loop tick
+are queued. A `call_soon` callback then fetches them all with one
+`get_users_by_ids` (`WHERE id IN (...)`), in chunks of `max_batch` so we stay
+under SQLite's bound-variable limit. Every waiter gets its row from that
+result. An id that is already queued joins the pending future instead of being
+queued again (single-flight).
+
+Nothing is cached past the tick: the next request for the same id queries
+again, so renames and deletions show up at once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Iterable, Optional
+
+from .. import db
+from ..db import UserRow
+
+
+log = logging.getLogger("signaling.users")
+
+
+class UserLoader:
+    def __init__(self, max_batch: int = 500) -> None:
+        self.max_batch = max_batch
+        self._pending: dict[str, asyncio.Future[Optional[UserRow]]] = {}
+        self._scheduled = False
+        self._calls = 0      # load / load_many calls; before this, one query each
+        self._keys = 0       # ids asked for across all calls
+        self._shared = 0     # ids that joined a lookup another caller had queued
+        self._queries = 0    # SELECTs actually issued
+
+    async def load(self, user_id: str) -> Optional[UserRow]:
+        self._calls += 1
+        return await asyncio.shield(self._future(user_id))
+
+    async def load_many(self, ids: Iterable[str]) -> list[UserRow]:
+        """Rows for `ids` that exist, in the order asked, without duplicates."""
+        self._calls += 1
+        futures = [self._future(user_id) for user_id in dict.fromkeys(ids)]
+        if not futures:
+            return []
+        rows = await asyncio.shield(asyncio.gather(*futures))
+        return [row for row in rows if row is not None]
+
+    def _future(self, user_id: str) -> asyncio.Future[Optional[UserRow]]:
+        self._keys += 1
+        future = self._pending.get(user_id)
+        if future is not None:
+            self._shared += 1
+            return future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[user_id] = future
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        self._scheduled = False
+        batch, self._pending = self._pending, {}
+        ids = list(batch)
+        found: dict[str, UserRow] = {}
+        try:
+            for start in range(0, len(ids), self.max_batch):
+                self._queries += 1
+                for row in db.get_users_by_ids(ids[start:start + self.max_batch]):
+                    found[row.id] = row
+        except Exception as exc:  # noqa: BLE001
+            log.warning("user lookup for %d ids failed: %s", len(ids), exc)
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for user_id, future in batch.items():
+            if not future.done():
+                future.set_result(found.get(user_id))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self._calls,
+            "ids_requested": self._keys,
+            "ids_shared": self._shared,
+            "queries": self._queries,
+            "queries_saved": self._calls - self._queries,
+        }
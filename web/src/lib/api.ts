@@ -1,6 +1,8 @@
 // Thin fetch wrapper that injects the JWT auth header and points at VITE_API_URL.
 // In dev, Vite proxies /api → backend, so the default empty base works.
 
+import type { IceConfig } from './ice';
+
 const BASE = (import.meta.env.VITE_API_URL as string | undefined) ?? '';
 
 export interface User {
@@ -63,4 +65,6 @@ export const api = {
 
   onlineUsers: (token: string) =>
     request<User[]>('/api/users/online', { token }),
+
+  iceServers: (token: string) => request<IceConfig>('/api/ice-servers', { token }),
 };
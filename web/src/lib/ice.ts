@@ -0,0 +1,37 @@
+// ICE server list shared by 1:1 calls and rooms.
+//
+// The server sends STUN/TURN config (with short-lived TURN credentials) in
+// `websocket-connected` and from GET /api/ice-servers. Until that arrives, or
+// once it has expired, fall back to the build-time VITE_TURN_* values.
+
+export interface IceConfig {
+  iceServers: RTCIceServer[];
+  /** Seconds until the TURN credentials expire; null when there's no TURN. */
+  ttl: number | null;
+}
+
+let current: { servers: RTCIceServer[]; expiresAt: number } | null = null;
+
+export function setIceConfig(config: IceConfig | undefined): void {
+  if (!config?.iceServers?.length) return;
+  const expiresAt = config.ttl === null ? Infinity : Date.now() + config.ttl * 1000;
+  current = { servers: config.iceServers, expiresAt };
+}
+
+function buildTimeServers(): RTCIceServer[] {
+  const env = import.meta.env as Record<string, string | undefined>;
+  const servers: RTCIceServer[] = [{ urls: 'stun:stun.l.google.com:19302' }];
+  if (env.VITE_TURN_URL) {
+    servers.push({
+      urls: env.VITE_TURN_URL,
+      username: env.VITE_TURN_USERNAME,
+      credential: env.VITE_TURN_CREDENTIAL,
+    });
+  }
+  return servers;
+}
+
+export function iceServers(): RTCIceServer[] {
+  if (current && current.expiresAt > Date.now()) return current.servers;
+  return buildTimeServers();
+}
@@ -9,24 +9,47 @@
 // rule means we never end up with two offers crossing in flight.
 
 import type { User } from './api';
+import { iceServers } from './ice';
 import type {
+  MediaHints,
   ParticipantJoinedData,
   ParticipantLeftData,
   RoomJoinedData,
   SignalingClient,
+  StatsReport,
 } from './signaling';
 
-function iceServers(): RTCIceServer[] {
-  const env = import.meta.env as Record<string, string | undefined>;
-  const servers: RTCIceServer[] = [{ urls: 'stun:stun.l.google.com:19302' }];
-  if (env.VITE_TURN_URL) {
-    servers.push({
-      urls: env.VITE_TURN_URL,
-      username: env.VITE_TURN_USERNAME,
-      credential: env.VITE_TURN_CREDENTIAL,
-    });
-  }
-  return servers;
+/** How often a room member sends its `stats-report` to the server. */
+const STATS_INTERVAL_MS = 10_000;
+
+/**
+ * Rewrite the Opus fmtp/ptime lines of an SDP to match the server's hints.
+ * What we put in our own description tells the remote encoder how to send.
+ */
+export function applyOpusHints(sdp: string, hints: MediaHints): string {
+  const opus = /^a=rtpmap:(\d+) opus\/48000/im.exec(sdp);
+  if (!opus) return sdp;
+  const pt = opus[1];
+  const wanted: Record<string, string> = {
+    useinbandfec: hints.fec ? '1' : '0',
+    usedtx: hints.dtx ? '1' : '0',
+    maxaveragebitrate: String(hints.maxBitrateKbps * 1000),
+  };
+  const lines = sdp.split('\r\n').map((line) => {
+    if (!line.startsWith(`a=fmtp:${pt} `)) return line;
+    const params = new Map(
+      line.slice(`a=fmtp:${pt} `.length).split(';').map((kv) => {
+        const [k, v = ''] = kv.trim().split('=');
+        return [k, v] as [string, string];
+      }),
+    );
+    for (const [k, v] of Object.entries(wanted)) params.set(k, v);
+    return `a=fmtp:${pt} ` + Array.from(params, ([k, v]) => `${k}=${v}`).join(';');
+  });
+  const withoutPtime = lines.filter((line) => !line.startsWith('a=ptime:'));
+  const at = withoutPtime.findIndex((line) => line.startsWith(`a=fmtp:${pt} `));
+  if (at >= 0) withoutPtime.splice(at + 1, 0, `a=ptime:${hints.ptimeMs}`);
+  return withoutPtime.join('\r\n');
 }
 
 export interface Participant {
@@ -62,6 +85,13 @@ export class RoomManager {
   /** One RTCPeerConnection per remote peer, keyed by their userId. */
   private peers = new Map<string, PeerLink>();
 
+  /** Latest `mediaHints` from the server; applied to every outbound sender. */
+  private hints: MediaHints | null = null;
+
+  private statsTimer: ReturnType<typeof setInterval> | null = null;
+  /** Cumulative counters from the previous stats sample, for deltas. */
+  private lastStats = { at: 0, bytesSent: 0, packetsLost: 0, packetsReceived: 0 };
+
   constructor(signaling: SignalingClient, events: RoomEvents = {}) {
     this.signaling = signaling;
     this.events = events;
@@ -137,6 +167,9 @@ export class RoomManager {
     next.onRoomError = (reason: string) => this.events.onError?.(reason);
     next.onParticipantJoined = (d: ParticipantJoinedData) => this.handleParticipantJoined(d);
     next.onParticipantLeft = (d: ParticipantLeftData) => this.handleParticipantLeft(d);
+    next.onMediaHints = (h: MediaHints & { code: string }) => {
+      if (h.code === this.code) this.applyHints(h);
+    };
     next.onOffer = (sdp: RTCSessionDescriptionInit, from: string) => this.handleOffer(sdp, from);
     next.onAnswer = (sdp: RTCSessionDescriptionInit, from: string) => this.handleAnswer(sdp, from);
     next.onIceCandidate = (cand: RTCIceCandidateInit, from: string) => this.handleIce(cand, from);
@@ -190,9 +223,15 @@ export class RoomManager {
   private handleRoomJoined(d: RoomJoinedData) {
     this.code = d.code;
     this.localUser = d.you;
+    if (d.mediaHints) this.hints = d.mediaHints;
     // For every existing participant, decide who initiates and (if it's us)
     // create the offer.
     for (const peer of d.participants) {
+      // After a server restart the media usually never stopped: keep it.
+      if (d.restored) {
+        if (this.hasLiveLink(peer.id)) continue;
+        this.removePeer(peer.id);
+      }
       this.addPeer(peer);
       if (this.shouldInitiateTo(peer.id)) {
         void this.sendOffer(peer.id);
@@ -200,6 +239,7 @@ export class RoomManager {
     }
     this.events.onJoined?.(d.code);
     this.emitChange();
+    this.startStatsReports();
   }
 
   private handleRoomLeft(code: string) {
@@ -211,6 +251,11 @@ export class RoomManager {
     // We're already in the room; a new peer just arrived. By convention the
     // newcomer is the side that compares "smaller", so they'll send us an
     // offer. We just need to register them and wait.
+    if (d.mediaHints) this.applyHints(d.mediaHints);
+    if (d.restored) {
+      if (this.hasLiveLink(d.participant.id)) return;
+      this.removePeer(d.participant.id);
+    }
     this.addPeer(d.participant);
     if (this.shouldInitiateTo(d.participant.id)) {
       void this.sendOffer(d.participant.id);
@@ -219,9 +264,41 @@ export class RoomManager {
   }
 
   private handleParticipantLeft(d: ParticipantLeftData) {
+    if (d.mediaHints) this.applyHints(d.mediaHints);
     this.removePeer(d.userId);
   }
 
+  // -- media hints ---------------------------------------------------------
+
+  /**
+   * Cap every outbound audio encoder at the hinted bitrate right away;
+   * DTX/FEC/ptime ride along in the SDP of the next offer or answer.
+   */
+  private applyHints(hints: MediaHints) {
+    this.hints = hints;
+    for (const link of this.peers.values()) void this.capBitrate(link.pc);
+  }
+
+  private async capBitrate(pc: RTCPeerConnection) {
+    if (!this.hints) return;
+    for (const sender of pc.getSenders()) {
+      if (sender.track?.kind !== 'audio') continue;
+      const params = sender.getParameters();
+      if (!params.encodings?.length) continue;
+      params.encodings[0].maxBitrate = this.hints.maxBitrateKbps * 1000;
+      try {
+        await sender.setParameters(params);
+      } catch (err) {
+        console.warn('[room] setParameters(maxBitrate) failed', err);
+      }
+    }
+  }
+
+  private withHints(desc: RTCSessionDescriptionInit): RTCSessionDescriptionInit {
+    if (!this.hints || !desc.sdp) return desc;
+    return { type: desc.type, sdp: applyOpusHints(desc.sdp, this.hints) };
+  }
+
   // -- peer connections ----------------------------------------------------
 
   private shouldInitiateTo(peerId: string): boolean {
@@ -230,6 +307,11 @@ export class RoomManager {
     return this.localUser.id > peerId;
   }
 
+  private hasLiveLink(peerId: string): boolean {
+    const state = this.peers.get(peerId)?.pc.connectionState;
+    return state !== undefined && state !== 'failed' && state !== 'closed';
+  }
+
   private addPeer(user: User): PeerLink {
     const existing = this.peers.get(user.id);
     if (existing) return existing;
@@ -300,11 +382,14 @@ export class RoomManager {
     if (!link) return;
     console.info('[room] sendOffer ->', peerId);
     try {
-      const offer = await link.pc.createOffer({
-        offerToReceiveAudio: true,
-        offerToReceiveVideo: false,
-      });
+      const offer = this.withHints(
+        await link.pc.createOffer({
+          offerToReceiveAudio: true,
+          offerToReceiveVideo: false,
+        }),
+      );
       await link.pc.setLocalDescription(offer);
+      void this.capBitrate(link.pc);
       this.signaling.offer(peerId, offer);
       console.info('[room] offer sent', { peerId });
     } catch (err) {
@@ -331,8 +416,9 @@ export class RoomManager {
     }
     try {
       await link.pc.setRemoteDescription(sdp);
-      const answer = await link.pc.createAnswer();
+      const answer = this.withHints(await link.pc.createAnswer());
       await link.pc.setLocalDescription(answer);
+      void this.capBitrate(link.pc);
       this.signaling.answer(from, answer);
       console.info('[room] answer sent', { from });
     } catch (err) {
@@ -375,14 +461,67 @@ export class RoomManager {
     this.emitChange();
   }
 
+  // -- telemetry -----------------------------------------------------------
+
+  private startStatsReports() {
+    if (this.statsTimer) return;
+    this.lastStats = { at: performance.now(), bytesSent: 0, packetsLost: 0, packetsReceived: 0 };
+    this.statsTimer = setInterval(() => void this.reportStats(), STATS_INTERVAL_MS);
+  }
+
+  /** Fold every peer's getStats into one summary of this member's call quality. */
+  private async reportStats() {
+    let rttSum = 0, rttN = 0, jitterSum = 0, jitterN = 0;
+    let bytesSent = 0, packetsLost = 0, packetsReceived = 0;
+    for (const link of this.peers.values()) {
+      const report = await link.pc.getStats();
+      report.forEach((s) => {
+        if (s.type === 'candidate-pair' && s.nominated && s.currentRoundTripTime !== undefined) {
+          rttSum += s.currentRoundTripTime * 1000;
+          rttN++;
+        } else if (s.type === 'inbound-rtp' && s.kind === 'audio') {
+          if (s.jitter !== undefined) {
+            jitterSum += s.jitter * 1000;
+            jitterN++;
+          }
+          packetsLost += s.packetsLost ?? 0;
+          packetsReceived += s.packetsReceived ?? 0;
+        } else if (s.type === 'outbound-rtp' && s.kind === 'audio') {
+          bytesSent += s.bytesSent ?? 0;
+        }
+      });
+    }
+    const now = performance.now();
+    const prev = this.lastStats;
+    this.lastStats = { at: now, bytesSent, packetsLost, packetsReceived };
+    if (this.peers.size === 0) return;
+
+    const out: StatsReport = {};
+    if (rttN) out.rttMs = rttSum / rttN;
+    if (jitterN) out.jitterMs = jitterSum / jitterN;
+    // Counters reset when peers come and go; only trust monotonic deltas.
+    const lost = packetsLost - prev.packetsLost;
+    const got = packetsReceived - prev.packetsReceived;
+    if (lost >= 0 && got >= 0 && lost + got > 0) out.packetLossPct = (100 * lost) / (lost + got);
+    const sent = bytesSent - prev.bytesSent;
+    const seconds = (now - prev.at) / 1000;
+    if (sent >= 0 && seconds > 0) out.bitrateKbps = (sent * 8) / 1000 / seconds;
+    this.signaling.statsReport(out);
+  }
+
   // -- shutdown ------------------------------------------------------------
 
   private shutdown() {
+    if (this.statsTimer) {
+      clearInterval(this.statsTimer);
+      this.statsTimer = null;
+    }
     for (const peerId of Array.from(this.peers.keys())) this.removePeer(peerId);
     this.localStream?.getTracks().forEach((t) => t.stop());
     this.localStream = null;
     this.code = null;
     this.localUser = null;
+    this.hints = null;
     this.emitChange();
   }
 
@@ -0,0 +1,88 @@
+// Compact SDP codec, the client half of server/ws/sdp_compact.py.
+//
+// Known line prefixes become `~` + one table index, and lines end in `\n`
+// rather than `\r\n`. The TABLE must match the server's entry for entry
+// (server/tests/test_compression.py checks it). Only append to it.
+
+export const SDP_COMPACT_VERSION = 1;
+
+const ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ';
+
+const TABLE: readonly string[] = [
+  'v=0',
+  'o=- ',
+  's=-',
+  't=0 0',
+  'a=group:BUNDLE ',
+  'a=extmap-allow-mixed',
+  'a=msid-semantic: WMS',
+  'm=audio 9 UDP/TLS/RTP/SAVPF ',
+  'c=IN IP4 0.0.0.0',
+  'a=rtcp:9 IN IP4 0.0.0.0',
+  'a=ice-ufrag:',
+  'a=ice-pwd:',
+  'a=ice-options:trickle',
+  'a=fingerprint:sha-256 ',
+  'a=setup:actpass',
+  'a=setup:active',
+  'a=setup:passive',
+  'a=mid:',
+  'a=extmap:1 urn:ietf:params:rtp-hdrext:ssrc-audio-level',
+  'a=extmap:2 http://www.webrtc.org/experiments/rtp-hdrext/abs-send-time',
+  'a=extmap:3 http://www.ietf.org/id/draft-holmer-rmcat-transport-wide-cc-extensions-01',
+  'a=extmap:4 urn:ietf:params:rtp-hdrext:sdes:mid',
+  'a=extmap:',
+  'a=sendrecv',
+  'a=sendonly',
+  'a=recvonly',
+  'a=inactive',
+  'a=msid:',
+  'a=rtcp-mux',
+  'a=rtcp-rsize',
+  'a=rtpmap:111 opus/48000/2',
+  'a=rtcp-fb:111 transport-cc',
+  'a=fmtp:111 minptime=10;useinbandfec=1',
+  'a=rtpmap:63 red/48000/2',
+  'a=fmtp:63 111/111',
+  'a=rtpmap:9 G722/8000',
+  'a=rtpmap:0 PCMU/8000',
+  'a=rtpmap:8 PCMA/8000',
+  'a=rtpmap:13 CN/8000',
+  'a=rtpmap:110 telephone-event/48000',
+  'a=rtpmap:126 telephone-event/8000',
+  'a=rtpmap:',
+  'a=rtcp-fb:',
+  'a=fmtp:',
+  'a=ssrc:',
+  'a=ssrc-group:FID ',
+  'a=candidate:',
+  'a=end-of-candidates',
+];
+
+const BY_LENGTH = TABLE.map((_, i) => i).sort((a, b) => TABLE[b].length - TABLE[a].length);
+
+/** Compact form of `sdp`, or null if it wouldn't round-trip exactly. */
+export function compactSdp(sdp: string): string | null {
+  if (sdp.replace(/\r\n/g, '').includes('\n')) return null;
+  const out: string[] = [];
+  for (let line of sdp.split('\r\n')) {
+    if (line.startsWith('~')) return null;
+    const i = BY_LENGTH.find((j) => line.startsWith(TABLE[j]));
+    if (i !== undefined) line = '~' + ALPHABET[i] + line.slice(TABLE[i].length);
+    out.push(line);
+  }
+  return out.join('\n');
+}
+
+/** Inverse of compactSdp. Throws on an unknown token. */
+export function expandSdp(text: string): string {
+  return text
+    .split('\n')
+    .map((line) => {
+      if (!line.startsWith('~')) return line;
+      const i = line.length > 1 ? ALPHABET.indexOf(line[1]) : -1;
+      if (i < 0 || i >= TABLE.length) throw new Error(`unknown SDP token ${line.slice(0, 2)}`);
+      return TABLE[i] + line.slice(2);
+    })
+    .join('\r\n');
+}
@@ -1,11 +1,15 @@
 // Typed WebSocket client speaking the project's signaling protocol.
-// Connects to /ws?token=<jwt>. Auth happens at WS handshake.
+// Connects to /ws?token=<jwt>&sdp=compact. Auth happens at WS handshake.
 
-import type { User } from './api';
+import { api, type User } from './api';
+import { setIceConfig, type IceConfig } from './ice';
+import { SDP_COMPACT_VERSION, compactSdp, expandSdp } from './sdpCompact';
 
 type MessageType =
   | 'websocket-connected'
   | 'contacts-update'
+  | 'add-contact'
+  | 'contact-added'
   | 'call-request'
   | 'call-response'
   | 'call-failed'
@@ -21,6 +25,11 @@ type MessageType =
   | 'room-error'
   | 'participant-joined'
   | 'participant-left'
+  | 'server-draining'
+  | 'ping'
+  | 'pong'
+  | 'stats-report'
+  | 'media-hints'
   | 'error';
 
 export interface SignalMessage<T = unknown> {
@@ -40,20 +49,49 @@ export interface CallResponseData {
   accepted: boolean;
 }
 
+/** Server-recommended Opus settings for the room's current size and network. */
+export interface MediaHints {
+  participants: number;
+  maxBitrateKbps: number;
+  dtx: boolean;
+  fec: boolean;
+  ptimeMs: number;
+  reasons: string[];
+}
+
 export interface RoomJoinedData {
   code: string;
   you: User;
   participants: User[];
+  mediaHints?: MediaHints;
+  /** Re-attached after a server restart; keep any peer links that still work. */
+  restored?: boolean;
 }
 
 export interface ParticipantJoinedData {
   code: string;
   participant: User;
+  mediaHints?: MediaHints;
+  restored?: boolean;
 }
 
 export interface ParticipantLeftData {
   code: string;
   userId: string;
+  mediaHints?: MediaHints;
+}
+
+/** Periodic getStats summary; lets the server spot unhealthy rooms. */
+export interface StatsReport {
+  rttMs?: number;
+  jitterMs?: number;
+  packetLossPct?: number;
+  bitrateKbps?: number;
+}
+
+export interface ServerDrainingData {
+  retryAfterMs: number;
+  inRoom: boolean;
 }
 
 type Handler<T = unknown> = (msg: SignalMessage<T>) => void;
@@ -62,6 +100,7 @@ export interface SignalingHandlers {
   // generic
   onConnected?: Handler;
   onContactsUpdate?: (users: User[]) => void;
+  onContactAdded?: (user: User) => void;
   onError?: (err: string) => void;
   onClose?: () => void;
 
@@ -76,6 +115,7 @@ export interface SignalingHandlers {
   onRoomError?: (reason: string) => void;
   onParticipantJoined?: (data: ParticipantJoinedData) => void;
   onParticipantLeft?: (data: ParticipantLeftData) => void;
+  onMediaHints?: (data: MediaHints & { code: string }) => void;
 
   // per-peer signaling (works for both 1:1 and rooms)
   onOffer?: (sdp: RTCSessionDescriptionInit, from: string) => void;
@@ -84,26 +124,42 @@ export interface SignalingHandlers {
   onHangUp?: (from: string) => void;
 }
 
+// Offer/answer body as sent over /ws: plain, or compact (see sdpCompact.ts).
+type WireDescription = RTCSessionDescriptionInit & { sdpc?: string; sdpv?: number };
+
+function incomingSdp(data: WireDescription): RTCSessionDescriptionInit {
+  if (typeof data?.sdpc !== 'string') return data;
+  return { type: data.type, sdp: expandSdp(data.sdpc) };
+}
+
 export class SignalingClient {
   private ws: WebSocket | null = null;
   private handlers: SignalingHandlers;
   private url: string;
   private reconnectAttempts = 0;
   private intentionallyClosed = false;
+  // Set by `server-draining`: the server is restarting and has told us when
+  // to come back, so reconnects spread out instead of stampeding.
+  private drainRetryMs: number | null = null;
   // Queue outbound messages while the socket is mid-connect so callers don't
   // have to await `onConnected` themselves.
   private outbox: string[] = [];
+  private token: string;
+  private iceRefresh: ReturnType<typeof setTimeout> | null = null;
+  // The server accepted `sdp=compact`: offers/answers travel as `sdpc`.
+  private compactSdp = false;
 
   constructor(token: string, handlers: SignalingHandlers) {
     this.handlers = handlers;
+    this.token = token;
 
     const envWs = (import.meta.env.VITE_WS_URL as string | undefined) ?? '';
     if (envWs) {
-      this.url = `${envWs.replace(/\/$/, '')}/ws?token=${encodeURIComponent(token)}`;
+      this.url = `${envWs.replace(/\/$/, '')}/ws?token=${encodeURIComponent(token)}&sdp=compact`;
     } else {
       // Use page protocol + host (Vite proxies /ws → backend in dev).
       const proto = location.protocol === 'https:' ? 'wss:' : 'ws:';
-      this.url = `${proto}//${location.host}/ws?token=${encodeURIComponent(token)}`;
+      this.url = `${proto}//${location.host}/ws?token=${encodeURIComponent(token)}&sdp=compact`;
     }
   }
 
@@ -117,12 +173,21 @@ export class SignalingClient {
       this.outbox = [];
     };
     this.ws.onmessage = (ev) => this.handle(ev);
-    this.ws.onclose = () => {
+    this.ws.onclose = (ev) => {
       this.handlers.onClose?.();
-      if (!this.intentionallyClosed && this.reconnectAttempts < 5) {
-        this.reconnectAttempts++;
-        const delay = Math.min(1000 * 2 ** this.reconnectAttempts, 10_000);
+      if (this.intentionallyClosed) return;
+      // 1013: the server refused us under load and said when to come back.
+      const busy = ev.code === 1013 ? /retry-after-ms=(\d+)/.exec(ev.reason) : null;
+      if (busy) {
+        setTimeout(() => this.connect(), Number(busy[1]));
+      } else if (this.drainRetryMs !== null) {
+        const delay = this.drainRetryMs;
+        this.drainRetryMs = null;
         setTimeout(() => this.connect(), delay);
+      } else if (this.reconnectAttempts < 5) {
+        this.reconnectAttempts++;
+        const base = Math.min(1000 * 2 ** this.reconnectAttempts, 10_000);
+        setTimeout(() => this.connect(), base / 2 + Math.random() * (base / 2));
       }
     };
     this.ws.onerror = () => {
@@ -132,6 +197,8 @@ export class SignalingClient {
 
   close() {
     this.intentionallyClosed = true;
+    if (this.iceRefresh) clearTimeout(this.iceRefresh);
+    this.iceRefresh = null;
     this.ws?.close();
     this.ws = null;
   }
@@ -146,11 +213,16 @@ export class SignalingClient {
     }
     switch (msg.type) {
       case 'websocket-connected':
+        this.compactSdp = (msg.data as { sdpCompact?: number })?.sdpCompact === SDP_COMPACT_VERSION;
+        this.useIceConfig((msg.data as { ice?: IceConfig })?.ice);
         this.handlers.onConnected?.(msg);
         break;
       case 'contacts-update':
         this.handlers.onContactsUpdate?.((msg.data as User[]) ?? []);
         break;
+      case 'contact-added':
+        this.handlers.onContactAdded?.(msg.data as User);
+        break;
       case 'call-request':
         this.handlers.onIncomingCall?.(msg.data as IncomingCall, msg.from ?? '');
         break;
@@ -175,11 +247,14 @@ export class SignalingClient {
       case 'participant-left':
         this.handlers.onParticipantLeft?.(msg.data as ParticipantLeftData);
         break;
+      case 'media-hints':
+        this.handlers.onMediaHints?.(msg.data as MediaHints & { code: string });
+        break;
       case 'offer':
-        this.handlers.onOffer?.(msg.data as RTCSessionDescriptionInit, msg.from ?? '');
+        this.handlers.onOffer?.(incomingSdp(msg.data as WireDescription), msg.from ?? '');
         break;
       case 'answer':
-        this.handlers.onAnswer?.(msg.data as RTCSessionDescriptionInit, msg.from ?? '');
+        this.handlers.onAnswer?.(incomingSdp(msg.data as WireDescription), msg.from ?? '');
         break;
       case 'ice-candidate':
         this.handlers.onIceCandidate?.(msg.data as RTCIceCandidateInit, msg.from ?? '');
@@ -187,12 +262,36 @@ export class SignalingClient {
       case 'hang-up':
         this.handlers.onHangUp?.(msg.from ?? '');
         break;
+      case 'ping':
+        // Server keepalive: any frame proves we're alive, but answer explicitly.
+        this.send('pong', undefined, msg.data);
+        break;
+      case 'server-draining':
+        this.drainRetryMs = (msg.data as ServerDrainingData)?.retryAfterMs ?? null;
+        break;
       case 'error':
         this.handlers.onError?.((msg.data as { message: string })?.message ?? 'unknown error');
         break;
     }
   }
 
+  /** Adopt server ICE config and re-fetch it before the TURN credentials lapse. */
+  private useIceConfig(config: IceConfig | undefined) {
+    if (!config) return;
+    setIceConfig(config);
+    if (this.iceRefresh) clearTimeout(this.iceRefresh);
+    this.iceRefresh = null;
+    if (config.ttl === null || this.intentionallyClosed) return;
+    this.iceRefresh = setTimeout(() => {
+      api.iceServers(this.token).then(
+        (next) => this.useIceConfig(next),
+        () => {
+          /* keep the old config; the next reconnect brings a fresh one */
+        },
+      );
+    }, (config.ttl * 1000 * 3) / 4);
+  }
+
   private send(type: MessageType, to: string | undefined, data: unknown) {
     const payload = JSON.stringify({ type, to, data, timestamp: Date.now() });
     if (this.ws?.readyState === WebSocket.OPEN) {
@@ -202,6 +301,11 @@ export class SignalingClient {
     }
   }
 
+  // Contacts ---------------------------------------------------------------
+  addContact(username: string) {
+    this.send('add-contact', undefined, { username });
+  }
+
   // 1:1 call ---------------------------------------------------------------
   callRequest(to: string) {
     this.send('call-request', to, {});
@@ -223,10 +327,16 @@ export class SignalingClient {
 
   // Per-peer signaling -----------------------------------------------------
   offer(to: string, sdp: RTCSessionDescriptionInit) {
-    this.send('offer', to, sdp);
+    this.send('offer', to, this.outgoingSdp(sdp));
   }
   answer(to: string, sdp: RTCSessionDescriptionInit) {
-    this.send('answer', to, sdp);
+    this.send('answer', to, this.outgoingSdp(sdp));
+  }
+
+  private outgoingSdp(desc: RTCSessionDescriptionInit): WireDescription {
+    const sdpc = this.compactSdp && desc.sdp ? compactSdp(desc.sdp) : null;
+    if (sdpc === null) return desc;
+    return { type: desc.type, sdpc, sdpv: SDP_COMPACT_VERSION };
   }
   iceCandidate(to: string, candidate: RTCIceCandidateInit) {
     this.send('ice-candidate', to, candidate);
@@ -234,4 +344,10 @@ export class SignalingClient {
   hangUp(to: string) {
     this.send('hang-up', to, {});
   }
+
+  // Telemetry --------------------------------------------------------------
+  statsReport(report: StatsReport) {
+    // Only worth sending on a live socket; stale stats shouldn't queue up.
+    if (this.ws?.readyState === WebSocket.OPEN) this.send('stats-report', undefined, report);
+  }
 }
@@ -1,21 +1,9 @@
 // Thin wrapper around RTCPeerConnection for audio-only calls.
 // Pairs with SignalingClient to exchange SDP and ICE.
 
+import { iceServers } from './ice';
 import type { SignalingClient } from './signaling';
 
-function iceServers(): RTCIceServer[] {
-  const env = import.meta.env as Record<string, string | undefined>;
-  const servers: RTCIceServer[] = [{ urls: 'stun:stun.l.google.com:19302' }];
-  if (env.VITE_TURN_URL) {
-    servers.push({
-      urls: env.VITE_TURN_URL,
-      username: env.VITE_TURN_USERNAME,
-      credential: env.VITE_TURN_CREDENTIAL,
-    });
-  }
-  return servers;
-}
-
 export interface CallEvents {
   onRemoteStream?: (stream: MediaStream) => void;
   onConnectionState?: (state: RTCPeerConnectionState) => void;
@@ -21,6 +21,8 @@ export default function Call() {
   const [joinCode, setJoinCode] = useState('');
   const [online, setOnline] = useState<User[]>([]);
   const [search, setSearch] = useState('');
+  const [newContact, setNewContact] = useState('');
+  const [notice, setNotice] = useState<string | null>(null);
   const [muted, setMuted] = useState(false);
   const [connectionState, setConnectionState] = useState<RTCPeerConnectionState>('new');
   const [error, setError] = useState<string | null>(null);
@@ -101,6 +103,7 @@ export default function Call() {
     if (!token) return;
     const s = new SignalingClient(token, {
       onContactsUpdate: setOnline,
+      onContactAdded: (u) => setNotice(`Added @${u.username} to your contacts.`),
       onIncomingCall: (call: IncomingCall, from) => {
         setPhase({ kind: 'incoming', from, name: call.callerName });
         if (navigator.vibrate) navigator.vibrate([400, 200, 400]);
@@ -313,7 +316,34 @@ export default function Call() {
 
         {phase.kind === 'idle' && (
           <div className="mt-6 bg-white rounded-2xl shadow-soft p-4 sm:p-6">
-            <h2 className="font-semibold text-gray-900">Who's online</h2>
+            <h2 className="font-semibold text-gray-900">Contacts online</h2>
+            <form
+              onSubmit={(e) => {
+                e.preventDefault();
+                const name = newContact.trim();
+                if (!name || !signalingRef.current) return;
+                setNotice(null);
+                signalingRef.current.addContact(name);
+                setNewContact('');
+              }}
+              className="mt-3 flex gap-2"
+            >
+              <input
+                type="text"
+                placeholder="Add a contact by username"
+                value={newContact}
+                onChange={(e) => setNewContact(e.target.value)}
+                className="flex-1 px-4 py-2 rounded-lg border border-gray-300 focus:border-primary-500 focus:ring-2 focus:ring-primary-200 outline-none text-sm"
+              />
+              <button
+                type="submit"
+                disabled={!newContact.trim()}
+                className="px-4 py-2 rounded-lg bg-white border border-gray-300 text-gray-700 text-sm font-medium hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+              >
+                Add
+              </button>
+            </form>
+            {notice && <p className="mt-2 text-sm text-green-700">{notice}</p>}
             <input
               type="text"
               placeholder="Search by username"
@@ -324,7 +354,7 @@ export default function Call() {
             <ul className="mt-4 divide-y divide-gray-100">
               {filtered.length === 0 ? (
                 <li className="py-6 text-center text-gray-500 text-sm">
-                  No one else is online right now. Open this page in another browser to test.
+                  None of your contacts are online right now. Add someone by username above.
                 </li>
               ) : (
                 filtered.map((u) => (